@@ -0,0 +1,10 @@
+'''
+Created on October 18, 2026
+'''
+
+import sys
+
+from jsonsubschema.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
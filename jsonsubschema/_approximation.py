@@ -0,0 +1,82 @@
+'''
+Created on October 18, 2026
+'''
+
+import contextlib
+import threading
+
+from jsonsubschema._trace import event
+
+
+class Approximate:
+    ''' Verdict of a subschema check which had to approximate some regex
+        automaton, the last time within operation, as it would have grown
+        past config.REGEX_STATE_CAP states. verdict is what the check found
+        under that approximation. The lhs is approximated by supersets and
+        the rhs by subsets, so a True verdict holds, while a False one may
+        not. Its truth is that of verdict, but it is equal to neither True
+        nor False. '''
+
+    __slots__ = ("verdict", "operation")
+
+    def __init__(self, verdict, operation=None):
+        self.verdict = verdict
+        self.operation = operation
+
+    def __bool__(self):
+        return bool(self.verdict)
+
+    def __eq__(self, other):
+        return isinstance(other, Approximate) \
+            and (bool(self.verdict), self.operation) == (bool(other.verdict), other.operation)
+
+    def __hash__(self):
+        return hash((Approximate, bool(self.verdict), self.operation))
+
+    def __reduce__(self):
+        return (Approximate, (self.verdict, self.operation))
+
+    def __repr__(self):
+        return "Approximate({!r}, {!r})".format(self.verdict, self.operation)
+
+
+# Approximations made so far in the current thread.
+_local = threading.local()
+
+
+def noted():
+    ''' Number of approximations made so far in the current thread;
+        a check approximated if this grew while it ran. '''
+    return getattr(_local, "count", 0)
+
+
+def note_approximation(operation):
+    ''' Records that operation fell back to an approximation. '''
+    _local.count = noted() + 1
+    _local.operation = operation
+    event("approximate", operation=operation)
+
+
+@contextlib.contextmanager
+def underapproximating():
+    ''' Within, operations which fall back to an approximation give a
+        subset rather than a superset of the exact result, as needed on
+        the rhs of subschema checks. '''
+    previous = underapproximated()
+    _local.under = True
+    try:
+        yield
+    finally:
+        _local.under = previous
+
+
+def underapproximated():
+    return getattr(_local, "under", False)
+
+
+def approximated(verdict, since):
+    ''' verdict, or Approximate(verdict) if approximations
+        were made after noted() was since. '''
+    if noted() == since:
+        return verdict
+    return Approximate(verdict, _local.operation)
@@ -0,0 +1,155 @@
+'''
+Created on October 18, 2026
+'''
+
+import signal
+import threading
+import time
+
+
+class BudgetExceeded(BaseException):
+    ''' Raised where a check runs out of its budget. Not an Exception,
+        so that no handler meant for errors in a check swallows it. '''
+
+    def __init__(self, phase, operation=None):
+        super().__init__(phase, operation)
+        self.phase = phase
+        self.operation = operation
+
+
+class Unknown:
+    ''' Verdict of a subschema check which ran out of its budget in phase,
+        within operation if known. It is falsy, as the check proved nothing,
+        but equal to neither True nor False. '''
+
+    __slots__ = ("phase", "operation")
+
+    def __init__(self, phase, operation=None):
+        self.phase = phase
+        self.operation = operation
+
+    def __bool__(self):
+        return False
+
+    def __eq__(self, other):
+        return isinstance(other, Unknown) \
+            and (self.phase, self.operation) == (other.phase, other.operation)
+
+    def __hash__(self):
+        return hash((Unknown, self.phase, self.operation))
+
+    def __reduce__(self):
+        return (Unknown, (self.phase, self.operation))
+
+    def __repr__(self):
+        if self.operation is None:
+            return "Unknown({!r})".format(self.phase)
+        return "Unknown({!r}, {!r})".format(self.phase, self.operation)
+
+
+# Budget of the check running in the current thread.
+_local = threading.local()
+
+# Code of the functions marked as critical.
+_critical_code = set()
+
+
+def critical(f):
+    ''' Marks function f as a critical section, which updates shared state
+        such as caches and must not be left half done. The timer of a budget
+        does not interrupt f, nor anything f calls; the check runs out at
+        its next checkpoint instead. '''
+    _critical_code.add(f.__code__)
+    return f
+
+
+class Budget:
+    ''' Limits a check to seconds of wall-clock time and to steps units
+        of work, either of which may be None for no limit.
+
+        Long running loops call checkpoint() every step, which raises
+        BudgetExceeded once the budget is used up. In the main thread,
+        a timer interrupts the check a little later still, in case it is
+        stuck in code without checkpoints such as the regex library.
+        It never interrupts critical sections. '''
+
+    # Extra time before the timer interrupts a check.
+    grace = 0.05
+
+    def __init__(self, seconds=None, steps=None):
+        self.seconds = seconds
+        self.steps = steps
+        self.used = 0
+        self.phase = None
+        # of the last checkpoint.
+        self.operation = None
+        self.deadline = None
+        self._previous = None
+        self._timer = False
+        self._handler = None
+
+    @classmethod
+    def of(cls, budget):
+        ''' budget as a Budget; numbers are taken as seconds. '''
+        if budget is None or isinstance(budget, Budget):
+            return budget
+        return cls(seconds=budget)
+
+    def charge(self, operation=None, n=1):
+        self.used += n
+        self.operation = operation
+        if (self.steps is not None and self.used > self.steps) \
+                or (self.deadline is not None and time.monotonic() > self.deadline):
+            raise BudgetExceeded(self.phase, operation)
+
+    def _alarm(self, signum, frame):
+        while frame is not None:
+            if frame.f_code in _critical_code:
+                # past the deadline, so the next checkpoint raises.
+                if self._timer:
+                    signal.setitimer(signal.ITIMER_REAL, self.grace)
+                return
+            frame = frame.f_back
+        raise BudgetExceeded(self.phase, self.operation)
+
+    def __enter__(self):
+        # a Budget is a limit per check, not shared among checks.
+        self.used = 0
+        self.phase = None
+        self.operation = None
+        self._previous = getattr(_local, "budget", None)
+        _local.budget = self
+        if self.seconds is not None:
+            self.deadline = time.monotonic() + self.seconds
+            if threading.current_thread() is threading.main_thread() \
+                    and hasattr(signal, "setitimer") \
+                    and signal.getitimer(signal.ITIMER_REAL)[0] == 0:
+                self._handler = signal.signal(signal.SIGALRM, self._alarm)
+                signal.setitimer(signal.ITIMER_REAL, self.seconds + self.grace)
+                self._timer = True
+        return self
+
+    @critical
+    def __exit__(self, exc_type, exc, tb):
+        if self._timer:
+            self._timer = False
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            # None if the previous handler was not set from Python.
+            signal.signal(signal.SIGALRM,
+                          self._handler if self._handler is not None else signal.SIG_DFL)
+        _local.budget = self._previous
+        return False
+
+
+def checkpoint(operation=None):
+    ''' Charges one step to the budget of the current check, if any. '''
+    budget = getattr(_local, "budget", None)
+    if budget is not None:
+        budget.charge(operation)
+
+
+def set_phase(phase):
+    ''' Names the phase the current check is in, for Unknown verdicts. '''
+    budget = getattr(_local, "budget", None)
+    if budget is not None:
+        budget.phase = phase
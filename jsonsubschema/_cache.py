@@ -0,0 +1,73 @@
+'''
+Created on October 18, 2026
+'''
+
+import collections
+import hashlib
+import json
+
+from jsonsubschema._budget import critical
+
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class LRUCache:
+    ''' A bounded mapping which evicts the least recently used entry
+        once it grows beyond maxsize. A maxsize of None means unbounded,
+        and a maxsize of 0 disables caching altogether. '''
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+
+    @critical
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    @critical
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    @critical
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+def structural_hash(obj):
+    ''' Stable content hash of a json document.
+        Key order does not matter, but value types do, e.g. 1 and true
+        or 1 and 1.0 hash differently. Returns None if obj is not
+        json serializable or is too deeply nested to serialize. '''
+    try:
+        s = json.dumps(obj, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError, RecursionError):
+        return None
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
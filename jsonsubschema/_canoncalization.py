@@ -3,53 +3,214 @@ Created on June 24, 2019
 @author: Andrew Habib
 '''
 
-import copy
 import jsonschema
 import numbers
 import sys
+import urllib.parse
+import uuid
 
+import jsonsubschema.config as config
 import jsonsubschema._constants as definitions
 import jsonsubschema._utils as utils
 from jsonsubschema.config import VALIDATOR
+from jsonsubschema._budget import checkpoint
+from jsonsubschema._cache import structural_hash
 from jsonsubschema._checkers import (
     typeToConstructor,
     boolToConstructor,
-    negTypeToConstructor,
     JSONtop,
     JSONbot,
-    JSONschema
+    JSONnot,
+    JSONschema,
+    JSONref,
+    deref,
+    intern_schema,
+    is_bot,
+    is_top
+)
+from jsonsubschema._trace import (
+    kind,
+    span
 )
 
 
-def canoncalize_json(obj):
+def canoncalize_json(obj, targets=None):
+    ''' Returns the canonical form of json schema obj.
+        The result is interned, hence shared and immutable.
+        targets is as for canoncalize_bottom_up. '''
     if utils.is_dict(obj):
-        return canoncalize_dict(obj)
+        with span("canonicalize") as sp:
+            try:
+                ret = intern_schema(canoncalize_bottom_up(obj, targets))
+            except utils.SchemaDepthError:
+                raise
+            except RecursionError as e:
+                # meets of nested subschemas still recurse.
+                raise utils.SchemaDepthError(
+                    "Schema is nested too deeply to canonicalize.") from e
+            sp.set(kind=kind(ret))
+            return ret
     else:
         return obj
 
 
+def canoncalize_bottom_up(obj, targets=None):
+    ''' Same as canoncalize_dict(obj), but with an explicit work stack.
+        Subschemas are canonicalized before the schemas containing them,
+        so canoncalize_dict never descends more than one level, and
+        subschemas shared within obj are canonicalized once.
+
+        Local $refs are resolved on the way. Each referenced definition is
+        canonicalized once and shared by all $refs to it. A $ref back into
+        a definition which is still being canonicalized, i.e. a recursive
+        one, becomes a JSONref, which is resolved at the end.
+
+        targets optionally maps the paths of json pointers, as tuples of
+        strings, to the subschemas found there in the document as it was
+        before some of its subschemas were replaced by canonical forms.
+        $refs are resolved against it first. '''
+
+    def resolve(ref):
+        if targets is not None:
+            target = targets.get(pointer_path(ref))
+            if target is not None:
+                return target
+        return resolve_pointer(obj, ref)
+
+    done = {}
+    # ids of the schemas being canonicalized, i.e. the ancestors of d.
+    pending = set()
+    refs = []
+    document = None
+    stack = [(obj, 0, None)]
+    while stack:
+        checkpoint("canonicalize")
+        d, depth, keywords = stack.pop()
+        if id(d) in done:
+            continue
+        if isinstance(d, JSONschema):
+            done[id(d)] = d
+        elif keywords is not None:
+            # all subschemas of d are done by now.
+            pending.discard(id(d))
+            if "$ref" in d:
+                target = resolve(d["$ref"])
+                if id(target) in done:
+                    done[id(d)] = done[id(target)]
+                else:
+                    if document is None:
+                        document = structural_hash(obj) or uuid.uuid4().hex
+                    ref = JSONref({"$ref": d["$ref"]}, document)
+                    refs.append((ref, target))
+                    done[id(d)] = ref
+            else:
+                d_ = utils.map_subschemas(d, lambda d_i: done[id(d_i)], keywords)
+                done[id(d)] = canoncalize_dict(d_)
+        elif id(d) in pending:
+            # reached again through a recursive $ref.
+            continue
+        elif depth > config.MAX_SCHEMA_DEPTH:
+            raise utils.SchemaDepthError(
+                "Schema is nested deeper than {} levels.".format(config.MAX_SCHEMA_DEPTH))
+        else:
+            pending.add(id(d))
+            if "$ref" in d:
+                # Draft4 ignores all other keywords next to $ref.
+                keywords = ()
+                children = [resolve(d["$ref"])]
+            else:
+                keywords = canonical_keywords(d)
+                children = [d_i for _, d_i in utils.iter_subschemas(d, keywords)]
+            stack.append((d, depth, keywords))
+            stack.extend((d_i, depth + 1, None)
+                         for d_i in children if id(d_i) not in done)
+
+    for ref, target in refs:
+        ref.resolve(intern_schema(done[id(target)]))
+    for ref, _ in refs:
+        # fails on $refs which only lead to other $refs.
+        deref(ref)
+    return done[id(obj)]
+
+
+def pointer_path(ref):
+    ''' The keys along the json pointer of the local $ref ref,
+        e.g. ("definitions", "a") for "#/definitions/a". '''
+    if not utils.is_str(ref) or not ref.startswith("#"):
+        raise utils.SchemaRefError(
+            "Only $refs within the same document are supported: {}".format(ref))
+    pointer = urllib.parse.unquote(ref[1:])
+    if not pointer:
+        return ()
+    if not pointer.startswith("/"):
+        raise utils.SchemaRefError("Invalid json pointer in $ref: {}".format(ref))
+    return tuple(token.replace("~1", "/").replace("~0", "~")
+                 for token in pointer[1:].split("/"))
+
+
+def resolve_pointer(root, ref):
+    ''' The subschema of schema document root which the local $ref ref,
+        e.g. "#/definitions/a", points to. '''
+    s = root
+    for token in pointer_path(ref):
+        try:
+            s = s[int(token)] if utils.is_list(s) else s[token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise utils.SchemaRefError("Can't resolve $ref: {}".format(ref))
+    if not utils.is_dict(s):
+        raise utils.SchemaRefError("$ref does not point to a schema: {}".format(ref))
+    return s
+
+
+def canonical_keywords(d):
+    ''' Keywords of schema d whose subschemas are kept by canoncalize_dict.
+        Subschemas of any other keyword are irrelevant for d,
+        so there is no need to canonicalize them. '''
+    t = d.get("type")
+    if utils.is_str(t):
+        t = [t]
+    elif not utils.is_list(t):
+        if "enum" in d.keys() and not definitions.Jconnectors.intersection(d.keys()):
+            t = enum_types(d["enum"])
+        else:
+            t = definitions.Jtypes
+    ret = set(definitions.Jconnectors)
+    for t_i in t:
+        ret.update(definitions.JtypesToKeywords.get(t_i, []))
+    return ret
+
+
 def canoncalize_dict(d, outer_key=None):
 
     # skip normal dict canonicalization
     # for object.properties/patternProperties
     # because these should be usual dict containers.
     if outer_key in ["properties", "patternProperties"]:
-        for k, v in d.items():
-            d[k] = canoncalize_dict(v)
+        return {k: canoncalize_dict(v) for k, v in d.items()}
+    # dependencies map keys to either a schema or a list of keys.
+    if outer_key == "dependencies":
+        return {k: canoncalize_dict(v) if utils.is_dict(v) else v
+                for k, v in d.items()}
+
+    # already canonical, e.g. by canoncalize_bottom_up.
+    if isinstance(d, JSONschema):
         return d
 
     # here, start dict canonicalization
-    if d == {}:
+    # Subschemas may be canonical already, and an unconstrained
+    # canonical node of some type equals {} as a dict.
+    if is_top(d):
         return JSONtop()
-    elif d.get("not") == {}:
+    elif is_bot(d):
         return JSONbot()
 
     t = d.get("type")
     has_connectors = definitions.Jconnectors.intersection(d.keys())
 
     # Start canoncalization.
-    # Don't modify original dict.
-    d = copy.deepcopy(d)
+    # Don't modify original dict. A shallow copy is enough since
+    # nested values are only ever replaced, never modified, below.
+    d = dict(d)
 
     if has_connectors:
         return canoncalize_connectors(d)
@@ -67,28 +228,33 @@ def canoncalize_dict(d, outer_key=None):
 def canoncalize_single_type(d):
     t = d.get("type")
     if t in typeToConstructor.keys():
+        enum = None
         # remove irrelevant keywords
         for k, v in list(d.items()):
             if k not in definitions.Jcommonkw and k not in definitions.JtypesToKeywords.get(t):
                 d.pop(k)
+            elif k == "enum":
+                # enum values are filtered against the canonical schema below.
+                enum = d.pop(k)
             elif utils.is_dict(v):
                 d[k] = canoncalize_dict(v, k)
             elif utils.is_list(v):
-                if k == "enum":
-                    v = utils.get_valid_enum_vals(v, d)
-                    # if we have a schema with enum key and the
-                    # enum does not have any valid value against the schema,
-                    # then this entire schema with the enum is uninhabited
-                    if v:
-                        d[k] = v
-                    else:
-                        return JSONbot()
-                elif k == "required":
+                if k == "required":
                     # to order the list; for proper dict equality
                     d[k] = list(set(v))
                 else:
                     d[k] = [canoncalize_dict(i) for i in v]
-        return typeToConstructor[t](d)
+        ret = typeToConstructor[t](d)
+        if enum is not None:
+            enum = utils.get_valid_enum_vals(enum, ret)
+            # if we have a schema with enum key and the
+            # enum does not have any valid value against the schema,
+            # then this entire schema with the enum is uninhabited
+            if enum:
+                ret.enum = enum
+            else:
+                return JSONbot()
+        return ret
 
     else:
         # TODO: or just return?
@@ -104,15 +270,13 @@ def canoncalize_list_of_types(d):
 
     # to save an unnecessary anyOf with one option only.
     if len(t) == 1:
-        d["type"] = t.pop()
+        d["type"] = next(iter(t))
         return canoncalize_single_type(d)
 
     choices = []
     for t_i in t:
         if t_i in typeToConstructor.keys():
-            s_i = copy.deepcopy(d)
-            s_i["type"] = t_i
-            s_i = canoncalize_single_type(s_i)
+            s_i = canoncalize_single_type(dict(d, type=t_i))
             choices.append(s_i)
         else:
             # TODO: or just return?
@@ -120,14 +284,40 @@ def canoncalize_list_of_types(d):
             print(d)
             print("Exiting...")
             sys.exit(1)
+    choices = merge_numeric_choices(choices)
+    if len(choices) == 1:
+        return choices[0]
     d = {"anyOf": choices}
     # TODO do we need to return JSONanyOf ?
     return boolToConstructor.get("anyOf")(d)
 
 
-def canoncalize_untyped_enum(d):
+def merge_numeric_choices(choices):
+    ''' choices, the canonical schemas of one json type each, without
+        duplicates, which numbers with an integer multipleOf turn into,
+        and without the integer one if the number one has the same
+        constraints, as all its instances are then instances of the
+        number one too. Untyped schemas thus become a union of at most
+        one schema per type. '''
+
+    def constraints(s):
+        return {k: v for k, v in s.items() if k != "type"}
+
+    numbers = [constraints(s) for s in choices if getattr(s, "type", None) == "number"]
+    ret = []
+    for s in choices:
+        if s in ret:
+            continue
+        if getattr(s, "type", None) == "integer" and constraints(s) in numbers:
+            continue
+        ret.append(s)
+    return ret
+
+
+def enum_types(enum):
+    ''' The json types of the values in enum. '''
     t = set()
-    for i in d.get("enum"):
+    for i in enum:
         if utils.is_str(i):
             t.add("string")
         elif utils.is_bool(i):
@@ -142,8 +332,11 @@ def canoncalize_untyped_enum(d):
             t.add("array")
         elif utils.is_dict(i):
             t.add("object")
+    return t
+
 
-    d["type"] = list(t)
+def canoncalize_untyped_enum(d):
+    d["type"] = list(enum_types(d.get("enum")))
     return canoncalize_list_of_types(d)
 
 
@@ -190,21 +383,25 @@ def canoncalize_not(d):
     to_be_negated_schema = d["not"]
     if not isinstance(to_be_negated_schema, JSONschema):
         to_be_negated_schema = canoncalize_dict(to_be_negated_schema)
+    if isinstance(to_be_negated_schema, JSONref):
+        raise utils.SchemaRefError(
+            "Negation of recursive $refs is not supported: {}".format(to_be_negated_schema["$ref"]))
 
     # not schema is now in canonical form
+    if is_top(to_be_negated_schema):
+        return JSONbot()
+    if is_bot(to_be_negated_schema):
+        return JSONtop()
     t = to_be_negated_schema.type
     if t in definitions.Jtypes:
-        anyofs = []
-        for t_i in definitions.Jtypes.difference([t]):
-            anyofs.append(typeToConstructor.get(t_i)({"type": t_i}))
-        anyofs.append(negTypeToConstructor.get(t)(to_be_negated_schema))
-        anyofs = list(filter(None, anyofs))
-        return boolToConstructor.get("anyOf")({"anyOf": anyofs})
+        # The complement is expanded lazily, and cached on the interned
+        # node, so that meets during canonicalization share it.
+        return intern_schema(JSONnot({"not": to_be_negated_schema}))
 
     elif t in definitions.Jconnectors:
 
         if t == "not":
-            return to_be_negated_schema
+            return to_be_negated_schema["not"]
 
         if t == "anyOf":
             allofs = []
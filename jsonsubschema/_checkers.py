@@ -4,35 +4,346 @@ Created on June 24, 2019
 '''
 
 import copy
+import hashlib
+import inspect
 import itertools
 import json
 import math
 import numbers
 import sys
+import weakref
 
 import intervals as I
-from greenery.lego import parse
 
 import jsonsubschema.config as config
 
 import jsonsubschema._constants as definitions
 import jsonsubschema._utils as utils
+from jsonsubschema._approximation import (
+    noted,
+    underapproximating
+)
+from jsonsubschema._budget import (
+    checkpoint,
+    critical
+)
+from jsonsubschema._cache import LRUCache
+from jsonsubschema._trace import (
+    Span,
+    event,
+    kind,
+    traced
+)
 from jsonsubschema._utils import print_db
 
+
+# Verdicts of previously answered subtype queries keyed by the
+# fingerprints of both sides. Shared by all checks in this process.
+subtype_cache = LRUCache(config.SUBTYPE_CACHE_SIZE)
+
+_missing = object()
+
+
+def _is_container(obj):
+    return isinstance(obj, (dict, list, tuple))
+
+
+def _children(obj):
+    return obj.values() if utils.is_dict(obj) else obj
+
+
+def _fingerprint_of(obj, digests):
+    # digests holds the fingerprints of containers computed so far.
+    if isinstance(obj, JSONschema) and obj._fingerprint is not None:
+        return obj._fingerprint
+    elif _is_container(obj):
+        return digests[id(obj)]
+    else:
+        return "{}:{!r}".format(type(obj).__name__, obj)
+
+
+def _digest(obj, digests):
+    if isinstance(obj, JSONschema):
+        # interval is derived from the other keywords.
+        parts = [type(obj).__name__]
+        if isinstance(obj, JSONref):
+            # the same $ref means different things in different documents.
+            parts.append(obj._document)
+        parts.extend("{!r}={}".format(k, _fingerprint_of(v, digests))
+                     for k, v in sorted(obj.items()) if k != "interval")
+    elif utils.is_dict(obj):
+        parts = ["dict"]
+        parts.extend("{!r}={}".format(k, _fingerprint_of(v, digests))
+                     for k, v in sorted(obj.items()))
+    else:
+        parts = ["list"]
+        parts.extend(_fingerprint_of(v, digests) for v in obj)
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def fingerprint(obj):
+    ''' Structural digest of a canonical schema or any value nested in it.
+        Structurally equal schemas get the same fingerprint.
+        Digests of schema nodes are computed once and kept on the node
+        until the node is modified. Nested values are digested bottom-up
+        with an explicit stack rather than by recursion. '''
+
+    if not _is_container(obj):
+        return _fingerprint_of(obj, None)
+    digests = {}
+    stack = [(obj, False)]
+    while stack:
+        o, expanded = stack.pop()
+        if id(o) in digests:
+            continue
+        if isinstance(o, JSONschema) and o._fingerprint is not None:
+            digests[id(o)] = o._fingerprint
+        elif expanded:
+            digests[id(o)] = _digest(o, digests)
+            if isinstance(o, JSONschema):
+                object.__setattr__(o, "_fingerprint", digests[id(o)])
+        else:
+            stack.append((o, True))
+            stack.extend((v, False) for v in _children(o)
+                         if _is_container(v) and id(v) not in digests)
+    return digests[id(obj)]
+
+
+# Hash-consing table of canonical schema nodes: every structurally
+# distinct schema which is still in use is stored exactly once.
+_interned = weakref.WeakValueDictionary()
+
+
+@critical
+def intern_schema(obj):
+    ''' Returns the shared, immutable representative of canonical schema obj.
+        Children are interned first, so structurally equal subschemas
+        anywhere in obj, or in any other interned schema, end up being
+        the same object. Equality of interned nodes is then an identity
+        check and their fingerprint doubles as a precomputed hash. '''
+
+    if not _is_container(obj):
+        return obj
+    # representatives of the containers visited so far.
+    done = {}
+    stack = [(obj, False)]
+    while stack:
+        o, expanded = stack.pop()
+        if id(o) in done:
+            continue
+        if isinstance(o, JSONschema) and o._frozen:
+            done[id(o)] = o
+        elif not expanded:
+            stack.append((o, True))
+            stack.extend((v, False) for v in _children(o)
+                         if _is_container(v) and id(v) not in done)
+        elif isinstance(o, JSONschema):
+            for k, v in o.items():
+                v_ = done.get(id(v), v)
+                if v_ is not v:
+                    dict.__setitem__(o, k, v_)
+            o._syncFields()
+            o._frozen = True
+            done[id(o)] = _interned.setdefault(fingerprint(o), o)
+        else:
+            # plain containers are interned in place.
+            if utils.is_dict(o):
+                for k, v in o.items():
+                    o[k] = done.get(id(v), v)
+            elif utils.is_list(o):
+                for idx, v in enumerate(o):
+                    o[idx] = done.get(id(v), v)
+            done[id(o)] = o
+    return done[id(obj)]
+
+
+def check_subtype(s1, s2):
+    ''' Is s1 a subtype of s2? Decided without recursing through Python frames.
+
+        Subtype rules are generators which yield the (s1, s2) or
+        (s1, s2, isSubtype_cb) queries they depend on and are sent back
+        the verdicts; rules without sub-queries simply return a verdict.
+        Pending rules are kept on an explicit stack of at most
+        config.MAX_SCHEMA_DEPTH entries.
+
+        Queries on recursive $refs are decided coinductively: while such a
+        query is pending, it is assumed to hold. Verdicts which might rest
+        on such an assumption are not remembered in subtype_cache,
+        nor are verdicts resting on approximations of regex automata.
+
+        While tracing, every query which is not decided right away
+        is a span, open for as long as its rule is on the stack. '''
+
+    subtype_cache.maxsize = config.SUBTYPE_CACHE_SIZE
+    stack = []
+    assumptions = set()
+    spans = [] if config.TRACE_SINK is not None else None
+    try:
+        ret = _subtype_query(stack, assumptions, s1, s2, spans=spans)
+        while stack:
+            checkpoint("subtype")
+            key, rule, assumed, since = stack[-1]
+            try:
+                query = rule.send(ret)
+            except StopIteration as e:
+                stack.pop()
+                ret = e.value
+                if assumed:
+                    assumptions.discard(key)
+                if (not ret or not assumptions) and noted() == since:
+                    subtype_cache.put(key, ret)
+                _end_subtype_span(spans, ret)
+            else:
+                ret = _subtype_query(stack, assumptions, *query, spans=spans)
+        return ret
+    except BaseException as e:
+        # spans of the rules given up on.
+        while spans:
+            spans.pop().__exit__(type(e), e, None)
+        raise
+
+
+def _subtype_query(stack, assumptions, s1, s2, isSubtype_cb=None, spans=None):
+    ''' Returns the verdict of s1 <: s2 if it is known right away.
+        Otherwise, pushes the rule deciding it onto stack and returns None.
+        Without isSubtype_cb, the query is the full s1.isSubtype(s2).
+        spans is the list of open spans of the rules on stack, or None
+        while tracing is disabled. '''
+
+    if isSubtype_cb is None:
+        if s1 == s2 or is_bot(s1) or is_top(s2):
+            return True
+        if (not is_bot(s1) and is_bot(s2)) \
+                or (is_top(s1) and not is_top(s2)):
+            return False
+        tag = "isSubtype"
+    else:
+        tag = isSubtype_cb.__name__
+
+    key = (tag, fingerprint(s1), fingerprint(s2))
+    ret = subtype_cache.get(key, _missing)
+    if ret is not _missing:
+        if spans is not None:
+            event("subtype", rule=tag, lhs=kind(s1), rhs=kind(s2),
+                  lhs_fp=key[1][:12], rhs_fp=key[2][:12], cache="hit", verdict=ret)
+        return ret
+
+    if spans is not None:
+        spans.append(Span("subtype", {
+            "rule": tag, "lhs": kind(s1), "rhs": kind(s2),
+            "lhs_fp": key[1][:12], "rhs_fp": key[2][:12], "cache": "miss"}).__enter__())
+
+    since = noted()
+    is_ref = isinstance(s1, JSONref) or isinstance(s2, JSONref)
+    if is_ref:
+        if key in assumptions:
+            _end_subtype_span(spans, True, assumed=True)
+            return True
+        assumptions.add(key)
+        ret = _isRefSubtype(s1, s2, isSubtype_cb)
+    elif isSubtype_cb is None:
+        ret = s1.subtype_enum(s2) and s1._isSubtype(s2)
+    else:
+        ret = isSubtype_cb(s1, s2)
+
+    if inspect.isgenerator(ret):
+        if len(stack) >= config.MAX_SCHEMA_DEPTH:
+            raise utils.SchemaDepthError(
+                "Subtype check is nested deeper than {} levels.".format(config.MAX_SCHEMA_DEPTH))
+        # its span stays open until the rule is done.
+        stack.append((key, ret, is_ref, since))
+        return None
+    if noted() == since:
+        subtype_cache.put(key, ret)
+    _end_subtype_span(spans, ret)
+    return ret
+
+
+def _end_subtype_span(spans, verdict, **attrs):
+    if spans is not None:
+        sp = spans.pop()
+        sp.set(verdict=verdict, **attrs)
+        sp.__exit__(None, None, None)
+
+
+def _isRefSubtype(s1, s2, isSubtype_cb):
+    return (yield deref(s1), deref(s2), isSubtype_cb)
+
+
+def _slotOf(k):
+    # dict.items() is taken, so the items keyword lives in the items_ slot.
+    return "items_" if k == "items" else k
+
+
+def _keyOf(slot):
+    return "items" if slot == "items_" else slot
+
+
+def _to_json(obj):
+    if isinstance(obj, JSONschema):
+        return obj.to_json()
+    elif utils.is_dict(obj):
+        return {k: _to_json(v) for k, v in obj.items()}
+    elif utils.is_list(obj):
+        return [_to_json(v) for v in obj]
+    else:
+        return obj
+
+
+def _restore_schema(cls, items, interval):
+    ret = cls.__new__(cls)
+    dict.update(ret, items)
+    ret._syncFields()
+    if interval is not None:
+        ret.interval = interval
+    return ret
+
+
 class UninhabitedMeta(type):
 
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        # Every slot other than the internal state mirrors the keyword
+        # of the same name; see JSONschema._syncFields.
+        cls._fields = tuple(
+            slot for c in reversed(cls.__mro__)
+            for slot in c.__dict__.get("__slots__", ())
+            if slot not in JSONschema_state and not slot.startswith("_"))
+
     def __call__(cls, *args, **kwargs):
         obj = type.__call__(cls, *args, **kwargs)
         obj.updateInternalState()
         obj.checkUninhabited()
-        utils.validate_schema(obj)
+        # Input schemas are validated once on entry;
+        # nodes we build ourselves are trusted unless debugging.
+        if config.VALIDATE_INTERNAL_NODES:
+            utils.validate_schema(obj)
         return obj
 
 
+# Slots of schema nodes which hold internal state rather than keywords.
+JSONschema_state = ("__weakref__", "interval", "_frozen", "_fingerprint")
+
+
 class JSONschema(dict, metaclass=UninhabitedMeta):
+    ''' Canonical schema nodes are dicts holding the json keywords
+        which do not have their default values. On top of that, each
+        node type declares slots for its keywords; these are kept in sync
+        with the dict and fall back to kw_defaults, so keyword lookups
+        like s.minLength are plain field reads. A slot only references
+        the value held by the dict, at the cost of one pointer per
+        keyword; nodes have no __dict__. '''
+
+    __slots__ = JSONschema_state + ("type",)
 
     kw_defaults = {}
 
+    def __new__(cls, *args, **kwargs):
+        self = dict.__new__(cls)
+        object.__setattr__(self, "_frozen", False)
+        object.__setattr__(self, "_fingerprint", None)
+        return self
+
     def __init__(self, *args, **kwargs):
         # Hack to avoid having explicit default values for keys which are
         # not compatible with jsonsche,a validator.
@@ -43,6 +354,82 @@ class JSONschema(dict, metaclass=UninhabitedMeta):
         #         if self.kw_defaults.get(k) == args[0][k]:
         #             del args[0][k]
         super().__init__(*args, **kwargs)
+        self._syncFields()
+
+    def _syncFields(self, k=None):
+        ''' Refresh the slot of keyword k, or all keyword slots. '''
+        for slot in self._fields if k is None else (_slotOf(k),):
+            if slot not in self._fields:
+                continue
+            key = _keyOf(slot)
+            if key in self:
+                object.__setattr__(self, slot, dict.__getitem__(self, key))
+            elif key in self.kw_defaults:
+                object.__setattr__(self, slot, self.kw_defaults[key])
+            else:
+                try:
+                    object.__delattr__(self, slot)
+                except AttributeError:
+                    pass
+
+    def _copyState(self, s):
+        self._syncFields()
+        try:
+            object.__setattr__(self, "interval", s.interval)
+        except AttributeError:
+            pass
+
+    def __reduce__(self):
+        return (_restore_schema, (type(self), dict(self), getattr(self, "interval", None)))
+
+    def to_json(self):
+        ''' Plain json form of this canonical schema, e.g. for output. '''
+        ret = {}
+        for k, v in self.items():
+            # unbounded keywords are simply left out.
+            if isinstance(v, type(I.inf)) or isinstance(v, type(-I.inf)):
+                continue
+            ret[k] = _to_json(v)
+        return ret
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        # Interned nodes are equal only if they are the same object.
+        if self._frozen and isinstance(other, JSONschema) and other._frozen:
+            return False
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        ret = self.__eq__(other)
+        return ret if ret is NotImplemented else not ret
+
+    def __hash__(self):
+        if not self._frozen:
+            raise TypeError("unhashable mutable schema: {}".format(type(self).__name__))
+        return hash(fingerprint(self))
+
+    def __copy__(self):
+        # A shallow copy is never frozen, so it can be modified.
+        ret = type(self).__new__(type(self))
+        dict.update(ret, self)
+        ret._copyState(self)
+        return ret
+
+    def __deepcopy__(self, memo):
+        # Interned nodes are immutable, so they can be shared.
+        if self._frozen:
+            return self
+        ret = type(self).__new__(type(self))
+        memo[id(self)] = ret
+        for k, v in self.items():
+            dict.__setitem__(ret, k, copy.deepcopy(v, memo))
+        ret._copyState(self)
+        return ret
+
+    def _checkMutable(self):
+        if self._frozen:
+            raise TypeError("Interned schemas are immutable: {}".format(self))
 
     def __getattr__(self, name):
 
@@ -64,18 +451,29 @@ class JSONschema(dict, metaclass=UninhabitedMeta):
             raise AttributeError("No such attribute: ", name)
 
     def __setattr__(self, name, value):
-        self[name] = value
+        if name in JSONschema_state:
+            object.__setattr__(self, name, value)
+        else:
+            self[_keyOf(name)] = value
 
     def __delattr__(self, name):
+        self._checkMutable()
+        self._fingerprint = None
         if name in self:
-            if name == "items_":
-                del self["items"]
-            else:
-                del self[name]
+            del self[name]
+        elif name == "items_" and "items" in self:
+            del self["items"]
         else:
             raise AttributeError("No such attribute: ", name)
 
+    def __delitem__(self, k):
+        self._checkMutable()
+        self._fingerprint = None
+        dict.__delitem__(self, k)
+        self._syncFields(k)
+
     def __setitem__(self, k, v):
+        self._checkMutable()
         # if the original json dict is missing type-specific keywords,
         # on accessing these missing attributes, retrieve the default values
         # from the the per-type kw_defaults insteat of copying the default values
@@ -90,10 +488,14 @@ class JSONschema(dict, metaclass=UninhabitedMeta):
                 # the pair into the jsn dict.
                 # After this, call updateInternalState to make any necessary
                 # changes or re-computation
+                self._fingerprint = None
                 dict.__setitem__(self, k, v)
+                self._syncFields(k)
                 self.updateInternalState()
         else:
+            self._fingerprint = None
             dict.__setitem__(self, k, v)
+            self._syncFields(k)
 
     # def __getitem__(self, k):
     #     if k in dict.keys(self):
@@ -123,6 +525,14 @@ class JSONschema(dict, metaclass=UninhabitedMeta):
     def isBoolean(self):
         return self.keys() & definitions.Jconnectors
 
+    def accepts(self, i):
+        ''' Is the json instance i valid against this canonical schema?
+            Works directly on the canonical representation, so this is
+            much cheaper than a full jsonschema validation. '''
+        if self.hasEnum() and not utils.enum_contains(self.enum, i):
+            return False
+        return self._accepts(i)
+
     def hasEnum(self):
         return "enum" in self.keys()
 
@@ -136,7 +546,12 @@ class JSONschema(dict, metaclass=UninhabitedMeta):
             print("Found an uninhabited type at: ", type(self), self)
         return uninhabited
 
+    @traced("meet", lambda s1, s2: {"lhs": kind(s1), "rhs": kind(s2)})
     def meet(self, s):
+        checkpoint("meet")
+        #
+        if isinstance(self, JSONref) or isinstance(s, JSONref):
+            return deref(self).meet(deref(s))
         #
         if self == s or is_top(s):
             return self
@@ -152,6 +567,8 @@ class JSONschema(dict, metaclass=UninhabitedMeta):
         if self.hasEnum() or s.hasEnum():
             enum = JSONschema.meet_enum(self, s)
             if enum:
+                if ret._frozen:
+                    ret = copy.copy(ret)
                 ret["enum"] = list(enum)
             # instead of returning uninhabited type, return bot
             else:
@@ -161,14 +578,13 @@ class JSONschema(dict, metaclass=UninhabitedMeta):
 
     @staticmethod
     def meet_enum(s1, s2):
-        enum = set(s1.get("enum", [])) | set(s2.get("enum", []))
+        enum = list(s1.get("enum", [])) + list(s2.get("enum", []))
         valid_enum1 = utils.get_valid_enum_vals(enum, s1)
-        valid_enum2 = utils.get_valid_enum_vals(enum, s2)
-        return set(valid_enum1) & set(valid_enum2)
+        return utils.get_valid_enum_vals(valid_enum1, s2)
 
     def meet_handle_rhs(self, s, meet_cb):
         #
-        if s.type == "anyOf":
+        if s.type in ("anyOf", "not"):
             return JSONanyOf._meetAnyOf(s, self)
         #
         else:
@@ -193,19 +609,12 @@ class JSONschema(dict, metaclass=UninhabitedMeta):
             return ret
 
     def isSubtype(self, s):
-        #
-        if self == s or is_bot(self) or is_top(s):
-            return True
-        #
-        if (not is_bot(self) and is_bot(s)) \
-                or (is_top(self) and not is_top(s)):
-            return False
-        #
-        return self.subtype_enum(s) and self._isSubtype(s)
+        return check_subtype(self, s)
 
     def subtype_enum(self, s):
         if self.hasEnum():
-            valid_enum = utils.get_valid_enum_vals(self.enum, s)
+            with underapproximating():
+                valid_enum = utils.get_valid_enum_vals(self.enum, s)
             # no need to check individual elements
             # as enum values are unique by definition
             if len(valid_enum) == len(self.enum):
@@ -218,26 +627,41 @@ class JSONschema(dict, metaclass=UninhabitedMeta):
     def isSubtype_handle_rhs(self, s, isSubtype_cb):
 
         if s.isBoolean():
-            # TODO revisit all of this. They are wrong.
-            if s.type == "anyOf":
-                return any(isSubtype_cb(self, i) for i in s.anyOf)
-            elif s.type == "allOf":
-                return all(isSubtype_cb(self, i) for i in s.allOf)
-            elif s.type == "oneOf":
-                return utils.one(isSubtype_cb(self, i) for i in s.oneOf)
-            elif s.type == "not":
-                # TODO
-                print("No handling of 'not' on rhs yet.")
-                return None
+            return self._isSubtype_connector_rhs(s, isSubtype_cb)
         else:
             return isSubtype_cb(self, s)
 
+    def _isSubtype_connector_rhs(self, s, isSubtype_cb):
+        # TODO revisit all of this. They are wrong.
+        if s.type in ("anyOf", "not"):
+            with underapproximating():
+                branches = s.branchesFor(self)
+            for i in branches:
+                if (yield self, i, isSubtype_cb):
+                    return True
+            return False
+        elif s.type == "allOf":
+            for i in s.allOf:
+                if not (yield self, i, isSubtype_cb):
+                    return False
+            return True
+        elif s.type == "oneOf":
+            verdicts = []
+            for i in s.oneOf:
+                verdicts.append((yield self, i, isSubtype_cb))
+            return utils.one(verdicts)
+
 
 class JSONtop(JSONschema):
 
+    __slots__ = ()
+
     def _isUninhabited(self):
         return False
 
+    def _accepts(self, i):
+        return True
+
     def _meet(self, s):
         return s
 
@@ -250,6 +674,8 @@ class JSONtop(JSONschema):
 
         super().isSubtype_handle_rhs(s, _isTopSubtype)
 
+    __hash__ = JSONschema.__hash__
+
     def __eq__(self, s):
         if is_top(s):
             return True
@@ -264,16 +690,25 @@ class JSONtop(JSONschema):
 
 
 def is_top(obj):
-    return obj == True or obj == {} or isinstance(obj, JSONtop)
+    # Canonical nodes keep their type out of the dict, so one without
+    # constraints equals {} without being top.
+    if isinstance(obj, JSONschema):
+        return isinstance(obj, JSONtop)
+    return obj == True or obj == {}
 
 
 class JSONbot(JSONschema):
+
+    __slots__ = ()
     def __init__(self):
         super().__init__({"not": {}})
 
     def _isUninhabited(self):
         return True
 
+    def _accepts(self, i):
+        return False
+
     def _meet(self, s):
         return self
 
@@ -286,6 +721,8 @@ class JSONbot(JSONschema):
 
         super().isSubtype_handle_rhs(s, _isBotSubtype)
 
+    __hash__ = JSONschema.__hash__
+
     def __eq__(self, s):
         if is_bot(s):
             return True
@@ -300,15 +737,18 @@ class JSONbot(JSONschema):
 
 
 def is_bot(obj):
+    if isinstance(obj, JSONschema):
+        return isinstance(obj, JSONbot) \
+            or obj.checkUninhabited() \
+            or (obj.hasEnum() and not obj.enum)
     return obj == False \
-        or (utils.is_dict(obj) and obj.get("not") == {}) \
-        or isinstance(obj, JSONbot) \
-        or (isinstance(obj, JSONschema) and obj.checkUninhabited()) \
-        or (isinstance(obj, JSONschema) and obj.hasEnum() and not obj.enum)
+        or (utils.is_dict(obj) and "not" in obj and is_top(obj["not"]))
 
 
 class JSONTypeString(JSONschema):
 
+    __slots__ = ("minLength", "maxLength", "pattern")
+
     kw_defaults = {"type": "string", "minLength": 0,
                    "maxLength": I.inf, "pattern": ".*"}
 
@@ -324,6 +764,14 @@ class JSONTypeString(JSONschema):
     def _isUninhabited(self):
         return (self.minLength > self.maxLength) or self.pattern == None
 
+    def _accepts(self, i):
+        if not utils.is_str(i) or len(i) not in self.interval:
+            return False
+        if self.pattern == None:
+            return False
+        return self.pattern == self.kw_defaults["pattern"] \
+            or utils.regex_matches_string(self.pattern, i)
+
     def updateInternalState(self):
         self.interval = I.closed(self.minLength, self.maxLength)
 
@@ -379,8 +827,9 @@ class JSONTypeString(JSONschema):
                     negated_strings.append(JSONTypeString(
                         {"minLength": s.__getattr__(k) + 1}))
                 elif k == "pattern":
-                    negated_strings.append(JSONTypeString(
-                        {k: utils.complement_of_string_pattern(s[k])}))
+                    pattern = utils.complement_of_string_pattern(s[k])
+                    if pattern is not None:
+                        negated_strings.append(JSONTypeString({k: pattern}))
 
         # if loop does not break,
         # it means that a default JSON string is not accepted.
@@ -436,6 +885,8 @@ def isNumericUninhabited(s):
 
 class JSONTypeInteger(JSONschema):
 
+    __slots__ = ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "multipleOf")
+
     kw_defaults = {"type": "integer", "minimum": -I.inf, "maximum": I.inf,
                    "exclusiveMinimum": False, "exclusiveMaximum": False, "multipleOf": None}
 
@@ -455,6 +906,12 @@ class JSONTypeInteger(JSONschema):
     def _isUninhabited(self):
         return isNumericUninhabited(self)
 
+    def _accepts(self, i):
+        # numbers of integer multipleOf become integers too,
+        # so integral floats are integers here.
+        return utils.is_int_equiv(i) and i in self.interval \
+            and utils.is_multipleOf(i, self.multipleOf)
+
     def updateInternalState(self):
         self.build_interval_draft4()
 
@@ -508,6 +965,8 @@ class JSONTypeInteger(JSONschema):
 
 class JSONTypeNumber(JSONschema):
 
+    __slots__ = ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "multipleOf")
+
     kw_defaults = {"type": "number", "minimum": -I.inf, "maximum": I.inf,
                    "exclusiveMinimum": False, "exclusiveMaximum": False, "multipleOf": None}
 
@@ -527,6 +986,10 @@ class JSONTypeNumber(JSONschema):
     def _isUninhabited(self):
         return isNumericUninhabited(self)
 
+    def _accepts(self, i):
+        return utils.is_num(i) and i in self.interval \
+            and utils.is_multipleOf(i, self.multipleOf)
+
     def updateInternalState(self):
         self.build_interval_draft4()
 
@@ -576,6 +1039,8 @@ class JSONTypeNumber(JSONschema):
 
 class JSONTypeBoolean(JSONschema):
 
+    __slots__ = ()
+
     kw_defaults = {"type": "boolean"}
 
     def __init__(self, s):
@@ -584,6 +1049,9 @@ class JSONTypeBoolean(JSONschema):
     def _isUninhabited(self):
         return False
 
+    def _accepts(self, i):
+        return utils.is_bool(i)
+
     def _meet(self, s):
 
         def _meetBoolean(s1, s2):
@@ -611,6 +1079,8 @@ class JSONTypeBoolean(JSONschema):
 
 class JSONTypeNull(JSONschema):
 
+    __slots__ = ()
+
     kw_defaults = {"type": "null"}
 
     def __init__(self, s):
@@ -619,6 +1089,9 @@ class JSONTypeNull(JSONschema):
     def _isUninhabited(self):
         return False
 
+    def _accepts(self, i):
+        return utils.is_null(i)
+
     def _meet(self, s):
 
         def _meetNull(s1, s2):
@@ -647,6 +1120,8 @@ class JSONTypeNull(JSONschema):
 
 class JSONTypeArray(JSONschema):
 
+    __slots__ = ("minItems", "maxItems", "items_", "additionalItems", "uniqueItems")
+
     kw_defaults = {"type": "array", "minItems": 0, "maxItems": I.inf,
                    "items": JSONtop(), "additionalItems": True, "uniqueItems": False}
 
@@ -665,6 +1140,23 @@ class JSONTypeArray(JSONschema):
              False and self.minItems > len(self.items_)) or \
             (utils.is_list(self.items_) and len(self.items_) == 0)
 
+    def _accepts(self, i):
+        if not utils.is_list(i) or len(i) not in self.interval:
+            return False
+        if self.uniqueItems and not utils.is_unique(i):
+            return False
+        if utils.is_dict(self.items_):
+            return all(self.items_.accepts(j) for j in i)
+        for idx, j in enumerate(i):
+            if idx < len(self.items_):
+                if not self.items_[idx].accepts(j):
+                    return False
+            elif utils.is_bool(self.additionalItems):
+                return self.additionalItems
+            elif not self.additionalItems.accepts(j):
+                return False
+        return True
+
     def updateInternalState(self):
         self.compute_actual_maxItems()
         self.interval = I.closed(self.minItems, self.maxItems)
@@ -699,7 +1191,7 @@ class JSONTypeArray(JSONschema):
                     ret.items_ = itms
 
                     if s2.additionalItems == True:
-                        ret.additionalItems = copy.deepcopy(s1.items_)
+                        ret.additionalItems = s1.items_
                     elif s2.additionalItems == False:
                         ret.additionalItems = False
                     elif utils.is_dict(s2.additionalItems):
@@ -817,7 +1309,7 @@ class JSONTypeArray(JSONschema):
                 if utils.is_dict(s2.items_):
                     print_db(s1.items_)
                     print_db(s2.items_)
-                    if s1.items_.isSubtype(s2.items_):
+                    if (yield s1.items_, s2.items_):
                         print_db("__05__")
                         return True
                     else:
@@ -829,20 +1321,20 @@ class JSONTypeArray(JSONschema):
                         return False
                     elif s2.additionalItems == True:
                         for i in s2.items_:
-                            if not s1.items_.isSubtype(i):
+                            if not (yield s1.items_, i):
                                 print_db("__08__")
                                 return False
                         print_db("__09__")
                         return True
                     elif utils.is_dict(s2.additionalItems):
                         for i in s2.items_:
-                            if not s1.items_.isSubtype(i):
+                            if not (yield s1.items_, i):
                                 print_db("__10__")
                                 return False
                         print_db(type(s1.items_), s1.items_)
                         print_db(type(s2.additionalItems),
                                        s2.additionalItems)
-                        if s1.items_.isSubtype(s2.additionalItems):
+                        if (yield s1.items_, s2.additionalItems):
                             print_db("__11__")
                             return True
                         else:
@@ -854,26 +1346,26 @@ class JSONTypeArray(JSONschema):
                 if utils.is_dict(s2.items_):
                     if s1.additionalItems == False:
                         for i in s1.items_:
-                            if not i.isSubtype(s2.items_):
+                            if not (yield i, s2.items_):
                                 print_db("__13__")
                                 return False
                         print_db("__14__")
                         return True
                     elif s1.additionalItems == True:
                         for i in s1.items_:
-                            if not i.isSubtype(s2.items_):
+                            if not (yield i, s2.items_):
                                 return False
                             # since s1.additional items is True,
                             # then TOP should also be a subtype of
                             # s2.items
-                        if JSONtop().isSubtype(s2.items_):
+                        if (yield JSONtop(), s2.items_):
                             return True
                         return False
                     elif utils.is_dict(s1.additionalItems):
                         for i in s1.items_:
-                            if not i.isSubtype(s2.items_):
+                            if not (yield i, s2.items_):
                                 return False
-                        if s1.additionalItems.isSubtype(s2.items_):
+                        if (yield s1.additionalItems, s2.items_):
                             return True
                         else:
                             return False
@@ -883,7 +1375,7 @@ class JSONTypeArray(JSONschema):
                     len1 = len(s1.items_)
                     len2 = len(s2.items_)
                     for i, j in zip(s1.items_, s2.items_):
-                        if not i.isSubtype(j):
+                        if not (yield i, j):
                             return False
                     if len1 == len2:
                         print_db("len1 == len2")
@@ -894,7 +1386,7 @@ class JSONTypeArray(JSONschema):
                         elif s1.additionalItems == False and s2.additionalItems == True:
                             return True
                         else:
-                            return s1.additionalItems.isSubtype(s2.additionalItems)
+                            return (yield s1.additionalItems, s2.additionalItems)
                     elif len1 > len2:
                         diff = len1 - len2
                         for i in range(len1-diff, len1):
@@ -902,7 +1394,7 @@ class JSONTypeArray(JSONschema):
                                 return False
                             elif s2.additionalItems == True:
                                 return True
-                            elif not s1.items_[i].isSubtype(s2.additionalItems):
+                            elif not (yield s1.items_[i], s2.additionalItems):
                                 print_db("9999")
                                 return False
                         print_db("8888")
@@ -914,9 +1406,9 @@ class JSONTypeArray(JSONschema):
                                 return True
                             elif s1.additionalItems == True:
                                 return False
-                            elif not s1.additionalItems.isSubtype(s2.items_[i]):
+                            elif not (yield s1.additionalItems, s2.items_[i]):
                                 return False
-                        return s1.additionalItems.isSubtype(s2.additionalItems)
+                        return (yield s1.additionalItems, s2.additionalItems)
 
         return super().isSubtype_handle_rhs(s, _isArraySubtype)
 
@@ -931,6 +1423,12 @@ class JSONTypeArray(JSONschema):
 
 class JSONTypeObject(JSONschema):
 
+    # _keyMatcher matches property names against patternProperties;
+    # it is built on first use and kept once interned.
+    __slots__ = ("properties", "additionalProperties", "required",
+                 "minProperties", "maxProperties", "dependencies", "patternProperties",
+                 "_keyMatcher")
+
     kw_defaults = {"properties": {}, "additionalProperties": JSONtop(), "required": [],
                    "minProperties": 0, "maxProperties": I.inf, "dependencies": {}, "patternProperties": {}}
 
@@ -953,18 +1451,14 @@ class JSONTypeObject(JSONschema):
         def required_is_uninhabited(s):
             ''' checks if every required key is actually allowed 
                 by the key restrictions '''
-            if s.additionalProperties:
+            if not is_bot(s.additionalProperties):
                 return False
 
             for k in s.required:
-                if not k in s.properties.keys():
-                    for k_ in s.patternProperties.keys():
-                        if utils.regex_matches_string(k_, k):
-                            break
-                    else:
-                        # here, inner loop finished and key was not found;
-                        # so it is uninhabited because a required key is not allowed
-                        return True
+                if not k in s.properties.keys() and not s.patternsFor(k):
+                    # the key was not found;
+                    # so it is uninhabited because a required key is not allowed
+                    return True
 
             return False
 
@@ -972,6 +1466,45 @@ class JSONTypeObject(JSONschema):
             or len(self.required) > self.maxProperties \
             or required_is_uninhabited(self)
 
+    def _accepts(self, i):
+        if not utils.is_dict(i) or len(i) not in self.interval:
+            return False
+        if not set(self.required).issubset(i.keys()):
+            return False
+        for k, v in i.items():
+            schemas = []
+            if k in self.properties.keys():
+                schemas.append(self.properties[k])
+            schemas.extend(self.patternProperties[p] for p in self.patternsFor(k))
+            if not schemas:
+                schemas.append(self.additionalProperties)
+            for s in schemas:
+                if utils.is_bool(s):
+                    if not s:
+                        return False
+                elif not s.accepts(v):
+                    return False
+        for k, dep in self.dependencies.items():
+            if k in i.keys():
+                if utils.is_list(dep):
+                    if not set(dep).issubset(i.keys()):
+                        return False
+                elif not dep.accepts(i):
+                    return False
+        return True
+
+    def patternsFor(self, k):
+        ''' Patterns of patternProperties which match property name k. '''
+        if not self.patternProperties:
+            return ()
+        m = getattr(self, "_keyMatcher", None)
+        if m is None or m.stale():
+            m = utils.key_matcher(tuple(self.patternProperties))
+            # the patterns of a mutable node may still change.
+            if self._frozen:
+                object.__setattr__(self, "_keyMatcher", m)
+        return m.matches(k)
+
     def updateInternalState(self):
         self.compute_actual_min_max_Properties()
         self.interval = I.closed(self.minProperties, self.maxProperties)
@@ -1028,7 +1561,7 @@ class JSONTypeObject(JSONschema):
                     and s1.patternProperties == s2.patternProperties \
                     and (s1.additionalProperties == s2.additionalProperties
                          or (utils.is_dict(s1.additionalProperties)
-                             and s1.additionalProperties.isSubtype(s2.additionalProperties))):
+                             and (yield s1.additionalProperties, s2.additionalProperties))):
                     print_db("__01__")
                     return True
             #
@@ -1038,14 +1571,11 @@ class JSONTypeObject(JSONschema):
                     that key schema has to match all corresponding patterns schemas.
                 '''
                 if k in s.properties.keys():
-                    return [k.properties[k]]
+                    return [s.properties[k]]
                 else:
-                    ret = []
-                    for k_ in s.patternProperties.keys():
-                        if utils.regex_matches_string(k_, k):
-                            # in case a key has to be checked against patternProperties,
-                            # it has to adhere to all schemas which have pattern matching the key.
-                            ret.append(k.patternProperties[k_])
+                    # in case a key has to be checked against patternProperties,
+                    # it has to adhere to all schemas which have pattern matching the key.
+                    ret = [s.patternProperties[k_] for k_ in s.patternsFor(k)]
                     if ret:
                         return ret
 
@@ -1065,9 +1595,9 @@ class JSONTypeObject(JSONschema):
                 for k in set(s1.required).intersection(s2.required):
                     for lhs_ in get_schema_for_key(k, s1):
                         for rhs_ in get_schema_for_key(k, s2):
-                            if lhs_:
-                                if rhs_:
-                                    if not lhs_.isSubtype(rhs_):
+                            if not is_bot(lhs_):
+                                if not is_bot(rhs_):
+                                    if not (yield lhs_, rhs_):
                                         print_db("__03__")
                                         return False
                                 else:
@@ -1107,18 +1637,15 @@ class JSONTypeObject(JSONschema):
             #     print_db("__05__")
             #     return False
 
-            extra_keys_on_rhs = set(s2.properties.keys()).difference(s1.properties.keys())
-            for k in extra_keys_on_rhs.copy():
-                for k_ in s1.patternProperties.keys():
-                    if utils.regex_matches_string(k_, k):
-                        extra_keys_on_rhs.remove(k)
+            extra_keys_on_rhs = set(k for k in s2.properties.keys()
+                                    if k not in s1.properties.keys() and not s1.patternsFor(k))
             if extra_keys_on_rhs:
-                if not s1.additionalProperties:
+                if is_bot(s1.additionalProperties):
                     print_db("__05__")
                     return False
                 else:
                     for k in extra_keys_on_rhs:
-                        if not s1.additionalProperties.isSubtype(s2.properties[k]):
+                        if not (yield s1.additionalProperties, s2.properties[k]):
                             print_db("__06__")
                             return False
 
@@ -1128,15 +1655,13 @@ class JSONTypeObject(JSONschema):
                     if utils.regex_isSubset(k, k_):
                         extra_patterns_on_rhs.remove(k)
             if extra_patterns_on_rhs:
-                if not s1.additionalProperties:
+                if is_bot(s1.additionalProperties):
                     print_db("__07__")
                     return False
                 else:
                     for k in extra_patterns_on_rhs:
-                        if not s1.additionalProperties.isSubtype(s2.patternProperties[k]):
-                            try: # means regex k is infinite
-                                parse(k).cardinality()
-                            except OverflowError:
+                        if not (yield s1.additionalProperties, s2.patternProperties[k]):
+                            if utils.regex_is_infinite(k):
                                 print_db("__08__")
                                 return False
             #
@@ -1161,17 +1686,16 @@ class JSONTypeObject(JSONschema):
             for k in s1.properties.keys():
                 if k in s2.properties.keys():
                     unmatched_lhs_props_keys.discard(k)
-                    if not s1.properties[k].isSubtype(s2.properties[k]):
+                    if not (yield s1.properties[k], s2.properties[k]):
                         return False
                 # for the remaining keys, make sure they either don't exist
                 # in rhs or if they, then their schemas should be sub-type
                 else:
-                    for k_ in s2.patternProperties:
-                        # if utils.regex_isSubset(k, k_):
-                        if utils.regex_matches_string(k_, k):
-                            unmatched_lhs_props_keys.discard(k)
-                            if not s1.properties[k].isSubtype(s2.patternProperties[k_]):
-                                return False
+                    # if utils.regex_isSubset(k, k_):
+                    for k_ in s2.patternsFor(k):
+                        unmatched_lhs_props_keys.discard(k)
+                        if not (yield s1.properties[k], s2.patternProperties[k_]):
+                            return False
 
             # second, matching patternProperties should be subtype pairwise
             unmatched_lhs_pProps_keys = set(s1.patternProperties.keys())
@@ -1179,7 +1703,7 @@ class JSONTypeObject(JSONschema):
                 for k_ in s2.patternProperties.keys():
                     if utils.regex_isSubset(k_, k):
                         unmatched_lhs_pProps_keys.discard(k)
-                        if not s1.patternProperties[k].isSubtype(s2.patternProperties[k_]):
+                        if not (yield s1.patternProperties[k], s2.patternProperties[k_]):
                             return False
             # third,
 
@@ -1187,7 +1711,7 @@ class JSONTypeObject(JSONschema):
             if s2.additionalProperties == True:
                 return True
             elif s2.additionalProperties == False:
-                if s1.additionalProperties == True:
+                if not is_bot(s1.additionalProperties):
                     return False
                 elif unmatched_lhs_props_keys or unmatched_lhs_pProps_keys:
                     return False
@@ -1195,17 +1719,17 @@ class JSONTypeObject(JSONschema):
                     return True
             else:
                 for k in unmatched_lhs_props_keys:
-                    if not s1.properties[k].isSubtype(s2.additionalProperties):
+                    if not (yield s1.properties[k], s2.additionalProperties):
                         return False
                 for k in unmatched_lhs_pProps_keys:
-                    if not s1.patternProperties[k].isSubtype(s2.additionalProperties):
+                    if not (yield s1.patternProperties[k], s2.additionalProperties):
                         return False
                 if s1.additionalProperties == True:
                     return False
                 elif s1.additionalProperties == False:
                     return True
                 else:
-                    return s1.additionalProperties.isSubtype(s2.additionalProperties)
+                    return (yield s1.additionalProperties, s2.additionalProperties)
 
         return super().isSubtype_handle_rhs(s, _isObjectSubtype)
 
@@ -1219,31 +1743,92 @@ class JSONTypeObject(JSONschema):
 
 
 def JSONanyOfFactory(s):
-    pass
+    ''' anyOf of the branches of s, or top if one of them is top. '''
+    ret = JSONanyOf(s)
+    if any(is_top(i) for i in ret.anyOf):
+        return JSONtop()
+    return ret
+
+
+# Json types whose instances may also be of each json type.
+_overlappingTypes = {t: (t,) for t in definitions.Jtypes}
+_overlappingTypes.update({"integer": ("integer", "number"), "number": ("number", "integer")})
 
 
 class JSONanyOf(JSONschema):
 
+    # _byType maps each json type to the branches which may overlap with
+    # schemas of that type; it is filled in on use, once interned.
+    __slots__ = ("anyOf", "_byType")
+
     kw_defaults = {"type": "anyOf"}
 
     def __init__(self, s):
         super().__init__(s)
 
+    __hash__ = JSONschema.__hash__
+
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, JSONanyOf):
+            # Interned nodes are equal only if they are the same object.
+            if self._frozen and other._frozen:
+                return False
             return tuple(sorted(d.items()) for d in self.anyOf) == tuple(sorted(d.items() for d in other.anyOf))
         else:
             return super().__eq__(other)
 
     def updateInternalState(self):
-        for d_i in self.anyOf:
-            if "anyOf" in d_i.keys():
-                self.anyOf.extend(d_i.get("anyOf"))
-                self.anyOf.remove(d_i)
+        # Flatten nested anyOfs, which are flat themselves by now, and
+        # drop empty branches, which no rule expects on the rhs.
+        # Removing them while iterating would skip their neighbours.
+        if any("anyOf" in d_i.keys() or is_bot(d_i) for d_i in self.anyOf):
+            flat = []
+            for d_i in self.anyOf:
+                if "anyOf" in d_i.keys():
+                    flat.extend(d_i.get("anyOf"))
+                elif not is_bot(d_i):
+                    flat.append(d_i)
+            self.anyOf[:] = flat
 
     def _isUninhabited(self):
         return all(is_bot(i) for i in self.anyOf)
 
+    def _accepts(self, i):
+        return any(s.accepts(i) for s in self.anyOf)
+
+    def branchesFor(self, s):
+        ''' Branches of this anyOf, in order, but without those of a json
+            type which no instance of schema s has. Meets of s with them
+            are empty and s is no subtype of them, so they can be skipped.
+            Complements among the branches are expanded in their place,
+            but only into the json types of s. '''
+        t = getattr(s, "type", None)
+        if t not in definitions.Jtypes:
+            return self.anyOf
+        try:
+            index = self._byType
+        except AttributeError:
+            index = {}
+            # the branches of a mutable node may still change.
+            if self._frozen:
+                object.__setattr__(self, "_byType", index)
+        if t in index:
+            return index[t]
+
+        ret = []
+        since = noted()
+        for b in self.anyOf:
+            if isinstance(b, JSONnot):
+                ret.extend(b.branchesFor(s))
+            elif getattr(b, "type", None) not in definitions.Jtypes \
+                    or b.type in _overlappingTypes[t]:
+                ret.append(b)
+        if noted() == since:
+            index[t] = ret
+        return ret
+
     def _meet(self, s):
 
         return super().meet_handle_rhs(s, JSONanyOf._meetAnyOf)
@@ -1251,7 +1836,7 @@ class JSONanyOf(JSONschema):
     @staticmethod
     def _meetAnyOf(s1, s2):
         anyofs = []
-        for i in s1.anyOf:
+        for i in s1.branchesFor(s2):
             tmp = i.meet(s2)
             if not is_bot(tmp):
                 anyofs.append(tmp)
@@ -1267,7 +1852,7 @@ class JSONanyOf(JSONschema):
 
         def _isAnyofSubtype(s1, s2):
             for s in s1.anyOf:
-                if not s.isSubtype(s2):
+                if not (yield s, s2):
                     return False
             return True
 
@@ -1275,6 +1860,11 @@ class JSONanyOf(JSONschema):
 
 
 def JSONallOfFactory(s):
+    # Recursive $refs are only resolved once their definition is
+    # canonicalized, so they can't be met yet.
+    if any(is_deferred(i) for i in s.get("allOf")):
+        return JSONallOf(s)
+
     ret = JSONtop()
     for i in s.get("allOf"):
         ret = ret.meet(i)
@@ -1284,6 +1874,8 @@ def JSONallOfFactory(s):
 
 class JSONallOf(JSONschema):
 
+    __slots__ = ("allOf",)
+
     kw_defaults = {"type": "allOf"}
 
     def __init__(self, s):
@@ -1292,6 +1884,9 @@ class JSONallOf(JSONschema):
     def _isUninhabited(self):
         return any(is_bot(i) for i in self.allOf)
 
+    def _accepts(self, i):
+        return all(s.accepts(i) for s in self.allOf)
+
     def _meet(self, s):
         allofs = []
         for i in self.allOf:
@@ -1303,7 +1898,7 @@ class JSONallOf(JSONschema):
 
         def _isAllOfSubtype(self, s2):
             for s in self.allOf:
-                if not s.isSubtype(s2):
+                if not (yield s, s2):
                     return False
             return True
 
@@ -1312,6 +1907,8 @@ class JSONallOf(JSONschema):
 
 class JSONoneOf(JSONschema):
 
+    __slots__ = ("oneOf",)
+
     kw_defaults = {"type": "oneOf"}
 
     def __init__(self, s):
@@ -1320,6 +1917,9 @@ class JSONoneOf(JSONschema):
     def _isUninhabited(self):
         return all(is_bot(i) for i in self.oneOf)
 
+    def _accepts(self, i):
+        return [s.accepts(i) for s in self.oneOf].count(True) == 1
+
     def _meet(self, s):
         pass
 
@@ -1338,6 +1938,14 @@ def JSONnotFactory(s):
 
 
 class JSONnot(JSONschema):
+    ''' The complement of the canonical schema of a single json type
+        under "not". Rather than an anyOf of all other json types and the
+        negation of that type, the complement is only expanded one json
+        type at a time, when a meet or subtype check reaches it. '''
+
+    # _byType maps each json type expanded so far to the branches of
+    # the complement of that type; it is only kept once interned.
+    __slots__ = ("_byType",)
 
     kw_defaults = {"type": "not"}
 
@@ -1345,13 +1953,139 @@ class JSONnot(JSONschema):
         super().__init__(s)
 
     def _isUninhabited(self):
-        pass
+        # the complement of one json type holds all the others.
+        return False
+
+    def _accepts(self, i):
+        return not self["not"].accepts(i)
+
+    def _typeBranches(self, t):
+        try:
+            index = self._byType
+        except AttributeError:
+            index = {}
+            # the negated schema of a mutable node may still change.
+            if self._frozen:
+                object.__setattr__(self, "_byType", index)
+        if t in index:
+            return index[t]
+
+        s = self["not"]
+        since = noted()
+        if s.type == t:
+            ret = negTypeToConstructor.get(t)(s)
+        else:
+            ret = typeToConstructor.get(t)({"type": t})
+        if ret is None:
+            ret = []
+        elif isinstance(ret, JSONanyOf):
+            ret = ret.anyOf
+        else:
+            ret = [ret]
+        ret = [intern_schema(i) for i in ret]
+        # complements of approximated patterns have to be noted again
+        # by every check which uses them.
+        if noted() == since:
+            index[t] = ret
+        return ret
+
+    def _types(self):
+        # the negated json type last, as its complement is the dearest.
+        t = self["not"].type
+        return [t_i for t_i in definitions.Jtypes if t_i != t] + [t]
+
+    def branchesFor(self, s):
+        ''' Branches of the complement which schema s may share instances
+            with, as in JSONanyOf.branchesFor. Only the json types of
+            these are expanded. '''
+        t = getattr(s, "type", None)
+        types = _overlappingTypes.get(t) or self._types()
+        return [i for t_i in types for i in self._typeBranches(t_i)]
+
+    def complement(self):
+        ''' The complement, expanded into an anyOf of all json types. '''
+        return JSONanyOf({"anyOf": self.branchesFor(None)})
 
     def _meet(self, s):
-        pass
+
+        return super().meet_handle_rhs(s, JSONanyOf._meetAnyOf)
 
     def _isSubtype(self, s):
-        sys.exit("not is not supported yet.")
+
+        def _isNotSubtype(s1, s2):
+            for t in s1._types():
+                for i in s1._typeBranches(t):
+                    if not (yield i, s2):
+                        return False
+            return True
+
+        return _isNotSubtype(self, s)
+
+
+class JSONref(JSONschema):
+    ''' A $ref to a recursive definition within the schema document
+        identified by document. The referenced canonical schema is only
+        looked at when needed, so recursive definitions are never unfolded.
+        Non-recursive $refs don't need this; they are replaced by the
+        canonical form of their definition right away. '''
+
+    __slots__ = ("_document", "_target")
+
+    kw_defaults = {"type": "$ref"}
+
+    def __init__(self, s, document):
+        super().__init__(s)
+        object.__setattr__(self, "_document", document)
+        object.__setattr__(self, "_target", None)
+
+    def isResolved(self):
+        return self._target is not None
+
+    def resolve(self, target):
+        object.__setattr__(self, "_target", target)
+
+    def _isUninhabited(self):
+        # can't tell before the definition is resolved.
+        return False
+
+    def _accepts(self, i):
+        return deref(self).accepts(i)
+
+    def __reduce__(self):
+        # The target is restored as state, so that pickle
+        # handles cycles through recursive definitions.
+        return (_restore_ref, (dict(self), self._document), self._target)
+
+    def __setstate__(self, target):
+        self.resolve(target)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _restore_ref(items, document):
+    return JSONref(items, document)
+
+
+def is_deferred(s):
+    ''' Does s hold a $ref which is not resolved yet? '''
+    return isinstance(s, JSONallOf) \
+        or (isinstance(s, JSONref) and not s.isResolved())
+
+
+def deref(s):
+    ''' The schema referenced by s if it is a JSONref, otherwise s itself. '''
+    seen = set()
+    while isinstance(s, JSONref):
+        if id(s) in seen or not s.isResolved():
+            raise utils.SchemaRefError(
+                "Can't resolve {} to a schema.".format(s["$ref"]))
+        seen.add(id(s))
+        s = s._target
+    return s
 
 
 typeToConstructor = {
@@ -1375,7 +2109,7 @@ negTypeToConstructor = {
 }
 
 boolToConstructor = {
-    "anyOf": JSONanyOf,
+    "anyOf": JSONanyOfFactory,
     "allOf": JSONallOfFactory,
     # "oneOf": JSONoneOf,
     # "not": JSONnotFactory
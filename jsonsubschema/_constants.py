@@ -29,3 +29,11 @@ Jmeta = set(["$schema", "$id", "$ref", "definitions", "title", "description"])
 
 Jkeywords = Jcommonkw.union(Jtypes,
                             reduce(operator.add, JtypesToKeywords.values()))
+
+# Draft4 keywords whose value is a subschema, a list of subschemas,
+# or a dict of subschemas respectively.
+Jsubschema = set(["not", "items", "additionalItems", "additionalProperties"])
+
+JsubschemaLists = set(["allOf", "anyOf", "oneOf", "items"])
+
+JsubschemaDicts = set(["properties", "patternProperties", "dependencies", "definitions"])
@@ -0,0 +1,267 @@
+'''
+Created on October 18, 2026
+'''
+
+import json
+import math
+
+import intervals as I
+
+import jsonsubschema.config as config
+import jsonsubschema._utils as utils
+from jsonsubschema._budget import checkpoint
+from jsonsubschema._checkers import (
+    JSONTypeArray,
+    JSONTypeBoolean,
+    JSONTypeInteger,
+    JSONTypeNull,
+    JSONTypeNumber,
+    JSONTypeObject,
+    JSONTypeString,
+    JSONallOf,
+    JSONanyOf,
+    JSONbot,
+    JSONnot,
+    JSONschema,
+    JSONtop,
+    deref,
+    is_bot
+)
+from jsonsubschema._trace import (
+    kind,
+    span
+)
+
+
+class Refuted:
+    ''' Verdict of a subschema check refuted by an instance of the lhs
+        which the rhs rejects. It is falsy and equal to False, so it can
+        be used wherever a False verdict is expected. '''
+
+    __slots__ = ("witness",)
+
+    def __init__(self, witness):
+        self.witness = witness
+
+    def __bool__(self):
+        return False
+
+    def __eq__(self, other):
+        return other is False or isinstance(other, Refuted)
+
+    def __hash__(self):
+        return hash(False)
+
+    def __reduce__(self):
+        return (Refuted, (self.witness,))
+
+    def __repr__(self):
+        return "Refuted({!r})".format(self.witness)
+
+
+# Longest arrays built as samples.
+_MAX_LENGTH = 64
+
+
+def _finite(x):
+    return x not in (I.inf, -I.inf)
+
+
+def _integers(lower, upper, multipleOf=None):
+    ''' Integers at, next to and in between the bounds. '''
+    ret = [0, 1, -1]
+    for b in (lower, upper):
+        if _finite(b):
+            b = math.floor(b)
+            ret.extend((b, b + 1, b - 1))
+    if _finite(lower) and _finite(upper):
+        ret.append((math.floor(lower) + math.floor(upper)) // 2)
+    if multipleOf:
+        m = multipleOf
+        for b in (lower, upper):
+            if _finite(b):
+                ret.extend((math.ceil(b / m) * m, math.floor(b / m) * m))
+        ret.extend((m, -m))
+        ret = [int(i) if float(i).is_integer() else i for i in ret]
+    return ret
+
+
+def _numbers(s):
+    lower, upper = s.interval.lower, s.interval.upper
+    # a fraction early on, for the sake of integer rhs.
+    ret = [0, 0.5] + _integers(lower, upper, s.multipleOf)
+    for b in (lower, upper):
+        if _finite(b):
+            ret.extend((b, b + 0.5, b - 0.5))
+    if _finite(lower) and _finite(upper):
+        ret.append((lower + upper) / 2)
+    return ret
+
+
+def _strings(s, limit):
+    if s.pattern is None or s.minLength > s.maxLength:
+        return []
+    return utils.regex_sample(s.pattern, s.minLength, s.maxLength, limit)
+
+
+def _value_samples(s, limit, depth):
+    ''' Samples of the subschema s, which may also be a boolean. '''
+    if s is True:
+        s = JSONtop()
+    elif s is False:
+        return []
+    return sample(s, limit, depth)
+
+
+def _arrays(s, limit, depth):
+    if s.minItems > _MAX_LENGTH:
+        return []
+    ret = []
+    max_length = min(s.maxItems, s.minItems + 2)
+    if utils.is_list(s.items_) and is_bot(s.additionalItems):
+        max_length = min(max_length, len(s.items_))
+    for n in range(s.minItems, int(max_length) + 1):
+        columns = []
+        for idx in range(n):
+            if utils.is_dict(s.items_):
+                sub = s.items_
+            elif idx < len(s.items_):
+                sub = s.items_[idx]
+            else:
+                sub = s.additionalItems
+            column = _value_samples(sub, max(2, n) if s.uniqueItems else 2, depth - 1)
+            if not column:
+                break
+            columns.append(column)
+        else:
+            # positions take turns over their samples, so that
+            # items differ wherever there are samples enough.
+            for k in range(2):
+                ret.append([c[(k + idx) % len(c)] for idx, c in enumerate(columns)])
+        if len(ret) >= limit:
+            break
+    return ret
+
+
+def _property_schema(s, k):
+    if k in s.properties:
+        return s.properties[k]
+    for p in s.patternsFor(k):
+        return s.patternProperties[p]
+    return s.additionalProperties
+
+
+def _objects(s, limit, depth):
+    base = {}
+    for k in s.required:
+        values = _value_samples(_property_schema(s, k), 1, depth - 1)
+        if not values:
+            return []
+        base[k] = values[0]
+    ret = [base]
+    for k, sub in s.properties.items():
+        if len(ret) >= limit:
+            break
+        if k not in base:
+            for v in _value_samples(sub, 1, depth - 1):
+                ret.append(dict(base, **{k: v}))
+    return ret
+
+
+def _candidates(s, limit, depth):
+    if s.hasEnum():
+        return list(s.enum)
+    if isinstance(s, JSONtop):
+        return [None, True, 0, 0.5, "", [], {}]
+    if isinstance(s, JSONbot):
+        return []
+    if isinstance(s, JSONTypeString):
+        return _strings(s, limit)
+    if isinstance(s, JSONTypeInteger):
+        return _integers(s.interval.lower, s.interval.upper, s.multipleOf)
+    if isinstance(s, JSONTypeNumber):
+        return _numbers(s)
+    if isinstance(s, JSONTypeBoolean):
+        return [True, False]
+    if isinstance(s, JSONTypeNull):
+        return [None]
+    if isinstance(s, JSONTypeArray):
+        return _arrays(s, limit, depth)
+    if isinstance(s, JSONTypeObject):
+        return _objects(s, limit, depth)
+    if isinstance(s, (JSONanyOf, JSONnot)):
+        branches = [sample(s_i, limit, depth) for s_i in s.branchesFor(None)]
+        # round robin, so that every branch gets its turn.
+        return [b[k] for k in range(limit) for b in branches if k < len(b)]
+    if isinstance(s, JSONallOf):
+        return [i for s_i in s.allOf for i in sample(s_i, limit, depth)]
+    # oneOf is left to the symbolic check.
+    return []
+
+
+def sample(s, limit=8, depth=3):
+    ''' Up to limit json instances of canonical schema s: boundary numbers
+        of its intervals, shortest strings of its patterns, minimal arrays
+        and objects, looking at most depth levels deep. Every instance is
+        accepted by s; there may well be none even if s is inhabited. '''
+    if depth <= 0:
+        return []
+    checkpoint("sample")
+    try:
+        s = deref(s)
+        candidates = _candidates(s, limit, depth)
+    except (utils.SchemaRefError, RecursionError):
+        return []
+
+    ret = []
+    seen = set()
+    for i in candidates:
+        key = json.dumps(i, sort_keys=True)
+        if key in seen:
+            continue
+        seen.add(key)
+        try:
+            ok = s.accepts(i)
+        except Exception:
+            ok = False
+        if ok:
+            ret.append(i)
+            if len(ret) >= limit:
+                break
+    return ret
+
+
+def _validates(s, i):
+    ''' Does config.VALIDATOR accept instance i for json schema s,
+        which may be in canonical form? None if it can't tell. '''
+    if isinstance(s, JSONschema):
+        s = s.to_json()
+    try:
+        return config.VALIDATOR(s).is_valid(i)
+    except Exception:
+        return None
+
+
+def refute(s1, s2, limit=8, raw=None):
+    ''' Refuted(witness) for some sampled instance witness of
+        canonical schema s1 which canonical schema s2 rejects, or None.
+        raw optionally holds the schemas (r1, r2) which s1 and s2 are the
+        canonical forms of; a witness is then only taken if
+        config.VALIDATOR accepts it for r1 and rejects it for r2. '''
+    if not isinstance(s1, JSONschema) or not isinstance(s2, JSONschema):
+        return None
+    with span("refute", lhs=kind(s1), rhs=kind(s2)) as sp:
+        instances = sample(s1, limit)
+        sp.set(samples=len(instances))
+        for i in instances:
+            try:
+                rejected = not s2.accepts(i)
+            except Exception:
+                continue
+            if rejected and raw is not None:
+                r1, r2 = raw
+                rejected = _validates(r1, i) is True and _validates(r2, i) is False
+            if rejected:
+                sp.set(refuted=True)
+                return Refuted(i)
+        return None
@@ -0,0 +1,130 @@
+'''
+Created on October 18, 2026
+'''
+
+import hashlib
+import importlib.metadata
+import os
+import pickle
+import sqlite3
+
+import greenery
+import intervals as I
+
+import jsonsubschema.config as config
+from jsonsubschema._budget import critical
+
+
+_library_version = None
+
+
+def library_version():
+    ''' Digest of the source code of this package. Canonical forms
+        stored by any other version of the code are never reused. '''
+    global _library_version
+    if _library_version is None:
+        h = hashlib.sha1()
+        pkg = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(pkg)):
+            if name.endswith(".py"):
+                h.update(name.encode("utf-8"))
+                with open(os.path.join(pkg, name), "rb") as f:
+                    h.update(f.read())
+        _library_version = h.hexdigest()
+    return _library_version
+
+
+def _version(module, distribution):
+    # greenery has no __version__, only its distribution metadata.
+    try:
+        return getattr(module, "__version__", None) or importlib.metadata.version(distribution)
+    except importlib.metadata.PackageNotFoundError:
+        return ""
+
+
+def config_key():
+    ''' The configuration the canonical form of a schema depends on. '''
+    return "{}.{}|{}|intervals-{}|greenery-{}".format(
+        config.VALIDATOR.__module__, config.VALIDATOR.__name__,
+        config.VALIDATOR.META_SCHEMA.get("$schema", ""),
+        _version(I, "python-intervals"), _version(greenery, "greenery"))
+
+
+class CanonicalStore:
+    ''' Canonical forms of schemas kept in a sqlite database at path,
+        keyed by the structural hash of the schema, the library version
+        and the configuration. The database is in WAL mode, so any number
+        of processes can read and write it at the same time.
+        Canonical forms are stored pickled; only use stores you trust. '''
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.pid = os.getpid()
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS canonical ("
+            " content TEXT NOT NULL, version TEXT NOT NULL, config TEXT NOT NULL,"
+            " form BLOB NOT NULL, PRIMARY KEY (content, version, config))")
+
+    @critical
+    def get(self, key):
+        ''' The canonical form stored for the schema with structural hash key,
+            or None. The result is not interned yet. '''
+        row = self._conn.execute(
+            "SELECT form FROM canonical WHERE content = ? AND version = ? AND config = ?",
+            (key, library_version(), config_key())).fetchone()
+        if row is not None:
+            try:
+                ret = pickle.loads(row[0])
+            except Exception:
+                # e.g. a truncated entry; it will just be overwritten.
+                ret = None
+            if ret is not None:
+                self.hits += 1
+                return ret
+        self.misses += 1
+        return None
+
+    @critical
+    def put(self, key, s):
+        ''' Stores canonical form s of the schema with structural hash key.
+            Returns False if s can't be pickled, e.g. when nested too deeply. '''
+        try:
+            form = pickle.dumps(s, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, RecursionError, TypeError):
+            return False
+        self._conn.execute(
+            "INSERT OR REPLACE INTO canonical VALUES (?, ?, ?, ?)",
+            (key, library_version(), config_key(), form))
+        return True
+
+    def clear(self):
+        self._conn.execute("DELETE FROM canonical")
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM canonical").fetchone()[0]
+
+
+# Connection to config.CANONICAL_STORE of this process.
+_store = None
+
+
+def get_store():
+    ''' The CanonicalStore at config.CANONICAL_STORE, or None if that is not set.
+        Every process opens its own connection. '''
+    global _store
+    path = config.CANONICAL_STORE
+    if path is None:
+        return None
+    if _store is None or _store.path != path or _store.pid != os.getpid():
+        _store = CanonicalStore(path)
+    return _store
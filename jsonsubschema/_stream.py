@@ -0,0 +1,322 @@
+'''
+Created on October 18, 2026
+'''
+
+import codecs
+import json
+import json.decoder
+import json.scanner
+import re
+
+import jsonsubschema.config as config
+import jsonsubschema._constants as definitions
+import jsonsubschema._utils as utils
+from jsonsubschema._checkers import JSONschema, intern_schema
+from jsonsubschema._canoncalization import (
+    canoncalize_bottom_up,
+    canoncalize_json,
+    canonical_keywords
+)
+
+
+# Parsing events
+START_MAP, END_MAP, START_ARRAY, END_ARRAY, KEY, VALUE = range(6)
+
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+_delimiter = re.compile(r"[ \t\n\r,\]}]")
+
+_literals = {"true": True, "false": False, "null": None}
+
+
+class _Reader:
+    ''' Buffered character reader over a text or binary file.
+        Consumed text is dropped whenever a new chunk is read in. '''
+
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = None
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        # position of buf[0] within the whole text.
+        self.offset = 0
+        self.lineno = 1
+        self.colno = 1
+
+    def fill(self):
+        ''' Reads the next chunk. Returns False at the end of the file. '''
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        if isinstance(chunk, bytes):
+            if self.decoder is None:
+                self.decoder = codecs.getincrementaldecoder("utf-8")()
+            chunk = self.decoder.decode(chunk, final=self.eof)
+
+        dropped = self.buf[:self.pos]
+        newlines = dropped.count("\n")
+        if newlines:
+            self.lineno += newlines
+            self.colno = len(dropped) - dropped.rfind("\n")
+        else:
+            self.colno += len(dropped)
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return not self.eof
+
+    def peek(self):
+        ''' The next non-whitespace character, or "" at the end of the file. '''
+        while True:
+            self.pos = _whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, c):
+        if self.peek() != c:
+            raise self.error("Expecting '{}' delimiter".format(c))
+        self.pos += 1
+
+    def string(self):
+        ''' Reads the json string starting at the current position. '''
+        while True:
+            try:
+                s, end = json.decoder.scanstring(self.buf, self.pos + 1, True)
+            except json.JSONDecodeError:
+                # may just be cut off at the end of the chunk.
+                if self.fill():
+                    continue
+                raise self.error("Unterminated string starting at")
+            self.pos = end
+            return s
+
+    def scalar(self):
+        ''' Reads the json number, string or literal at the current position. '''
+        c = self.peek()
+        if c == '"':
+            return self.string()
+        # numbers and literals must not be cut off at the end of the chunk.
+        while not _delimiter.search(self.buf, self.pos) and self.fill():
+            pass
+        m = json.scanner.NUMBER_RE.match(self.buf, self.pos)
+        if m:
+            self.pos = m.end()
+            integer, frac, exp = m.groups()
+            if frac or exp:
+                return float(integer + (frac or "") + (exp or ""))
+            return int(integer)
+        for literal, value in _literals.items():
+            if self.buf.startswith(literal, self.pos):
+                self.pos += len(literal)
+                return value
+        raise self.error("Expecting value")
+
+    def error(self, msg):
+        ''' JSONDecodeError at the current position within the whole text. '''
+        pos = self.offset + self.pos
+        lineno = self.lineno + self.buf.count("\n", 0, self.pos)
+        if "\n" in self.buf[:self.pos]:
+            colno = self.pos - self.buf.rfind("\n", 0, self.pos)
+        else:
+            colno = self.colno + self.pos
+        err = json.JSONDecodeError(msg, self.buf, self.pos)
+        err.pos, err.lineno, err.colno = pos, lineno, colno
+        err.args = ("{}: line {} column {} (char {})".format(msg, lineno, colno, pos),)
+        return err
+
+
+def iter_json_events(fp, chunk_size=65536):
+    ''' Parses the json document in file fp incrementally, reading
+        chunk_size characters at a time. Yields (event, value) pairs,
+        where event is one of START_MAP, END_MAP, START_ARRAY, END_ARRAY,
+        KEY or VALUE, and value is the key or the scalar value. '''
+
+    r = _Reader(fp, chunk_size)
+    # kinds of the open containers; True for objects.
+    stack = []
+    need_value = True
+    while True:
+        if need_value:
+            c = r.peek()
+            if c == "{":
+                r.pos += 1
+                yield START_MAP, None
+                if r.peek() == "}":
+                    r.pos += 1
+                    yield END_MAP, None
+                    need_value = False
+                else:
+                    stack.append(True)
+                    if r.peek() != '"':
+                        raise r.error("Expecting property name enclosed in double quotes")
+                    yield KEY, r.string()
+                    r.expect(":")
+                continue
+            elif c == "[":
+                r.pos += 1
+                yield START_ARRAY, None
+                if r.peek() == "]":
+                    r.pos += 1
+                    yield END_ARRAY, None
+                    need_value = False
+                else:
+                    stack.append(False)
+                continue
+            else:
+                yield VALUE, r.scalar()
+                need_value = False
+
+        if not stack:
+            if r.peek() != "":
+                raise r.error("Extra data")
+            return
+        c = r.peek()
+        if c == ",":
+            r.pos += 1
+            if stack[-1]:
+                if r.peek() != '"':
+                    raise r.error("Expecting property name enclosed in double quotes")
+                yield KEY, r.string()
+                r.expect(":")
+            need_value = True
+        elif c == "}" and stack[-1]:
+            r.pos += 1
+            stack.pop()
+            yield END_MAP, None
+        elif c == "]" and not stack[-1]:
+            r.pos += 1
+            stack.pop()
+            yield END_ARRAY, None
+        else:
+            raise r.error("Expecting ',' delimiter")
+
+
+# Roles of json values within a schema document.
+SCHEMA, SCHEMAS, SCHEMA_MAP, DATA = range(4)
+
+
+class _Frame:
+    ''' An open json object or array while loading a schema document. '''
+
+    __slots__ = ("value", "role", "key", "path", "depth", "relevant", "has_ref")
+
+    def __init__(self, value, role, path, depth, relevant):
+        self.value = value
+        self.role = role
+        self.key = None
+        self.path = path
+        self.depth = depth
+        self.relevant = relevant
+        self.has_ref = False
+
+
+def _child_role(parent, is_map):
+    if parent.role == SCHEMA:
+        k = parent.key
+        if is_map and k in definitions.Jsubschema:
+            return SCHEMA
+        elif is_map and k in definitions.JsubschemaDicts:
+            return SCHEMA_MAP
+        elif not is_map and k in definitions.JsubschemaLists:
+            return SCHEMAS
+    elif parent.role in (SCHEMAS, SCHEMA_MAP):
+        if is_map:
+            return SCHEMA
+    return DATA
+
+
+def _is_relevant(d, k):
+    ''' Is keyword k of the partially loaded schema d known to make it
+        into the canonical form of d? '''
+    if k == "definitions" or "$ref" in d:
+        return False
+    if k in definitions.Jconnectors:
+        return True
+    if "type" in d:
+        return k in canonical_keywords(d)
+    # decided once the whole of d is loaded.
+    return False
+
+
+def load_canonical(fp, chunk_size=65536):
+    ''' Loads, validates and canonicalizes the json schema document in file fp
+        in a single pass over its text. Every subschema is validated as soon
+        as it is parsed and, if its canonical form is already determined,
+        replaced by its canonical form right away. So raw and canonical forms
+        of the whole document never coexist in memory. Definitions,
+        subschemas holding $refs, and those whose parent's type is not yet
+        known are kept raw until the end of the document.
+        $refs are resolved against the subschemas as they were found at the
+        paths they point to, before any was replaced by its canonical form. '''
+
+    stack = []
+    root = []
+    # paths of subschemas, as tuples of strings, to the subschemas loaded there.
+    targets = {}
+    for event, value in iter_json_events(fp, chunk_size):
+        if event == KEY:
+            stack[-1].key = value
+            continue
+
+        parent = stack[-1] if stack else None
+        if event in (START_MAP, START_ARRAY):
+            is_map = event == START_MAP
+            if parent is None:
+                role, path, depth, relevant = SCHEMA, (), 0, True
+            else:
+                role = _child_role(parent, is_map)
+                if parent.role == SCHEMA:
+                    k = parent.key
+                    relevant = parent.relevant and _is_relevant(parent.value, k)
+                else:
+                    k = len(parent.value) if utils.is_list(parent.value) else parent.key
+                    relevant = parent.relevant
+                path = parent.path + (k,)
+                depth = parent.depth + (role == SCHEMA)
+                if depth > config.MAX_SCHEMA_DEPTH:
+                    raise utils.SchemaDepthError(
+                        "Schema is nested deeper than {} levels at: {}".format(
+                            config.MAX_SCHEMA_DEPTH, "/".join(map(str, path))))
+            stack.append(_Frame({} if is_map else [], role, path, depth, relevant))
+            continue
+
+        has_ref = False
+        if event in (END_MAP, END_ARRAY):
+            frame = stack.pop()
+            parent = stack[-1] if stack else None
+            value = frame.value
+            has_ref = frame.has_ref
+            if frame.role == SCHEMA:
+                has_ref = has_ref or "$ref" in value
+                utils.validate_schema_node(value, frame.path)
+                if frame.relevant and not has_ref:
+                    # interned right away, so that equal subschemas
+                    # all over the document are stored only once.
+                    try:
+                        canonical = intern_schema(canoncalize_bottom_up(value))
+                    except Exception:
+                        # left for the whole document to report.
+                        canonical = None
+                    if isinstance(canonical, JSONschema):
+                        value = canonical
+                targets[tuple(map(str, frame.path))] = value
+        elif parent is None:
+            # the whole document is a single value.
+            utils.validate_schema_node(value)
+
+        if parent is None:
+            root.append(value)
+        else:
+            parent.has_ref = parent.has_ref or has_ref
+            if utils.is_list(parent.value):
+                parent.value.append(value)
+            else:
+                parent.value[parent.key] = value
+
+    return canoncalize_json(root[0], targets)
@@ -0,0 +1,185 @@
+'''
+Created on October 18, 2026
+'''
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+import jsonsubschema.config as config
+
+
+_ids = itertools.count(1)
+
+# Spans open in the current thread, innermost last.
+_local = threading.local()
+
+
+def _active():
+    try:
+        return _local.spans
+    except AttributeError:
+        _local.spans = []
+        return _local.spans
+
+
+def kind(s):
+    ''' Node kind of schema s for span attributes, e.g. JSONTypeString. '''
+    return type(s).__name__
+
+
+class Span:
+    ''' A timed operation, emitted to config.TRACE_SINK once it ends. '''
+
+    __slots__ = ("name", "attrs", "id", "parent", "start", "duration")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.id = next(_ids)
+        self.parent = None
+        self.start = None
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        spans = _active()
+        if spans:
+            self.parent = spans[-1].id
+        spans.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        spans = _active()
+        if spans and spans[-1] is self:
+            spans.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        sink = config.TRACE_SINK
+        if sink is not None:
+            sink.emit(self.to_dict())
+        return False
+
+    def to_dict(self):
+        return {"name": self.name, "id": self.id, "parent": self.parent,
+                "start": self.start, "duration": self.duration,
+                "pid": os.getpid(), "tid": threading.get_ident(),
+                "attrs": self.attrs}
+
+
+class _NullSpan:
+    ''' Stands in for every span while tracing is disabled. '''
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+def span(name, **attrs):
+    ''' Span of the operation name, to be used as a context manager. '''
+    if config.TRACE_SINK is None:
+        return _null_span
+    return Span(name, attrs)
+
+
+def event(name, **attrs):
+    ''' Emits an instantaneous span. '''
+    sink = config.TRACE_SINK
+    if sink is not None:
+        s = Span(name, attrs)
+        spans = _active()
+        if spans:
+            s.parent = spans[-1].id
+        s.start = time.perf_counter()
+        s.duration = 0.0
+        sink.emit(s.to_dict())
+
+
+def traced(name, describe=None):
+    ''' Decorator tracing every call of a function as a span of the
+        operation name; describe maps the arguments to span attributes.
+        While tracing is disabled, this costs a single check per call. '''
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if config.TRACE_SINK is None:
+                return f(*args, **kwargs)
+            attrs = describe(*args, **kwargs) if describe is not None else {}
+            with Span(name, attrs):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MemorySink:
+    ''' Keeps spans as dicts in the list spans. '''
+
+    def __init__(self):
+        self.spans = []
+
+    def emit(self, record):
+        self.spans.append(record)
+
+    def close(self):
+        pass
+
+
+class JSONLSink:
+    ''' Writes one json line per span to a file, given as a path or file object. '''
+
+    def __init__(self, f):
+        self._owned = isinstance(f, (str, bytes, os.PathLike))
+        self.file = open(f, "a") if self._owned else f
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self.file.write(line)
+
+    def close(self):
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class ChromeTraceSink:
+    ''' Collects spans in the Chrome trace event format and writes them to
+        path on close, for chrome://tracing or Perfetto. '''
+
+    def __init__(self, path):
+        self.path = path
+        self.events = []
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        e = {"name": record["name"], "cat": record["name"].split(".")[0],
+             "ph": "X", "ts": record["start"] * 1e6, "dur": record["duration"] * 1e6,
+             "pid": record["pid"], "tid": record["tid"], "args": record["attrs"]}
+        if not record["duration"]:
+            e["ph"], e["s"] = "i", "t"
+            del e["dur"]
+        with self._lock:
+            self.events.append(e)
+
+    def close(self):
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f, default=str)
@@ -4,17 +4,38 @@ Created on May 24, 2019
 '''
 
 
+import collections
+import contextlib
 import copy
+import itertools
 import math
 import numbers
+import os
+import re
+import threading
 
 import fractions as frac
 
 import jsonschema
 import intervals as I
-from greenery.lego import parse
+from greenery import fsm as greenery_fsm
+from greenery import lego as greenery_lego
+from greenery.lego import parse, from_fsm
 
 import jsonsubschema.config as config
+import jsonsubschema._constants as definitions
+from jsonsubschema._approximation import (
+    note_approximation,
+    underapproximated,
+    noted
+)
+from jsonsubschema._budget import checkpoint
+from jsonsubschema._cache import LRUCache
+from jsonsubschema._trace import (
+    event,
+    span,
+    traced
+)
 
 
 def is_str(i):
@@ -48,7 +69,7 @@ def is_bool(i):
 
 
 def is_null(i):
-    isinstance(i, type(None))
+    return isinstance(i, type(None))
 
 
 def is_list(i):
@@ -67,27 +88,145 @@ def is_dict_or_true(i):
     return isinstance(i, dict) or i == True
 
 
+class SchemaDepthError(RecursionError):
+    ''' Raised for schemas nested deeper than config.MAX_SCHEMA_DEPTH. '''
+
+
+class SchemaRefError(ValueError):
+    ''' Raised for $refs which can't be resolved within their document. '''
+
+
+def iter_subschemas(d, keywords=None):
+    ''' Yields (path, subschema) for the immediate subschemas of json schema d,
+        where path is the tuple of keys leading from d to the subschema.
+        Only keywords in keywords are looked at, if given. '''
+    for k, v in d.items():
+        if keywords is not None and k not in keywords:
+            continue
+        if is_dict(v) and k in definitions.Jsubschema:
+            yield (k,), v
+        elif is_list(v) and k in definitions.JsubschemaLists:
+            for idx, v_i in enumerate(v):
+                if is_dict(v_i):
+                    yield (k, idx), v_i
+        elif is_dict(v) and k in definitions.JsubschemaDicts:
+            for k_i, v_i in v.items():
+                if is_dict(v_i):
+                    yield (k, k_i), v_i
+
+
+def map_subschemas(d, f, keywords=None):
+    ''' Returns a shallow copy of json schema d where every immediate
+        subschema s, as found by iter_subschemas, is replaced by f(s). '''
+    ret = dict(d)
+    for k, v in d.items():
+        if keywords is not None and k not in keywords:
+            continue
+        if is_dict(v) and k in definitions.Jsubschema:
+            ret[k] = f(v)
+        elif is_list(v) and k in definitions.JsubschemaLists:
+            ret[k] = [f(v_i) if is_dict(v_i) else v_i for v_i in v]
+        elif is_dict(v) and k in definitions.JsubschemaDicts:
+            ret[k] = {k_i: f(v_i) if is_dict(v_i) else v_i
+                      for k_i, v_i in v.items()}
+    return ret
+
+
+def _empty_schema(s):
+    return {}
+
+
+# Validator of the metaschema itself; built once and reused
+# as long as config.VALIDATOR does not change.
+_metaschema_validator = None
+
+
 def validate_schema(s):
-    return config.VALIDATOR.check_schema(s)
+    ''' Same as config.VALIDATOR.check_schema(s), but without
+        building a new metaschema validator on every call.
+        Every subschema is validated on its own, with its own subschemas
+        replaced by {}, so nesting depth costs heap rather than stack. '''
 
+    with span("validate") as sp:
+        stack = [((), 0, s)]
+        nodes = 0
+        while stack:
+            checkpoint("validate")
+            path, depth, d = stack.pop()
+            if depth > config.MAX_SCHEMA_DEPTH:
+                raise SchemaDepthError(
+                    "Schema is nested deeper than {} levels at: {}".format(
+                        config.MAX_SCHEMA_DEPTH, "/".join(map(str, path))))
+            validate_schema_node(d, path)
+            nodes += 1
+            if is_dict(d):
+                # push in reverse to report errors in document order.
+                stack.extend((path + p, depth + 1, d_i)
+                             for p, d_i in reversed(list(iter_subschemas(d))))
+        sp.set(nodes=nodes)
 
-def get_valid_enum_vals(enum, s):
-    # copy eum into set for two reasons:
-    # 1- we need to modify a different copy from what we iterate on
-    # 2- hashing elements into set and back to list will guarantee
-    # the list is ordered and hence JSONschema __eq__ with enums should work.
-    vals = set(enum)
-    for i in enum:
+
+def validate_schema_node(d, path=()):
+    ''' Validates schema d against the metaschema, except for its subschemas.
+        path is where d is found within its document, for error reporting. '''
+    global _metaschema_validator
+    if type(_metaschema_validator) is not config.VALIDATOR:
+        _metaschema_validator = config.VALIDATOR(config.VALIDATOR.META_SCHEMA)
+
+    shallow = map_subschemas(d, _empty_schema) if is_dict(d) else d
+    for error in _metaschema_validator.iter_errors(shallow):
+        error.path.extendleft(reversed(path))
+        raise jsonschema.exceptions.SchemaError.create_from(error)
+
+
+def is_multipleOf(i, m):
+    ''' Same check as the jsonschema multipleOf validator. '''
+    if m == None:
+        return True
+    if isinstance(m, float):
+        q = i / m
         try:
-            jsonschema.validate(instance=i, schema=s)
-        except jsonschema.ValidationError:
-            vals.remove(i)
-    return list(vals)
+            return int(q) == q
+        except OverflowError:
+            return False
+    return i % m == 0
+
+
+def is_unique(l):
+    ''' Are all elements of the json array l distinct? '''
+    for idx, i in enumerate(l):
+        for j in l[idx + 1:]:
+            if is_bool(i) == is_bool(j) and i == j:
+                return False
+    return True
+
+
+def enum_contains(enum, i):
+    ''' i in enum, except that booleans are told apart
+        from 0 and 1 like jsonschema does. '''
+    if is_bool(i) or i == 0 or i == 1:
+        return any(is_bool(e) == is_bool(i) and e == i for e in enum)
+    return i in enum
+
+
+def get_valid_enum_vals(enum, s):
+    # copy eum into a new list of unique values, where booleans
+    # are told apart from 0 and 1 like jsonschema does.
+    vals = list({(is_bool(i), i): i for i in enum}.values())
+    # Canonical schemas evaluate instances natively;
+    # anything else goes through one jsonschema validator.
+    if hasattr(s, "accepts"):
+        accepts = s.accepts
+    else:
+        accepts = config.VALIDATOR(s).is_valid
+    return [i for i in vals if accepts(i)]
 
 
 def print_db(*args, **kwargs):
     if config.PRINT_DB:
-        print("".join(str(arg) + " " for arg in args))
+        msg = "".join(str(arg) + " " for arg in args)
+        print(msg)
+        event("debug", message=msg)
 
 
 def one(iterable):
@@ -114,39 +253,769 @@ def regex_unanchor(p):
     return p
 
 
+class RegexStateCapExceeded(Exception):
+    ''' Raised where an automaton would grow past config.REGEX_STATE_CAP states. '''
+
+
+# State cap of the automata built in the current thread, if any.
+_cap = threading.local()
+
+
+@contextlib.contextmanager
+def _state_cap():
+    previous = getattr(_cap, "limit", None)
+    _cap.limit = config.REGEX_STATE_CAP
+    try:
+        yield
+    finally:
+        _cap.limit = previous
+
+
+def _crawl(alphabet, initial, final, follow):
+    ''' Automaton of the states reachable from initial, where
+        follow(state, symbol) is the next state or None if there is none,
+        and final(state) tells the final states. States are looked up by
+        hash; there are budget checkpoints and RegexStateCapExceeded is
+        raised once there are more states than the cap in force. '''
+
+    limit = getattr(_cap, "limit", None)
+    symbols = sorted(alphabet, key=greenery_fsm.key)
+    states = [initial]
+    index = {initial: 0}
+    finals = set()
+    transitions = {}
+    i = 0
+    while i < len(states):
+        checkpoint("regex.automaton")
+        state = states[i]
+        if final(state):
+            finals.add(i)
+        transitions[i] = {}
+        for symbol in symbols:
+            next_state = follow(state, symbol)
+            if next_state is None:
+                continue
+            j = index.get(next_state)
+            if j is None:
+                j = len(states)
+                if limit is not None and j >= limit:
+                    raise RegexStateCapExceeded(limit)
+                index[next_state] = j
+                states.append(next_state)
+            transitions[i][symbol] = j
+        i += 1
+
+    return greenery_fsm.fsm(
+        alphabet=alphabet,
+        states=set(range(len(states))),
+        initial=0,
+        finals=finals,
+        map=transitions)
+
+
+# The operations below are those of greenery's fsm, written against its
+# public fields only, so that every automaton is crawled by _crawl.
+
+def _fsm_step(f, state, symbol):
+    if symbol not in f.alphabet and greenery_fsm.anything_else in f.alphabet:
+        symbol = greenery_fsm.anything_else
+    return f.map.get(state, {}).get(symbol)
+
+
+def _fsm_reversed(f):
+    preds = collections.defaultdict(set)
+    for state, transitions in f.map.items():
+        for symbol, next_state in transitions.items():
+            preds[symbol, next_state].add(state)
+
+    def follow(current, symbol):
+        ret = frozenset(p for state in current for p in preds.get((symbol, state), ()))
+        return ret or None
+
+    return _crawl(f.alphabet, frozenset(f.finals), lambda state: f.initial in state, follow)
+
+
+def _fsm_reduce(f):
+    ''' Minimal automaton of f, by Brzozowski's double reversal. '''
+    return _fsm_reversed(_fsm_reversed(f))
+
+
+def _fsm_parallel(fsms, test):
+    ''' Product automaton of fsms, whose states are final if test holds
+        for the finality of the states of each of fsms. '''
+    alphabet = set().union(*(f.alphabet for f in fsms))
+
+    def follow(current, symbol):
+        ret = tuple(None if state is None else _fsm_step(f, state, symbol)
+                    for f, state in zip(fsms, current))
+        return None if all(state is None for state in ret) else ret
+
+    def final(state):
+        return test([s is not None and s in f.finals for f, s in zip(fsms, state)])
+
+    return _fsm_reduce(_crawl(alphabet, tuple(f.initial for f in fsms), final, follow))
+
+
+def _fsm_union(*fsms):
+    return _fsm_parallel(fsms, any)
+
+
+def _fsm_intersection(*fsms):
+    return _fsm_parallel(fsms, all)
+
+
+def _fsm_everythingbut(f):
+    # () is the dead state, which the complement has to reify.
+    def follow(current, symbol):
+        if current and symbol in f.map.get(current[0], {}):
+            return (f.map[current[0]][symbol],)
+        return ()
+
+    return _fsm_reduce(_crawl(f.alphabet, (f.initial,),
+                              lambda state: not (state and state[0] in f.finals), follow))
+
+
+def _fsm_concatenate(*fsms):
+    alphabet = set().union(*(f.alphabet for f in fsms))
+    last = len(fsms) - 1
+
+    def connect_all(i, substate):
+        # a final state of one automaton is also the start of the next.
+        ret = {(i, substate)}
+        while i < last and substate in fsms[i].finals:
+            i += 1
+            substate = fsms[i].initial
+            ret.add((i, substate))
+        return ret
+
+    def follow(current, symbol):
+        ret = set()
+        for i, substate in current:
+            next_state = _fsm_step(fsms[i], substate, symbol)
+            if next_state is not None:
+                ret.update(connect_all(i, next_state))
+        return frozenset(ret) or None
+
+    def final(state):
+        return any(i == last and substate in fsms[i].finals for i, substate in state)
+
+    return _fsm_reduce(_crawl(alphabet, frozenset(connect_all(0, fsms[0].initial)), final, follow))
+
+
+def _fsm_star(f):
+
+    def follow(current, symbol):
+        ret = set()
+        for substate in current:
+            next_state = f.map.get(substate, {}).get(symbol)
+            if next_state is not None:
+                ret.add(next_state)
+            # a final state can also go on like the initial state.
+            if substate in f.finals:
+                next_state = f.map.get(f.initial, {}).get(symbol)
+                if next_state is not None:
+                    ret.add(next_state)
+        return frozenset(ret) or None
+
+    def final(state):
+        return any(substate in f.finals for substate in state)
+
+    return _fsm_union(_crawl(f.alphabet, frozenset([f.initial]), final, follow),
+                      greenery_fsm.epsilon(f.alphabet))
+
+
+def _fsm_times(f, multiplier):
+    # states are sets of (state, iteration) pairs.
+
+    def follow(current, symbol):
+        ret = set()
+        for substate, iteration in current:
+            next_state = f.map.get(substate, {}).get(symbol)
+            if iteration < multiplier and next_state is not None:
+                ret.add((next_state, iteration))
+                if next_state in f.finals:
+                    ret.add((f.initial, iteration + 1))
+        return frozenset(ret) or None
+
+    def final(state):
+        return any(substate == f.initial
+                   and (f.initial in f.finals or iteration == multiplier)
+                   for substate, iteration in state)
+
+    return _fsm_reduce(_crawl(f.alphabet, frozenset([(f.initial, 0)]), final, follow))
+
+
+def _to_fsm(l, alphabet=None):
+    ''' Same as l.to_fsm() of lego piece l, but crawled by _crawl. '''
+    if alphabet is None:
+        alphabet = l.alphabet()
+    if isinstance(l, greenery_lego.charclass):
+        chars = alphabet - l.chars if l.negated else l.chars
+        return greenery_fsm.fsm(
+            alphabet=alphabet,
+            states={0, 1},
+            initial=0,
+            finals={1},
+            map={0: {symbol: 1 for symbol in chars}})
+    if isinstance(l, greenery_lego.mult):
+        unit = _to_fsm(l.multiplicand, alphabet)
+        mandatory = _fsm_times(unit, l.multiplier.mandatory.v)
+        if l.multiplier.optional == greenery_lego.inf:
+            optional = _fsm_star(unit)
+        else:
+            optional = _fsm_times(_fsm_union(greenery_fsm.epsilon(alphabet), unit),
+                                  l.multiplier.optional.v)
+        return _fsm_concatenate(mandatory, optional)
+    if isinstance(l, greenery_lego.conc):
+        return _fsm_concatenate(greenery_fsm.epsilon(alphabet),
+                                *(_to_fsm(m, alphabet) for m in l.mults))
+    return _fsm_union(greenery_fsm.null(alphabet),
+                      *(_to_fsm(c, alphabet) for c in l.concs))
+
+
+def _lego_lengths(l):
+    ''' Least and greatest length of strings matched by lego piece l. '''
+    if isinstance(l, greenery_lego.charclass):
+        return 1, 1
+    if isinstance(l, greenery_lego.mult):
+        lo, hi = _lego_lengths(l.multiplicand)
+        least, most = l.multiplier.min.v, l.multiplier.max.v
+        if most == 0 or hi == 0:
+            return 0, 0
+        return lo * least, math.inf if most is None else hi * most
+    if isinstance(l, greenery_lego.conc):
+        lengths = [_lego_lengths(m) for m in l.mults]
+        return sum(lo for lo, _ in lengths), sum(hi for _, hi in lengths)
+    lengths = [_lego_lengths(c) for c in l.concs]
+    if not lengths:
+        return 0, 0
+    return min(lo for lo, _ in lengths), max(hi for _, hi in lengths)
+
+
+def _lego_affix(l, suffix=False):
+    ''' (s, whole) where s is a literal which every string matched by
+        lego piece l starts with, or ends with if suffix, and whole
+        tells whether s is the only string matched. '''
+    if isinstance(l, greenery_lego.charclass):
+        if not l.negated and len(l.chars) == 1 \
+                and greenery_fsm.anything_else not in l.chars:
+            return next(iter(l.chars)), True
+        return "", False
+    if isinstance(l, greenery_lego.mult):
+        s, whole = _lego_affix(l.multiplicand, suffix)
+        least, most = l.multiplier.min.v, l.multiplier.max.v
+        if whole:
+            return s * least, least == most
+        return (s if least else ""), False
+    if isinstance(l, greenery_lego.conc):
+        ret = ""
+        for m in (reversed(l.mults) if suffix else l.mults):
+            s, whole = _lego_affix(m, suffix)
+            ret = s + ret if suffix else ret + s
+            if not whole:
+                return ret, False
+        return ret, True
+    affixes = [_lego_affix(c, suffix) for c in l.concs]
+    if not affixes:
+        return "", False
+    # common suffixes are common prefixes of the reversed strings.
+    strings = [s[::-1] if suffix else s for s, _ in affixes]
+    common = os.path.commonprefix(strings)
+    whole = all(w for _, w in affixes) and len(set(strings)) == 1
+    return (common[::-1] if suffix else common), whole
+
+
+def _lego_example(l):
+    ''' Some string matched by lego piece l, or None if there is none. '''
+    if isinstance(l, greenery_lego.charclass):
+        if l.negated:
+            return _fresh_char(l.chars)
+        chars = sorted(c for c in l.chars if c != greenery_fsm.anything_else)
+        return chars[0] if chars else None
+    if isinstance(l, greenery_lego.mult):
+        least = l.multiplier.min.v
+        if least == 0:
+            return ""
+        s = _lego_example(l.multiplicand)
+        return None if s is None else s * least
+    if isinstance(l, greenery_lego.conc):
+        parts = [_lego_example(m) for m in l.mults]
+        return None if None in parts else "".join(parts)
+    examples = [s for s in map(_lego_example, l.concs) if s is not None]
+    return min(examples, key=lambda s: (len(s), s)) if examples else None
+
+
+class RegexAbstraction:
+    ''' Bounds on the length, and literal prefix and suffix, of all strings
+        matched by a pattern, along with one such string if there is any.
+        It stands in for the automaton of patterns too large to build,
+        as a superset of their language. '''
+
+    def __init__(self, lego):
+        self.min_length, self.max_length = _lego_lengths(lego)
+        self.prefix = _lego_affix(lego)[0]
+        self.suffix = _lego_affix(lego, suffix=True)[0]
+        self.example = _lego_example(lego)
+
+    def admits(self, s):
+        ''' False only if the pattern surely does not match string s. '''
+        return self.min_length <= len(s) <= self.max_length \
+            and s.startswith(self.prefix) and s.endswith(self.suffix)
+
+    def disjoint(self, other):
+        ''' True only if no string is matched by both patterns. '''
+        return max(self.min_length, other.min_length) > min(self.max_length, other.max_length) \
+            or not (self.prefix.startswith(other.prefix) or other.prefix.startswith(self.prefix)) \
+            or not (self.suffix.endswith(other.suffix) or other.suffix.endswith(self.suffix))
+
+
+class RegexAutomaton:
+    ''' Parsed, reduced and fsm-compiled form of a regex pattern.
+        The complement fsm is only built on first use.
+        If the fsm would have more than config.REGEX_STATE_CAP states,
+        it is None, and the helpers below fall back on the abstraction. '''
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.lego = parse(pattern).reduce()
+        self.cap = config.REGEX_STATE_CAP
+        try:
+            with _state_cap():
+                self.fsm = _to_fsm(self.lego)
+        except RegexStateCapExceeded:
+            self.fsm = None
+        self._complement = None
+        self._live = None
+        self._abstraction = None
+
+    @property
+    def complement(self):
+        if self._complement is None:
+            with _state_cap():
+                self._complement = _fsm_everythingbut(self.fsm)
+        return self._complement
+
+    @property
+    def abstraction(self):
+        if self._abstraction is None:
+            self._abstraction = RegexAbstraction(self.lego)
+        return self._abstraction
+
+    @property
+    def live(self):
+        ''' States from which some final state is reachable. '''
+        if self._live is None:
+            preds = {}
+            for state, transitions in self.fsm.map.items():
+                for next_state in transitions.values():
+                    preds.setdefault(next_state, set()).add(state)
+            live = set(self.fsm.finals)
+            todo = list(live)
+            while todo:
+                for state in preds.get(todo.pop(), ()):
+                    if state not in live:
+                        live.add(state)
+                        todo.append(state)
+            self._live = live
+        return self._live
+
+
+# Compiled patterns shared by all the regex helpers below.
+regex_cache = LRUCache(config.REGEX_CACHE_SIZE)
+
+
+def regex_compile(pattern):
+    regex_cache.maxsize = config.REGEX_CACHE_SIZE
+    ret = regex_cache.get(pattern)
+    # patterns past the cap get another chance once it is raised.
+    if ret is None or (ret.fsm is None and ret.cap != config.REGEX_STATE_CAP):
+        # parsing has no checkpoints of its own.
+        checkpoint("regex.compile")
+        with span("regex.compile", pattern=pattern, cache="miss") as sp:
+            ret = RegexAutomaton(pattern)
+            sp.set(states=len(ret.fsm.states) if ret.fsm is not None else None)
+        regex_cache.put(pattern, ret)
+    else:
+        event("regex.compile", pattern=pattern, cache="hit")
+    return ret
+
+
+def _describe_patterns(*patterns):
+    return {"patterns": list(patterns)}
+
+
+# Quantifiers with explicit bounds, which both regex dialects read alike.
+_re_quantifier = re.compile(r"\{[0-9]+(,[0-9]*)?\}")
+
+# Escaped letters which both regex dialects read alike.
+_re_escapes = set("dDwWsStnrfv")
+
+
+def _re_translate(pattern):
+    ''' pattern, which is in the syntax of the regex library, in the
+        syntax of Python regexes; or None where the two might read it
+        differently. Anchors are literals for the regex library. '''
+    ret = []
+    idx = 0
+    in_class = False
+    while idx < len(pattern):
+        c = pattern[idx]
+        if c == "\\":
+            e = pattern[idx + 1:idx + 2]
+            if not e or (e.isalnum() and e not in _re_escapes):
+                return None
+            ret.append(pattern[idx:idx + 2])
+            idx += 2
+            continue
+        if in_class:
+            if c == "[":
+                return None
+            in_class = c != "]"
+        elif c == "[":
+            start = idx + 1 + (pattern[idx + 1:idx + 2] == "^")
+            # a class opened by ] is empty for the regex library only.
+            if pattern[start:start + 1] == "]":
+                return None
+            ret.append(pattern[idx:start])
+            idx = start
+            in_class = True
+            continue
+        elif c in "^$":
+            c = "\\" + c
+        elif c == "{":
+            m = _re_quantifier.match(pattern, idx)
+            if m is None:
+                return None
+            ret.append(m.group())
+            idx = m.end()
+            continue
+        elif c == "}" or pattern[idx:idx + 2] == "(?":
+            return None
+        ret.append(c)
+        idx += 1
+    return None if in_class else "".join(ret)
+
+
+# Python regexes of the patterns matched against strings so far,
+# or None for patterns which can only be matched by their automata.
+re_cache = LRUCache(config.REGEX_CACHE_SIZE)
+
+_untranslated = object()
+
+
+def regex_re(pattern):
+    ''' The compiled Python regex matching the same strings as pattern,
+        or None. Matching concrete strings with it is much cheaper than
+        building the automaton of pattern. '''
+    re_cache.maxsize = config.REGEX_CACHE_SIZE
+    ret = re_cache.get(pattern, _untranslated)
+    if ret is not _untranslated:
+        return ret
+    ret = _re_translate(pattern)
+    if ret is not None:
+        try:
+            # . matches newlines and \d, \w and \s only ascii characters,
+            # as in the regex library.
+            ret = re.compile(ret, re.DOTALL | re.ASCII)
+        except re.error:
+            ret = None
+    re_cache.put(pattern, ret)
+    return ret
+
+
+@traced("regex.match", lambda regex=None, s=None: {"pattern": regex})
 def regex_matches_string(regex=None, s=None):
-    return parse(regex).matches(s)
+    p = regex_re(regex)
+    if p is not None:
+        return p.fullmatch(s) is not None
+    r = regex_compile(regex)
+    if r.fsm is not None:
+        return r.fsm.accepts(s)
+    if not r.abstraction.admits(s):
+        return False
+    note_approximation("regex.match")
+    return not underapproximated()
+
+
+class KeyMatcher:
+    ''' Matches property names against all the patterns of a
+        patternProperties at once. Patterns with a Python regex are
+        matched with it. The automata of the others are run side by side
+        in a single pass over the name; steps of this product automaton
+        are built as names need them and remembered. The patterns
+        matching each name are remembered too. Patterns past the state
+        cap are matched one by one. '''
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+        self.cap = config.REGEX_STATE_CAP
+        self._res = []
+        automata = []
+        for idx, p in enumerate(patterns):
+            r = regex_re(p)
+            if r is not None:
+                self._res.append((idx, r))
+            else:
+                automata.append((idx, regex_compile(p)))
+        self._fsms = [(idx, r.fsm) for idx, r in automata if r.fsm is not None]
+        self._fallback = [idx for idx, r in automata if r.fsm is None]
+        self._initial = tuple(f.initial for _, f in self._fsms)
+        self._steps = {}
+        self._matches = LRUCache(config.REGEX_CACHE_SIZE)
+
+    def stale(self):
+        ''' Could some pattern get an automaton under the current cap? '''
+        return bool(self._fallback) and self.cap != config.REGEX_STATE_CAP
+
+    def matches(self, k):
+        ''' Patterns which match property name k, in order. '''
+        ret = self._matches.get(k)
+        if ret is None:
+            since = noted()
+            ret = self._match(k)
+            if noted() == since:
+                self._matches.put(k, ret)
+        return ret
+
+    @traced("regex.match_keys", lambda self, k: {"patterns": len(self.patterns)})
+    def _match(self, k):
+        state = self._initial
+        for c in k:
+            next_state = self._steps.get((state, c))
+            if next_state is None:
+                next_state = tuple(q if q is None else _fsm_step(f, q, c)
+                                   for (_, f), q in zip(self._fsms, state))
+                # the product of the automata is capped as each of them is.
+                if self.cap is not None and len(self._steps) >= self.cap:
+                    self._steps.clear()
+                self._steps[(state, c)] = next_state
+            state = next_state
+            if not any(q is not None for q in state):
+                break
+        ids = [idx for (idx, f), q in zip(self._fsms, state)
+               if q is not None and q in f.finals]
+        ids.extend(idx for idx, r in self._res if r.fullmatch(k) is not None)
+        ids.extend(idx for idx in self._fallback
+                   if regex_matches_string(self.patterns[idx], k))
+        return tuple(self.patterns[idx] for idx in sorted(ids))
+
 
+# Key matchers of the patternProperties seen so far.
+key_matcher_cache = LRUCache(config.REGEX_CACHE_SIZE)
 
+
+def key_matcher(patterns):
+    ''' The KeyMatcher of the tuple of patterns. '''
+    key_matcher_cache.maxsize = config.REGEX_CACHE_SIZE
+    ret = key_matcher_cache.get(patterns)
+    if ret is None or ret.stale():
+        ret = KeyMatcher(patterns)
+        key_matcher_cache.put(patterns, ret)
+    return ret
+
+
+def _automata(patterns):
+    ''' Compiled patterns, unless one of them is past the state cap. '''
+    ret = [regex_compile(p) for p in patterns]
+    if any(r.fsm is None for r in ret):
+        raise RegexStateCapExceeded(config.REGEX_STATE_CAP)
+    return ret
+
+
+@traced("regex.meet", _describe_patterns)
 def regex_meet(s1, s2, *args):
-    ret = parse(s1) & parse(s2)
-    for arg in args:
-        ret = ret & parse(arg)
-    return str(ret.reduce()) if not ret.empty() else None
+    patterns = (s1, s2) + args
+    try:
+        fsms = [r.fsm for r in _automata(patterns)]
+        with _state_cap():
+            ret = _fsm_intersection(*fsms)
+    except RegexStateCapExceeded:
+        abstractions = [regex_compile(p).abstraction for p in patterns]
+        if any(a.disjoint(b) for a, b in itertools.combinations(abstractions, 2)):
+            return None
+        note_approximation("regex.meet")
+        if underapproximated():
+            return None
+        # Each of patterns matches every string of the meet.
+        return min(patterns, key=lambda p: regex_compile(p).fsm is None)
+    return str(from_fsm(ret).reduce()) if not ret.empty() else None
+
+
+def _fresh_char(alphabet):
+    ''' Some concrete character which is not in alphabet. '''
+    for c in range(0x20, 0x110000):
+        if chr(c) not in alphabet:
+            return chr(c)
+
+
+@traced("regex.inclusion", _describe_patterns)
+def regex_inclusion_witness(s1, s2):
+    ''' Returns the shortest string matched by s1 but not by s2,
+        or None if s1 is a subset of s2.
+        Both automata are deterministic, so we walk their product
+        breadth first, only ever following states of s1 which can still
+        reach a final state, and stop at the first pair where s1 accepts
+        and s2 does not. Neither the complement of s2 nor the full
+        product automaton is ever built. '''
+
+    r1, r2 = _automata((s1, s2))
+    f1, f2 = r1.fsm, r2.fsm
+    live1 = r1.live
+    if f1.initial not in live1:
+        return None
+
+    symbols = sorted(f1.alphabet | f2.alphabet, key=greenery_fsm.key)
+    start = (f1.initial, f2.initial)
+    parents = {start: None}
+    queue = collections.deque([start])
+    while queue:
+        checkpoint("regex.inclusion")
+        current = queue.popleft()
+        q1, q2 = current
+        if q1 in f1.finals and q2 not in f2.finals:
+            path = []
+            while parents[current] is not None:
+                current, symbol = parents[current]
+                path.append(symbol)
+            other = None
+            witness = []
+            for symbol in reversed(path):
+                if symbol == greenery_fsm.anything_else:
+                    if other is None:
+                        other = _fresh_char(f1.alphabet | f2.alphabet)
+                    symbol = other
+                witness.append(symbol)
+            return "".join(witness)
+
+        for symbol in symbols:
+            n1 = _fsm_step(f1, q1, symbol)
+            if n1 is None or n1 not in live1:
+                continue
+            # None stands for the implicit dead state of s2.
+            n2 = None if q2 is None else _fsm_step(f2, q2, symbol)
+            if (n1, n2) not in parents:
+                if config.REGEX_STATE_CAP is not None \
+                        and len(parents) >= config.REGEX_STATE_CAP:
+                    raise RegexStateCapExceeded(config.REGEX_STATE_CAP)
+                parents[(n1, n2)] = (current, symbol)
+                queue.append((n1, n2))
+    return None
+
+
+@traced("regex.sample", _describe_patterns)
+def regex_sample(s, min_length=0, max_length=I.inf, limit=4, slack=8):
+    ''' Up to limit shortest strings matched by s of length within
+        [min_length, max_length], but no longer than min_length + slack.
+        Strings are built by walking the automaton of s breadth first,
+        keeping at most limit prefixes per state. '''
+
+    r = regex_compile(s)
+    f = r.fsm
+    if f is None:
+        return []
+    live = r.live
+    if f.initial not in live:
+        return []
+    symbols = sorted(f.alphabet, key=greenery_fsm.key)
+    other = _fresh_char(f.alphabet)
+
+    ret = []
+    frontier = {f.initial: [""]}
+    length = 0
+    while frontier and length <= min(max_length, min_length + slack):
+        checkpoint("regex.sample")
+        if length >= min_length:
+            for state, prefixes in frontier.items():
+                if state in f.finals:
+                    ret.extend(prefixes[:limit - len(ret)])
+                    if len(ret) >= limit:
+                        return ret
+        next_frontier = {}
+        for state, prefixes in frontier.items():
+            for symbol in symbols:
+                n = _fsm_step(f, state, symbol)
+                if n is None or n not in live:
+                    continue
+                c = other if symbol == greenery_fsm.anything_else else symbol
+                extended = next_frontier.setdefault(n, [])
+                for p in prefixes:
+                    if len(extended) >= limit:
+                        break
+                    extended.append(p + c)
+        frontier = next_frontier
+        length += 1
+    return ret
 
 
 def regex_isSubset(s1, s2):
     ''' regex subset is quite expensive to compute
         especially for complex patterns. '''
-    s1 = parse(s1).reduce()
-    s2 = parse(s2).reduce()
-    return s1.equivalent(s2) or (s1 & s2.everythingbut()).empty()
+    try:
+        return regex_inclusion_witness(s1, s2) is None
+    except RegexStateCapExceeded:
+        return _approximate_isSubset(s1, s2)
+
+
+def _approximate_isSubset(s1, s2):
+    ''' Whether s1 is a subset of s2, as far as can be told without their
+        automata: True only if s1 matches nothing, and False otherwise,
+        which is exact if some string of s1 surely does not match s2. '''
+    example = regex_compile(s1).abstraction.example
+    if example is None:
+        return True
+    r2 = regex_compile(s2)
+    if r2.fsm is not None:
+        matched = r2.fsm.accepts(example)
+    else:
+        matched = r2.abstraction.admits(example)
+    if matched:
+        note_approximation("regex.inclusion")
+    return False
 
 
 def regex_isProperSubset(s1, s2):
     ''' regex proper subset is quite expensive to compute
         so we try to break it into two separate checks,
-        and do the more expensive check, only if the 
-        cheaper one passes first.'''
-    s1 = parse(s1).reduce()
-    s2 = parse(s2).reduce()
-    if not s1.equivalent(s2):
-        return (s1 & s2.everythingbut()).empty()
+        and do the second check, only if the first one passes. '''
+    try:
+        if regex_inclusion_witness(s1, s2) is None:
+            return regex_inclusion_witness(s2, s1) is not None
+    except RegexStateCapExceeded:
+        note_approximation("regex.inclusion")
     return False
 
 
+def regex_is_infinite(s):
+    ''' Does s match infinitely many strings? '''
+    r = regex_compile(s)
+    if r.fsm is not None:
+        try:
+            r.fsm.cardinality()
+        except OverflowError:
+            return True
+        return False
+    if r.abstraction.max_length < math.inf:
+        return False
+    note_approximation("regex.cardinality")
+    return True
+
+
+@traced("regex.complement", _describe_patterns)
 def complement_of_string_pattern(s):
-    return str(parse(s).everythingbut().reduce())
+    ''' Pattern of the strings which s does not match,
+        or None if there are none. '''
+    r = regex_compile(s)
+    try:
+        if r.fsm is None:
+            raise RegexStateCapExceeded(config.REGEX_STATE_CAP)
+        return str(from_fsm(r.complement).reduce())
+    except RegexStateCapExceeded:
+        # exactly the complement of patterns which match nothing.
+        if r.abstraction.example is None:
+            return ".*"
+        note_approximation("regex.complement")
+        # no strings, or all of them.
+        return None if underapproximated() else ".*"
 
 
 def lcm(x, y):
@@ -0,0 +1,252 @@
+'''
+Created on October 18, 2026
+'''
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+from jsonsubschema._canoncalization import canoncalize_json
+from jsonsubschema._checkers import (
+    check_subtype,
+    subtype_cache
+)
+from jsonsubschema._utils import (
+    regex_cache,
+    validate_schema
+)
+
+
+PHASES = ("validation", "canonicalization", "subtype")
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+def family_depth(n):
+    ''' Arrays of arrays nested n levels deep. '''
+    s1, s2 = {"type": "integer"}, {"type": "number"}
+    for _ in range(n):
+        s1 = {"type": "array", "items": s1}
+        s2 = {"type": "array", "items": s2}
+    return s1, s2
+
+
+def family_anyOf(n):
+    ''' n disjoint ranges and lengths, within n / 2 wider ones. '''
+    s1 = {"anyOf": [{"type": "integer", "minimum": 10 * i, "maximum": 10 * i + 5}
+                    if i % 2 else
+                    {"type": "string", "minLength": 10 * i, "maxLength": 10 * i + 5}
+                    for i in range(n)]}
+    s2 = {"anyOf": [{"type": "integer", "minimum": 20 * i, "maximum": 20 * i + 19}
+                    for i in range(n // 2 + 1)]
+          + [{"type": "string", "maxLength": 10 * n}]}
+    return s1, s2
+
+
+def family_enum(n):
+    ''' Enums of n and 2n integers and strings. '''
+    def enum(k):
+        return {"enum": list(range(k)) + ["s{}".format(i) for i in range(k)]}
+    return enum(n), enum(2 * n)
+
+
+def family_pattern(n):
+    ''' A pattern with a bounded repetition of n. '''
+    s1 = {"type": "string", "pattern": "^(ab|cd){{1,{}}}$".format(n)}
+    s2 = {"type": "string", "pattern": "^([a-d][a-d])*$"}
+    return s1, s2
+
+
+def family_properties(n):
+    ''' Objects with n properties. '''
+    def obj(t, required):
+        return {"type": "object",
+                "properties": {"p{}".format(i): {"type": t, "minimum": i} for i in range(n)},
+                "required": ["p{}".format(i) for i in range(required)],
+                "additionalProperties": False}
+    return obj("integer", n), obj("number", n // 2)
+
+
+def family_tuple(n):
+    ''' Arrays with n items schemas. '''
+    def tup(t):
+        return {"type": "array",
+                "items": [{"type": t, "minimum": i} for i in range(n)],
+                "additionalItems": False}
+    return tup("integer"), tup("number")
+
+
+def family_union(n):
+    ''' A string schema against an anyOf of 2n number and array branches
+        and a last string one, which only the per-type index of the
+        anyOf skips to. '''
+    s1 = {"type": "string", "maxLength": 3}
+    s2 = {"anyOf": [{"type": "number", "minimum": i} for i in range(n)]
+          + [{"type": "array", "maxItems": i} for i in range(n)]
+          + [{"type": "string"}]}
+    return s1, s2
+
+
+# Scaling families: name -> (generator of an (s1, s2) pair of size n, sizes).
+FAMILIES = {
+    "depth": (family_depth, (8, 64, 512)),
+    "anyOf": (family_anyOf, (4, 16, 64)),
+    "enum": (family_enum, (4, 16, 64)),
+    "pattern": (family_pattern, (2, 8, 32)),
+    "properties": (family_properties, (4, 16, 64)),
+    "tuple": (family_tuple, (4, 16, 64)),
+    "union": (family_union, (16, 128, 1024)),
+}
+
+
+def _clear_caches():
+    subtype_cache.clear()
+    regex_cache.clear()
+
+
+def _best_of(f, repeat, min_time=0.1):
+    ''' Least time of runs of f with cold caches: at least repeat runs,
+        and more of fast ones until they took min_time seconds in all. '''
+    best = None
+    total = 0.0
+    runs = 0
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while runs < repeat or (total < min_time and runs < 1000):
+            _clear_caches()
+            start = time.perf_counter()
+            f()
+            t = time.perf_counter() - start
+            best = t if best is None else min(best, t)
+            total += t
+            runs += 1
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best
+
+
+def calibrate(repeat=5):
+    ''' Time of a fixed pure Python workload on this machine, by which all
+        timings are divided so that baselines carry across machines. '''
+    def work():
+        d = {}
+        for i in range(50000):
+            d[i % 1000] = d.get(i % 1000, 0) + i
+    return _best_of(work, repeat)
+
+
+def time_case(s1, s2, repeat=3):
+    ''' Seconds spent on each phase of checking s1 <: s2, along with
+        the calibration right before, as the load of the machine varies. '''
+    c1, c2 = canoncalize_json(s1), canoncalize_json(s2)
+    return {
+        "calibration": calibrate(),
+        "validation": _best_of(lambda: (validate_schema(s1), validate_schema(s2)), repeat),
+        "canonicalization": _best_of(lambda: (canoncalize_json(s1), canoncalize_json(s2)), repeat),
+        "subtype": _best_of(lambda: check_subtype(c1, c2), repeat)
+    }
+
+
+def run(families=None, repeat=3, out=None):
+    ''' Times every size of the given families, all by default.
+        Returns {"cases": {"family/n": {phase: seconds}}}, where the phases
+        include the calibration. '''
+    ret = {"cases": {}}
+    for name in families or FAMILIES:
+        generator, sizes = FAMILIES[name]
+        for n in sizes:
+            case = "{}/{}".format(name, n)
+            ret["cases"][case] = time_case(*generator(n), repeat=repeat)
+            if out is not None:
+                out.write("{:<20}".format(case) + "".join(
+                    "{:>18.6f}".format(ret["cases"][case][phase]) for phase in PHASES) + "\n")
+                out.flush()
+    return ret
+
+
+def compare(current, baseline, threshold=2.0, floor=5e-4):
+    ''' (case, phase, ratio) of every phase at least threshold times slower
+        than in baseline, relative to the calibration of each. Phases taking
+        less than floor seconds in both are too noisy to compare. '''
+    ret = []
+    for case, phases in current["cases"].items():
+        if case not in baseline["cases"]:
+            continue
+        base = baseline["cases"][case]
+        for phase in PHASES:
+            t, t0 = phases.get(phase), base.get(phase)
+            if t is None or t0 is None or max(t, t0) < floor:
+                continue
+            ratio = (t / phases["calibration"]) / (max(t0, floor) / base["calibration"])
+            if ratio >= threshold:
+                ret.append((case, phase, ratio))
+    return ret
+
+
+def confirm(current, baseline, threshold=2.0, retries=2, repeat=3):
+    ''' compare, after timing the cases found slower up to retries more
+        times and keeping the fastest time of each phase, as a loaded
+        machine can slow down a single case by far more than 2x. '''
+    regressions = compare(current, baseline, threshold)
+    for _ in range(retries):
+        if not regressions:
+            break
+        for case in {case for case, _, _ in regressions}:
+            name, n = case.split("/")
+            t = time_case(*FAMILIES[name][0](int(n)), repeat=repeat)
+            c = current["cases"][case]
+            for phase in PHASES:
+                c[phase] = min(c[phase], t[phase] / t["calibration"] * c["calibration"])
+        regressions = compare(current, baseline, threshold)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m jsonsubschema.benchmark",
+        description="Time validation, canonicalization and subtype checking "
+        "on families of schemas of growing size, and compare to a baseline.")
+    parser.add_argument(
+        "families", nargs="*", metavar="FAMILY",
+        help="Families to run: {}; defaults to all.".format(", ".join(FAMILIES)))
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Runs per phase, of which the fastest counts.")
+    parser.add_argument(
+        "--baseline", metavar="FILE", default=BASELINE,
+        help="Baseline to compare to; defaults to the one shipped with the package.")
+    parser.add_argument(
+        "--save", metavar="FILE",
+        help="Write the timings to FILE, e.g. to make them the new baseline.")
+    parser.add_argument(
+        "--threshold", type=float, default=2.0,
+        help="Slowdown relative to the baseline reported as a regression.")
+    args = parser.parse_args(argv)
+    for name in args.families:
+        if name not in FAMILIES:
+            parser.error("unknown family: {}".format(name))
+
+    print("{:<20}".format("case") + "".join("{:>18}".format(p) for p in PHASES))
+    current = run(args.families, args.repeat, sys.stdout)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = confirm(current, baseline, args.threshold, repeat=args.repeat)
+    for case, phase, ratio in regressions:
+        print("REGRESSION {} {}: {:.1f}x slower than baseline".format(case, phase, ratio))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
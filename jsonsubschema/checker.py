@@ -3,23 +3,65 @@ Created on June 24, 2019
 @author: Andrew Habib
 '''
 
+import concurrent.futures
 import copy
 import json
+import os
+import time
 
+import jsonsubschema.config as config
+from jsonsubschema._approximation import (
+    Approximate,
+    approximated,
+    noted,
+    underapproximating
+)
+from jsonsubschema._budget import (
+    Budget,
+    BudgetExceeded,
+    Unknown,
+    set_phase
+)
+from jsonsubschema._cache import (
+    LRUCache,
+    structural_hash
+)
 from jsonsubschema._canoncalization import (
     canoncalize_dict,
     canoncalize_json
 )
+from jsonsubschema._checkers import (
+    JSONschema,
+    intern_schema
+)
+from jsonsubschema._store import get_store
+from jsonsubschema._sampling import (
+    Refuted,
+    refute
+)
+from jsonsubschema._stream import load_canonical
+from jsonsubschema._trace import (
+    ChromeTraceSink,
+    JSONLSink,
+    MemorySink,
+    span
+)
 from jsonsubschema._utils import (
+    SchemaDepthError,
     print_db,
     validate_schema
 )
 
 
+# Canonical forms of previously seen schemas, keyed by their structural hash.
+canonical_cache = LRUCache(config.CANONICAL_CACHE_SIZE)
+
+
 class JSONSubSchemaFactory(json.JSONDecoder):
     ''' This is a json decoder which allows subtype checking.
         Not recommended, however, due to the inability to properly 
-        validate the schema before starting the type checking. '''
+        validate the schema before starting the type checking.
+        Use load_canonical_form instead. '''
 
     def __init__(self, *args, **kwargs):
         json.JSONDecoder.__init__(
@@ -29,20 +71,361 @@ class JSONSubSchemaFactory(json.JSONDecoder):
         return canoncalize_dict(d)
 
 
-def isSubschema(s1, s2):
-    ''' Entry point for schema subtype checking. '''
+def canonical_form(s):
+    ''' Validate and canonicalize schema s.
+        Structurally identical schemas are only validated and
+        canonicalized once; later calls return the cached canonical form,
+        which is shared and hence must not be modified by the caller.
+        If config.CANONICAL_STORE is set, canonical forms are also
+        looked up in and added to that on-disk store. '''
 
-    # Validate both lhs and rhs schemas before starting the subtype checking.
-    # Subtyping of invalid schemas is erroneous.
+    # Already canonical, e.g. from load_canonical_form.
+    if isinstance(s, JSONschema):
+        return intern_schema(s)
+    return _canonical_form(s, structural_hash(s))
+
+
+def _canonical_form(s, key):
+    with span("canonical_form", key=key and key[:12]) as sp:
+        canonical_cache.maxsize = config.CANONICAL_CACHE_SIZE
+        if key is not None:
+            cached = canonical_cache.get(key)
+            if cached is not None:
+                sp.set(cache="hit")
+                return cached
+
+        store = get_store() if key is not None else None
+        if store is not None:
+            # Stored forms were validated before they were stored.
+            stored = store.get(key)
+            if stored is not None:
+                ret = intern_schema(stored)
+                canonical_cache.put(key, ret)
+                sp.set(cache="store")
+                return ret
+
+        sp.set(cache="miss")
+        # Subtyping of invalid schemas is erroneous.
+        set_phase("validation")
+        validate_schema(s)
+        set_phase("canonicalization")
+        since = noted()
+        ret = canoncalize_json(s)
+
+        # forms resting on approximations are built anew every time,
+        # so that every check using them is told so.
+        if noted() != since:
+            sp.set(approximate=True)
+            return ret
+        if key is not None:
+            canonical_cache.put(key, ret)
+        if store is not None:
+            store.put(key, ret)
+        return ret
+
+
+def load_canonical_form(fp, chunk_size=65536):
+    ''' Validate and canonicalize the schema document in file fp,
+        which may be opened in text or binary mode, while reading it
+        chunk_size characters at a time. Meant for schema documents
+        too large to hold both their raw and canonical forms in memory.
+        The result can be passed to isSubschema like any other schema. '''
+
+    with span("load_canonical"):
+        return load_canonical(fp, chunk_size)
+
+
+def isSubschema(s1, s2, budget=None):
+    ''' Entry point for schema subtype checking.
+        budget limits the check to some seconds, or to a Budget of seconds
+        and steps of work; once it is used up, the check gives up and
+        returns Unknown(phase) rather than True or False.
+        Checks which approximate regex automata past
+        config.REGEX_STATE_CAP states return Approximate(verdict). '''
 
-    validate_schema(s1)
+    if budget is not None:
+        return _within(budget, isSubschema, s1, s2)
+
+    since = noted()
+    raw = s1, s2
+    # Validate both lhs and rhs schemas before starting the subtype checking.
     print_db("LHS", s1)
-    s1 = canoncalize_json(s1)
+    s1 = canonical_form(s1)
     print_db("LHS_canonical", s1)
 
-    validate_schema(s2)
     print_db("RHS", s2)
-    s2 = canoncalize_json(s2)
+    with underapproximating():
+        s2 = canonical_form(s2)
     print_db("RHS_canonical", s2)
 
-    return s1.isSubtype(s2)
+    with span("isSubschema") as sp:
+        ret = _isSubtype(s1, s2, since, raw)
+        sp.set(verdict=bool(ret))
+        return ret
+
+
+def _isSubtype(s1, s2, since=None, raw=None):
+    ''' s1.isSubtype(s2) of canonical schemas, unless one of
+        config.REFUTATION_SAMPLES instances of s1 refutes it right away.
+        Such an instance must also be valid against the schema raw[0] and
+        invalid against raw[1], which s1 and s2 are the canonical forms of.
+        The verdict is Approximate if approximations were made
+        since noted() was since, which defaults to now. '''
+    if since is None:
+        since = noted()
+    if config.REFUTATION_SAMPLES:
+        set_phase("refutation")
+        if raw is None:
+            raw = s1, s2
+        refuted = refute(s1, s2, config.REFUTATION_SAMPLES, raw)
+        if refuted is not None:
+            return approximated(refuted, since)
+    set_phase("subtype")
+    return approximated(s1.isSubtype(s2), since)
+
+
+def _settled_form(s):
+    ''' The canonical form of s, or None if it rests on approximations,
+        which differ between the lhs and the rhs of checks. '''
+    since = noted()
+    ret = canonical_form(s)
+    return ret if noted() == since else None
+
+
+def _check_pair(s1, s2, c1, c2):
+    ''' isSubschema(s1, s2), given the canonical forms c1 and c2 of s1 and
+        s2 as from _settled_form. Those which are None are built anew for
+        their side, so that the verdict is told of their approximations. '''
+    since = noted()
+    if c1 is None:
+        c1 = canonical_form(s1)
+    if c2 is None:
+        with underapproximating():
+            c2 = canonical_form(s2)
+    return _isSubtype(c1, c2, since, (s1, s2))
+
+
+def _within(budget, f, *args):
+    ''' f(*args), or Unknown if it runs out of budget. '''
+    try:
+        with Budget.of(budget):
+            return f(*args)
+    except BudgetExceeded as e:
+        return Unknown(e.phase, e.operation)
+
+
+def iter_subschema_matrix(schemas):
+    ''' Check every schema in schemas against every other one.
+        Yields (i, j, verdict) tuples where verdict is the result of
+        isSubschema(schemas[i], schemas[j]), row by row.
+        Each schema is validated and canonicalized only once. '''
+
+    schemas = list(schemas)
+    keys = [structural_hash(s) for s in schemas]
+    canonicals = [_settled_form(s) for s in schemas]
+
+    for i, (k1, c1) in enumerate(zip(keys, canonicals)):
+        for j, (k2, c2) in enumerate(zip(keys, canonicals)):
+            # Every schema is a subschema of itself.
+            if i == j or (k1 is not None and k1 == k2):
+                yield i, j, True
+            else:
+                yield i, j, _check_pair(schemas[i], schemas[j], c1, c2)
+
+
+def subschema_matrix(schemas):
+    ''' Return an N x N list of lists m of the schemas in schemas,
+        where m[i][j] is the result of isSubschema(schemas[i], schemas[j]).
+        For large corpora, use iter_subschema_matrix instead to avoid
+        holding the whole matrix in memory. '''
+
+    schemas = list(schemas)
+    n = len(schemas)
+    m = [[None] * n for _ in range(n)]
+    for i, j, verdict in iter_subschema_matrix(schemas):
+        m[i][j] = verdict
+    return m
+
+
+# Distinct schemas of the current batch and their canonical forms,
+# set up once in each worker process by _init_batch_worker.
+_batch_schemas = []
+_batch_canonicals = {}
+_batch_budget = None
+
+
+# Settings of config which worker processes do not share with this one.
+# Sinks hold files and locks of this process, so workers do not trace.
+_LOCAL_CONFIG = ("TRACE_SINK",)
+
+
+def _worker_settings():
+    # Worker processes need not inherit config, so it is passed on in full.
+    return {k: v for k, v in vars(config).items()
+            if k.isupper() and k not in _LOCAL_CONFIG}
+
+
+def _init_batch_worker(schemas, settings=None, budget=None):
+    global _batch_schemas, _batch_budget
+    _batch_schemas = schemas
+    _batch_budget = budget
+    for k, v in (settings or {}).items():
+        setattr(config, k, v)
+    _batch_canonicals.clear()
+
+
+def _check_batch_pair(i, j):
+    for k in (i, j):
+        if k not in _batch_canonicals:
+            _batch_canonicals[k] = _settled_form(_batch_schemas[k])
+    return _check_pair(_batch_schemas[i], _batch_schemas[j],
+                       _batch_canonicals[i], _batch_canonicals[j])
+
+
+def _check_batch_chunk(chunk):
+    if _batch_budget is not None:
+        return [_within(_batch_budget, _check_batch_pair, i, j) for i, j in chunk]
+    return [_check_batch_pair(i, j) for i, j in chunk]
+
+
+def _check_timed(chunk, check, budget):
+    ret = []
+    for n, a, b in chunk:
+        start = time.perf_counter()
+        try:
+            if budget is not None:
+                verdict = _within(budget, check, a, b)
+            else:
+                verdict = check(a, b)
+            error = None
+        # Unsupported features still sys.exit; that must not end the batch.
+        except (Exception, SystemExit) as e:
+            verdict = None
+            # jsonschema errors have a one line message.
+            error = "{}: {}".format(type(e).__name__, getattr(e, "message", e))
+        ret.append((n, verdict, time.perf_counter() - start, error))
+    return ret
+
+
+def _check_batch_chunk_timed(chunk):
+    return _check_timed(chunk, _check_batch_pair, _batch_budget)
+
+
+def _check_shipped_pair(s1, s2):
+    # Schemas seen before are found in canonical_cache.
+    return _check_pair(s1, s2, _settled_form(s1), _settled_form(s2))
+
+
+def _check_shipped_chunk(chunk, budget):
+    return _check_timed(chunk, _check_shipped_pair, budget)
+
+
+def _index_batch(pairs):
+    ''' Distinct schemas among pairs, and pairs as indices into them. '''
+    schemas = []
+    index = {}
+    jobs = []
+    for pair in pairs:
+        job = []
+        for s in pair:
+            key = structural_hash(s)
+            if key is None:
+                key = id(s)
+            if key not in index:
+                index[key] = len(schemas)
+                schemas.append(s)
+            job.append(index[key])
+        jobs.append(tuple(job))
+    return schemas, jobs
+
+
+def isSubschema_batch(pairs, workers=None, chunksize=None, budget=None):
+    ''' Check many (s1, s2) schema pairs using a pool of worker processes.
+        Returns the list of isSubschema(s1, s2) verdicts in the same order
+        as pairs. Distinct schemas are shipped to each worker once and
+        canonicalized there at most once; pairs are then sent as chunks
+        of indices.
+        workers defaults to os.cpu_count(); workers=1 runs in this process.
+        chunksize defaults to splitting the work into about four chunks
+        per worker. budget applies to each pair, along with the
+        canonicalization of schemas the worker sees first, as in isSubschema. '''
+
+    schemas, jobs = _index_batch(pairs)
+
+    if not jobs:
+        return []
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+    if chunksize is None:
+        chunksize = -(-len(jobs) // (workers * 4))
+    chunks = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+
+    if workers == 1:
+        _init_batch_worker(schemas, budget=budget)
+        results = map(_check_batch_chunk, chunks)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_batch_worker,
+                initargs=(schemas, _worker_settings(), budget)) as executor:
+            results = list(executor.map(_check_batch_chunk, chunks))
+
+    return [verdict for chunk in results for verdict in chunk]
+
+
+def batch_executor(workers=None):
+    ''' Pool of worker processes, os.cpu_count() by default, set up with
+        the config of this process, for many calls of iter_isSubschema_batch
+        to share. The caller shuts it down, e.g. by using it in a with
+        statement. '''
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count() or 1,
+        initializer=_init_batch_worker,
+        initargs=([], _worker_settings()))
+
+
+def iter_isSubschema_batch(pairs, workers=None, chunksize=1, budget=None, executor=None):
+    ''' Same as isSubschema_batch, but yields (n, verdict, seconds, error)
+        for the n-th pair of pairs as soon as its chunk is done, hence not
+        necessarily in order. seconds is the time the worker spent on the
+        pair, including the canonicalization of schemas it saw first.
+        Pairs which fail, e.g. on invalid schemas, get a None verdict and
+        the error message; the other pairs are checked regardless.
+        executor, from batch_executor, is used instead of a pool of its
+        own, and workers ignored; schemas are then shipped along with
+        each chunk. '''
+
+    schemas, jobs = _index_batch(pairs)
+    jobs = [(n, i, j) for n, (i, j) in enumerate(jobs)]
+    if not jobs:
+        return
+
+    if executor is not None:
+        futures = [executor.submit(_check_shipped_chunk,
+                                   [(n, schemas[i], schemas[j]) for n, i, j in jobs[k:k + chunksize]],
+                                   budget)
+                   for k in range(0, len(jobs), chunksize)]
+        for future in concurrent.futures.as_completed(futures):
+            yield from future.result()
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+    chunks = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+
+    if workers == 1:
+        _init_batch_worker(schemas, budget=budget)
+        for chunk in chunks:
+            yield from _check_batch_chunk_timed(chunk)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_batch_worker,
+                initargs=(schemas, _worker_settings(), budget)) as executor:
+            futures = [executor.submit(_check_batch_chunk_timed, chunk)
+                       for chunk in chunks]
+            for future in concurrent.futures.as_completed(futures):
+                yield from future.result()
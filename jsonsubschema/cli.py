@@ -0,0 +1,221 @@
+'''
+Created on October 18, 2026
+'''
+
+import argparse
+import contextlib
+import glob
+import itertools
+import json
+import os
+import sys
+
+import jsonsubschema.config as config
+from jsonsubschema.checker import (
+    Approximate,
+    Budget,
+    Refuted,
+    Unknown,
+    batch_executor,
+    iter_isSubschema_batch
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="jsonsubschema",
+        description="Check json schemas for subschema relations. "
+        "Writes one json line per (lhs, rhs) pair as soon as it is checked.")
+    parser.add_argument(
+        "schemas", nargs="*",
+        help="Schema files, directories of *.json schema files, or glob "
+        "patterns. Every schema is checked against every other one, "
+        "in both directions.")
+    parser.add_argument(
+        "--pairs", metavar="JSONL",
+        help="Json lines file, or - for stdin, of {\"lhs\": ..., \"rhs\": ...} "
+        "objects, where lhs and rhs are schemas or paths to schema files. "
+        "Any other fields of a line are copied to its output.")
+    parser.add_argument(
+        "-o", "--output", metavar="FILE", default="-",
+        help="Where to write the verdicts; defaults to stdout.")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None,
+        help="Number of worker processes; defaults to the number of CPUs.")
+    parser.add_argument(
+        "--chunksize", type=int, default=1,
+        help="Number of pairs sent to a worker at once.")
+    parser.add_argument(
+        "--window", type=int, default=1000, metavar="N",
+        help="Number of pairs read in and checked at a time, so that "
+        "input of any length is checked as it comes.")
+    parser.add_argument(
+        "--budget", type=float, metavar="SECONDS",
+        help="Give up on a pair after this many seconds; its verdict is then "
+        "null, with the phase it got stuck in as unknown.")
+    parser.add_argument(
+        "--steps", type=int, metavar="N",
+        help="Give up on a pair after N steps of work, which unlike --budget "
+        "does not depend on the load of the machine.")
+    parser.add_argument(
+        "--samples", type=int, default=0, metavar="N",
+        help="Try up to N instances of each lhs against the rhs before "
+        "checking symbolically; a rejected one is written out as witness.")
+    parser.add_argument(
+        "--state-cap", type=int, metavar="N",
+        help="Approximate regex patterns whose automata would have more than "
+        "N states; a verdict relying on that is null, with the approximate "
+        "one as approximate.")
+    parser.add_argument(
+        "--store", metavar="DB",
+        help="Sqlite database in which to keep canonical forms across runs; "
+        "created if missing. Schemas seen by an earlier run are not "
+        "canonicalized again.")
+    args = parser.parse_args(argv)
+    if not args.schemas and args.pairs is None:
+        parser.error("give either schema files or --pairs")
+    if args.chunksize < 1:
+        parser.error("--chunksize must be at least 1")
+    if args.window < 1:
+        parser.error("--window must be at least 1")
+    if (args.budget is not None and args.budget <= 0) \
+            or (args.steps is not None and args.steps <= 0):
+        parser.error("--budget and --steps must be positive")
+    if args.samples < 0:
+        parser.error("--samples must not be negative")
+    if args.state_cap is not None and args.state_cap < 1:
+        parser.error("--state-cap must be positive")
+    return args
+
+
+def expand_paths(patterns):
+    ''' Schema files named by patterns, in order and without duplicates. '''
+    ret = []
+    for p in patterns:
+        if os.path.isdir(p):
+            ret.extend(sorted(glob.glob(os.path.join(p, "*.json"))))
+        elif glob.has_magic(p):
+            ret.extend(sorted(glob.glob(p, recursive=True)))
+        else:
+            ret.append(p)
+    return list(dict.fromkeys(ret))
+
+
+def load_file(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def schema_pairs(paths):
+    ''' All ordered pairs of distinct schema files among paths. '''
+    schemas = {p: load_file(p) for p in paths}
+    for lhs, rhs in itertools.permutations(paths, 2):
+        yield {"lhs": lhs, "rhs": rhs}, schemas[lhs], schemas[rhs]
+
+
+def jsonl_pairs(f):
+    ''' Pairs of the json lines in file f. Schemas given by path
+        are loaded once, however many lines refer to them. '''
+    files = {}
+    for n, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        pair = json.loads(line)
+        if not isinstance(pair, dict) or "lhs" not in pair or "rhs" not in pair:
+            raise ValueError("line {}: expecting an object with lhs and rhs".format(n))
+        record = {k: v for k, v in pair.items() if k not in ("lhs", "rhs")}
+        record["line"] = n
+        schemas = []
+        for side in ("lhs", "rhs"):
+            s = pair[side]
+            if isinstance(s, str):
+                record[side] = s
+                if s not in files:
+                    files[s] = load_file(s)
+                s = files[s]
+            schemas.append(s)
+        yield record, schemas[0], schemas[1]
+
+
+def windows(iterable, size):
+    ''' Lists of the next up to size items of iterable, one after the other. '''
+    it = iter(iterable)
+    while True:
+        window = list(itertools.islice(it, size))
+        if not window:
+            return
+        yield window
+
+
+def output_record(record, verdict, seconds, error):
+    ''' record of a pair, along with its verdict. '''
+    record = dict(record)
+    if isinstance(verdict, Unknown):
+        record["verdict"] = None
+        record["unknown"] = verdict.phase
+    elif isinstance(verdict, Approximate):
+        record["verdict"] = None
+        record["approximate"] = bool(verdict.verdict)
+    else:
+        record["verdict"] = verdict if verdict is None else bool(verdict)
+    if isinstance(verdict, Refuted):
+        record["witness"] = verdict.witness
+    record["seconds"] = round(seconds, 6)
+    if error is not None:
+        record["error"] = error
+    return record
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.store is not None:
+        config.CANONICAL_STORE = args.store
+    if args.samples:
+        config.REFUTATION_SAMPLES = args.samples
+    if args.state_cap is not None:
+        config.REGEX_STATE_CAP = args.state_cap
+
+    budget = None
+    if args.budget is not None or args.steps is not None:
+        budget = Budget(seconds=args.budget, steps=args.steps)
+
+    failed = False
+    with contextlib.ExitStack() as stack:
+        try:
+            if args.pairs is None:
+                pairs = schema_pairs(expand_paths(args.schemas))
+            elif args.pairs == "-":
+                pairs = jsonl_pairs(sys.stdin)
+            else:
+                pairs = jsonl_pairs(stack.enter_context(open(args.pairs, "r")))
+            # Pairs are only read in as the ones before are checked.
+            pairs = windows(pairs, args.window)
+            window = next(pairs, None)
+        except (OSError, ValueError) as e:
+            print("jsonsubschema: {}".format(e), file=sys.stderr)
+            return 2
+
+        out = sys.stdout
+        if args.output != "-":
+            out = stack.enter_context(open(args.output, "w"))
+        # One pool of workers for all windows.
+        executor = None
+        if args.workers != 1:
+            executor = stack.enter_context(batch_executor(args.workers))
+        while window is not None:
+            results = iter_isSubschema_batch(
+                ((lhs, rhs) for _, lhs, rhs in window),
+                workers=args.workers, chunksize=args.chunksize, budget=budget,
+                executor=executor)
+            for n, verdict, seconds, error in results:
+                record = output_record(window[n][0], verdict, seconds, error)
+                failed = failed or error is not None
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+            try:
+                window = next(pairs, None)
+            except (OSError, ValueError) as e:
+                print("jsonsubschema: {}".format(e), file=sys.stderr)
+                return 2
+
+    return 1 if failed else 0
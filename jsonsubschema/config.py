@@ -8,8 +8,51 @@ import jsonschema
 # Change here which schema validator to use
 VALIDATOR = jsonschema.Draft4Validator
 
-# Print debugging info?
+# Print debugging info? Also sent to TRACE_SINK as debug events.
 PRINT_DB = False
 
 # Enable uninhabited types warning
 WARN_UNINHABITED = False
+
+# Max number of canonicalized schemas to keep around between
+# isSubschema calls. Set to None for unbounded, or 0 to disable.
+CANONICAL_CACHE_SIZE = 1024
+
+# Max number of subtype verdicts to remember across and within
+# isSubschema calls. Set to None for unbounded, or 0 to disable.
+SUBTYPE_CACHE_SIZE = 4096
+
+# Max number of compiled regex patterns to keep around.
+# Set to None for unbounded, or 0 to disable.
+REGEX_CACHE_SIZE = 1024
+
+# Validate every internally built schema node against the metaschema?
+# Only useful for debugging the canonicalization; user input is
+# always validated.
+VALIDATE_INTERNAL_NODES = False
+
+# Max nesting depth of subschemas, and of pending subtype checks,
+# before giving up with a SchemaDepthError. Both are tracked on the heap,
+# so this does not depend on the Python recursion limit.
+MAX_SCHEMA_DEPTH = 10000
+
+# Path of a sqlite database in which to keep canonical forms across
+# processes and runs, or None to keep them in memory only.
+# The store holds pickled objects, so only point this at trusted files.
+CANONICAL_STORE = None
+
+# Where to send tracing spans of validation, canonicalization, meet,
+# subtype and regex operations, e.g. jsonsubschema._trace.MemorySink(),
+# JSONLSink(path) or ChromeTraceSink(path). None disables tracing.
+TRACE_SINK = None
+
+# Number of instances of the lhs to try against the rhs before checking
+# subtyping symbolically. If the rhs rejects one, the verdict is a falsy
+# Refuted carrying that instance as its witness. 0 disables the pre-pass.
+REFUTATION_SAMPLES = 0
+
+# Max number of states of any automaton built for regex patterns,
+# or None for no limit. Operations on patterns past the cap fall back
+# on coarse abstractions of their lengths, prefixes and suffixes, and
+# the checks relying on them give an Approximate verdict.
+REGEX_STATE_CAP = None
@@ -0,0 +1,82 @@
+'''
+Created on October 18, 2026
+'''
+
+import unittest
+
+import jsonschema
+
+from jsonsubschema.checker import (
+    canonical_form,
+    isSubschema
+)
+
+
+class TestAccepts(unittest.TestCase):
+
+    schemas = [
+        {"type": "string", "minLength": 2, "pattern": "^a"},
+        {"type": "integer", "minimum": 2, "maximum": 10, "multipleOf": 2},
+        {"type": "number", "exclusiveMaximum": True, "maximum": 3.5},
+        {"type": "array", "items": {"type": "integer"},
+         "uniqueItems": True, "maxItems": 3},
+        {"type": "array", "items": [{"type": "string"}],
+         "additionalItems": False},
+        {"type": "object", "properties": {"a": {"type": "string"}},
+         "required": ["a"], "additionalProperties": False},
+        {"type": "object", "patternProperties": {"^x": {"type": "integer"}},
+         "dependencies": {"x1": ["y"]}},
+        {"type": ["string", "null"]},
+        {"anyOf": [{"type": "boolean"}, {"type": "integer", "minimum": 5}]},
+        {"enum": [1, "a", None]}
+    ]
+
+    instances = ["a", "ab", "ba", 1, 2, 4, 12, 3.4, 3.5, True, False, None,
+                 [1, 2], [1, 1], [1, 2, 3, 4], ["a"], ["a", "b"],
+                 {"a": "x"}, {"a": 1}, {"a": "x", "b": 1},
+                 {"x1": 1}, {"x1": 1, "y": 2}, {"x1": "s", "y": 0}, {}]
+
+    def test_agrees_with_jsonschema(self):
+        for s in self.schemas:
+            c = canonical_form(s)
+            v = jsonschema.Draft4Validator(s)
+            for i in self.instances:
+                with self.subTest(schema=s, instance=i):
+                    self.assertEqual(c.accepts(i), v.is_valid(i))
+
+
+class TestEnumFiltering(unittest.TestCase):
+
+    def test_bool_is_not_int(self):
+        s = canonical_form({"type": "integer", "enum": [1, True]})
+        self.assertEqual(s.enum, [1])
+
+    def test_uninhabited_enum(self):
+        s1 = {"type": "string", "enum": ["a", "b"], "minLength": 2}
+        s2 = {"type": "integer"}
+        self.assertTrue(isSubschema(s1, s2))
+
+    def test_large_enum(self):
+        s1 = {"type": "string", "pattern": "^v[0-9]*5$",
+              "enum": ["v{}".format(i) for i in range(2000)]}
+        s2 = {"type": "string", "pattern": "5$"}
+        with self.subTest():
+            self.assertEqual(len(canonical_form(s1).enum), 200)
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+
+    def test_bool_and_int(self):
+        s = canonical_form({"enum": [1, True]})
+        with self.subTest():
+            self.assertEqual(sorted(repr(b.enum[0]) for b in s.anyOf),
+                             ["1", "True"])
+        with self.subTest():
+            self.assertIs(isSubschema({"not": {"type": "array", "items": {"type": "null"}}},
+                                      {"enum": [1, True]}), False)
+
+    def test_integral_float(self):
+        s1 = {"type": "number", "multipleOf": 2, "enum": [2.0]}
+        with self.subTest():
+            self.assertIs(isSubschema(s1, {"type": "null"}), False)
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, {"type": "number"}))
@@ -0,0 +1,177 @@
+'''
+Created on October 18, 2026
+'''
+
+import pickle
+import unittest
+
+from greenery import fsm as greenery_fsm
+
+import jsonsubschema.config as config
+import jsonsubschema._utils as utils
+from jsonsubschema._checkers import subtype_cache
+from jsonsubschema.checker import (
+    Approximate,
+    canonical_cache,
+    isSubschema,
+    isSubschema_batch,
+    subschema_matrix
+)
+
+
+# Takes an automaton of some 2^7 states.
+large = {"type": "string", "pattern": "^x.*a.{6}$"}
+
+
+class TestAbstraction(unittest.TestCase):
+
+    def test_abstraction(self):
+        cases = [
+            ("abc", 3, 3, "abc", "abc", "abc"),
+            ("ab(c|cd)[^x]{2,5}e*z", 6, utils.math.inf, "abc", "z", "abc  z"),
+            ("x.*a.{6}", 8, utils.math.inf, "x", "", "xa      "),
+            ("(ab|ac){2}", 4, 4, "a", "", "abab"),
+            ("[]", 1, 1, "", "", None)
+        ]
+        for pattern, min_length, max_length, prefix, suffix, example in cases:
+            a = utils.RegexAbstraction(utils.parse(pattern).reduce())
+            with self.subTest(pattern=pattern):
+                self.assertEqual((a.min_length, a.max_length, a.prefix, a.suffix, a.example),
+                                 (min_length, max_length, prefix, suffix, example))
+
+    def test_admits(self):
+        a = utils.RegexAbstraction(utils.parse("x.*a.{6}").reduce())
+        for s, admitted in (("xaaaaaaa", True), ("x1234567", True), ("yaaaaaaa", False), ("x", False)):
+            with self.subTest(s=s):
+                self.assertIs(a.admits(s), admitted)
+
+    def test_disjoint(self):
+        def abstraction(p):
+            return utils.RegexAbstraction(utils.parse(p).reduce())
+        for p1, p2, disjoint in (("ab.*", "ac.*", True), (".*b", ".*c", True),
+                                 (".{3}", ".{4,}", True), ("ab.*", "a.*", False)):
+            with self.subTest(p1=p1, p2=p2):
+                self.assertIs(abstraction(p1).disjoint(abstraction(p2)), disjoint)
+
+
+class TestAutomata(unittest.TestCase):
+
+    patterns = ["abc", "ab(c|cd)[^x]{2,5}e*z", "(ab|ac){2}", "(b*ab)*", "x.*a.{3}", "[]", "a{0}", ".*"]
+
+    def test_same_as_greenery(self):
+        for p in self.patterns:
+            lego = utils.parse(p).reduce()
+            f = utils._to_fsm(lego)
+            with self.subTest(pattern=p):
+                self.assertTrue(f.equivalent(lego.to_fsm()))
+            with self.subTest(pattern=p, op="everythingbut"):
+                self.assertTrue(utils._fsm_everythingbut(f).equivalent(lego.to_fsm().everythingbut()))
+            other = utils.parse("a.*c").reduce()
+            with self.subTest(pattern=p, op="intersection"):
+                self.assertTrue(utils._fsm_intersection(f, utils._to_fsm(other)).equivalent(
+                    lego.to_fsm() & other.to_fsm()))
+
+
+class TestStateCap(unittest.TestCase):
+
+    def setUp(self):
+        config.REGEX_STATE_CAP = 100
+        self.clear()
+
+    def tearDown(self):
+        config.REGEX_STATE_CAP = None
+        self.clear()
+
+    def clear(self):
+        # exact automata and verdicts would outlive a change of the cap.
+        canonical_cache.clear()
+        subtype_cache.clear()
+        utils.regex_cache.clear()
+
+    def test_compile(self):
+        pattern = utils.regex_unanchor(large["pattern"])
+        with self.subTest():
+            self.assertIsNone(utils.regex_compile(pattern).fsm)
+        with self.subTest():
+            self.assertTrue(utils.regex_matches_string(pattern, "x1a123456"))
+        with self.subTest():
+            self.assertFalse(utils.regex_matches_string(pattern, "xa1234567"))
+        config.REGEX_STATE_CAP = None
+        with self.subTest():
+            self.assertIsNotNone(utils.regex_compile(pattern).fsm)
+
+    def test_exact(self):
+        pairs = [
+            (large, {"type": "string", "pattern": "^y"}),
+            ({"type": "string", "pattern": "^x"}, large),
+            (large, {"type": "string", "pattern": "^.{9,}$"})
+        ]
+        for s1, s2 in pairs:
+            with self.subTest(s1=s1, s2=s2):
+                self.assertIs(isSubschema(s1, s2), False)
+
+    def test_approximate(self):
+        pairs = [
+            (large, {"type": "string", "pattern": "^x"}, Approximate(False, "regex.inclusion")),
+            ({"allOf": [large, {"type": "string", "pattern": "b$"}]}, {"type": "string"},
+             Approximate(True, "regex.meet")),
+            ({"type": "string", "not": large}, {"type": "string", "pattern": "^x"},
+             Approximate(False, "regex.complement"))
+        ]
+        for s1, s2, verdict in pairs:
+            # verdicts which approximate are not remembered.
+            for _ in range(2):
+                with self.subTest(s1=s1, s2=s2):
+                    self.assertEqual(isSubschema(s1, s2), verdict)
+        config.REGEX_STATE_CAP = None
+        with self.subTest():
+            self.assertIs(isSubschema(*pairs[0][:2]), True)
+
+    def test_rhs_subset(self):
+        # rhs approximations must not let lhs strings in.
+        meet = {"allOf": [large, {"type": "string", "pattern": "b$"}]}
+        pairs = [
+            ({"type": "string", "pattern": "^xa123456$"}, {"not": large},
+             Approximate(False, "regex.complement")),
+            ({"type": "string", "pattern": "^xb$"}, meet,
+             Approximate(False, "regex.meet"))
+        ]
+        for s1, s2, verdict in pairs:
+            with self.subTest(s1=s1, s2=s2):
+                self.assertEqual(isSubschema(s1, s2), verdict)
+            with self.subTest(s1=s1, s2=s2):
+                self.assertEqual(subschema_matrix([s1, s2])[0][1], verdict)
+
+    def test_greenery_untouched(self):
+        with self.subTest():
+            self.assertIsNot(greenery_fsm.crawl, utils._crawl)
+        with self.subTest():
+            self.assertIs(type(utils.regex_compile("^ab*$").fsm), greenery_fsm.fsm)
+
+    def test_lazy_complement(self):
+        # other json types refute it before the complement is needed.
+        with self.subTest():
+            self.assertIs(isSubschema({"not": large}, {"type": "string"}), False)
+
+    def test_verdict(self):
+        a = Approximate(True, "regex.meet")
+        with self.subTest():
+            self.assertTrue(a)
+        with self.subTest():
+            self.assertFalse(Approximate(False, "regex.meet"))
+        with self.subTest():
+            self.assertNotEqual(a, True)
+        with self.subTest():
+            self.assertNotEqual(a, False)
+        with self.subTest():
+            self.assertEqual(pickle.loads(pickle.dumps(a)), a)
+        with self.subTest():
+            self.assertEqual(repr(a), "Approximate(True, 'regex.meet')")
+
+    def test_batch(self):
+        verdicts = isSubschema_batch([(large, {"type": "string", "pattern": "^x"}),
+                                      ({"type": "integer"}, {"type": "number"})], workers=2)
+        with self.subTest():
+            self.assertEqual(verdicts[0], Approximate(False, "regex.inclusion"))
+        with self.subTest():
+            self.assertIs(verdicts[1], True)
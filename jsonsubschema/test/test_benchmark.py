@@ -0,0 +1,61 @@
+'''
+Created on October 18, 2026
+'''
+
+import json
+import unittest
+
+from jsonsubschema.benchmark import (
+    BASELINE,
+    FAMILIES,
+    PHASES,
+    compare,
+    family_tuple,
+    time_case
+)
+from jsonsubschema.checker import isSubschema
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_families(self):
+        for name, (generator, sizes) in FAMILIES.items():
+            s1, s2 = generator(sizes[0])
+            with self.subTest(family=name):
+                isSubschema(s1, s2)
+
+    def test_baseline(self):
+        with open(BASELINE, "r") as f:
+            baseline = json.load(f)
+        for name, (_, sizes) in FAMILIES.items():
+            for n in sizes:
+                case = "{}/{}".format(name, n)
+                with self.subTest(case=case):
+                    self.assertEqual(set(baseline["cases"][case]),
+                                     set(PHASES) | {"calibration"})
+
+    def test_time_case(self):
+        t = time_case(*family_tuple(2), repeat=1)
+        with self.subTest():
+            self.assertEqual(set(t), set(PHASES) | {"calibration"})
+        with self.subTest():
+            self.assertTrue(all(v > 0 for v in t.values()))
+
+    def test_compare(self):
+        baseline = {"cases": {
+            "a/1": {"calibration": 1.0, "validation": 0.01, "canonicalization": 0.01, "subtype": 0.01},
+            "b/1": {"calibration": 1.0, "validation": 1e-6, "canonicalization": 0.01, "subtype": 0.01}}}
+        current = {"cases": {
+            # twice as slow a machine.
+            "a/1": {"calibration": 2.0, "validation": 0.02, "canonicalization": 0.05, "subtype": 0.01},
+            # too fast to tell.
+            "b/1": {"calibration": 1.0, "validation": 1e-5, "canonicalization": 0.01, "subtype": 0.01},
+            "c/1": {"calibration": 1.0, "validation": 1.0, "canonicalization": 1.0, "subtype": 1.0}}}
+        regressions = compare(current, baseline)
+        with self.subTest():
+            self.assertEqual([(case, phase) for case, phase, _ in regressions],
+                             [("a/1", "canonicalization")])
+        with self.subTest():
+            self.assertAlmostEqual(regressions[0][2], 2.5)
+        with self.subTest():
+            self.assertEqual(compare(current, baseline, threshold=3.0), [])
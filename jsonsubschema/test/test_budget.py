@@ -0,0 +1,122 @@
+'''
+Created on October 18, 2026
+'''
+
+import pickle
+import signal
+import threading
+import time
+import unittest
+
+from jsonsubschema._budget import (
+    BudgetExceeded,
+    checkpoint,
+    critical
+)
+from jsonsubschema.checker import (
+    Budget,
+    Unknown,
+    canonical_cache,
+    isSubschema,
+    isSubschema_batch
+)
+
+
+# Takes the regex library far longer than any budget below to compile.
+slow = ({"type": "string", "pattern": "^(ab|cd){1,300}$"},
+        {"type": "string", "pattern": "^([a-d][a-d])*$"})
+
+nested = {"type": "object", "properties": {
+    "a": {"type": "array", "items": {"type": "integer", "minimum": 1}},
+    "b": {"anyOf": [{"type": "string"}, {"type": "null"}]}}}
+
+
+class TestBudget(unittest.TestCase):
+
+    def setUp(self):
+        canonical_cache.clear()
+
+    def test_steps(self):
+        for steps, verdict in ((1, Unknown("validation", "validate")),
+                               (12, Unknown("canonicalization", "canonicalize"))):
+            canonical_cache.clear()
+            with self.subTest(steps=steps):
+                self.assertEqual(isSubschema(nested, {"type": "object"}, budget=Budget(steps=steps)),
+                                 verdict)
+
+    def test_enough(self):
+        for budget in (10, Budget(steps=10000), Budget(seconds=10, steps=10000)):
+            with self.subTest(budget=budget):
+                self.assertIs(isSubschema(nested, {"type": "object"}, budget=budget), True)
+            with self.subTest(budget=budget):
+                self.assertIs(isSubschema({"type": "object"}, nested, budget=budget), False)
+
+    def test_seconds(self):
+        start = time.monotonic()
+        verdict = isSubschema(*slow, budget=0.1)
+        with self.subTest():
+            self.assertLess(time.monotonic() - start, 2)
+        with self.subTest():
+            self.assertIsInstance(verdict, Unknown)
+        with self.subTest():
+            self.assertEqual(verdict.phase, "subtype")
+        with self.subTest():
+            self.assertEqual(signal.getitimer(signal.ITIMER_REAL)[0], 0)
+        with self.subTest():
+            self.assertIs(signal.getsignal(signal.SIGALRM), signal.SIG_DFL)
+        # nothing is left broken behind.
+        with self.subTest():
+            self.assertIs(isSubschema({"type": "string", "pattern": "^(ab|cd){1,3}$"}, slow[1]), True)
+
+    def test_critical(self):
+        done = []
+
+        @critical
+        def update():
+            # no checkpoints until well past the timer.
+            end = time.monotonic() + 0.3
+            while time.monotonic() < end:
+                pass
+            done.append(True)
+
+        with self.assertRaises(BudgetExceeded):
+            with Budget(seconds=0.05):
+                update()
+                checkpoint()
+        with self.subTest():
+            self.assertEqual(done, [True])
+        with self.subTest():
+            self.assertEqual(signal.getitimer(signal.ITIMER_REAL)[0], 0)
+
+    def test_thread(self):
+        ret = []
+        t = threading.Thread(target=lambda: ret.append(
+            isSubschema(nested, {"type": "object"}, budget=Budget(steps=1))))
+        t.start()
+        t.join()
+        with self.subTest():
+            self.assertEqual(ret[0].phase, "validation")
+        # budgets are per thread.
+        with self.subTest():
+            self.assertIs(isSubschema(nested, {"type": "object"}), True)
+
+    def test_verdict(self):
+        u = Unknown("subtype", "regex.inclusion")
+        with self.subTest():
+            self.assertFalse(u)
+        with self.subTest():
+            self.assertNotEqual(u, False)
+        with self.subTest():
+            self.assertNotEqual(u, True)
+        with self.subTest():
+            self.assertEqual(pickle.loads(pickle.dumps(u)), u)
+        with self.subTest():
+            self.assertEqual(repr(u), "Unknown('subtype', 'regex.inclusion')")
+
+    def test_batch(self):
+        pairs = [(nested, {"type": "object"}), ({"type": "integer"}, {"type": "number"})]
+        verdicts = isSubschema_batch(pairs, workers=2, chunksize=1, budget=Budget(steps=8))
+        with self.subTest():
+            self.assertIsInstance(verdicts[0], Unknown)
+        with self.subTest():
+            self.assertIs(verdicts[1], True)
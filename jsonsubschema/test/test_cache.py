@@ -0,0 +1,190 @@
+'''
+Created on October 18, 2026
+'''
+
+import unittest
+
+from jsonschema.exceptions import SchemaError
+
+from jsonsubschema._checkers import (
+    fingerprint,
+    subtype_cache
+)
+from jsonsubschema._cache import (
+    LRUCache,
+    structural_hash
+)
+from jsonsubschema.checker import (
+    canonical_cache,
+    canonical_form,
+    isSubschema
+)
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_eviction_order(self):
+        c = LRUCache(2)
+        c.put("a", 1)
+        c.put("b", 2)
+        c.get("a")
+        c.put("c", 3)
+        with self.subTest():
+            self.assertIn("a", c)
+        with self.subTest():
+            self.assertNotIn("b", c)
+        with self.subTest():
+            self.assertEqual(c.cache_info(), (1, 0, 2, 2))
+
+    def test_disabled(self):
+        c = LRUCache(0)
+        c.put("a", 1)
+        self.assertIsNone(c.get("a"))
+
+
+class TestStructuralHash(unittest.TestCase):
+
+    def test_key_order(self):
+        s1 = {"type": "string", "minLength": 1}
+        s2 = {"minLength": 1, "type": "string"}
+        self.assertEqual(structural_hash(s1), structural_hash(s2))
+
+    def test_value_types(self):
+        with self.subTest():
+            self.assertNotEqual(structural_hash(
+                {"enum": [1]}), structural_hash({"enum": [True]}))
+        with self.subTest():
+            self.assertNotEqual(structural_hash(
+                {"enum": [1]}), structural_hash({"enum": [1.0]}))
+
+
+class TestCanonicalCache(unittest.TestCase):
+
+    def setUp(self):
+        canonical_cache.clear()
+
+    def test_hit(self):
+        s1 = {"type": "integer", "minimum": 5}
+        s2 = {"minimum": 5, "type": "integer"}
+        c1 = canonical_form(s1)
+        c2 = canonical_form(s2)
+        with self.subTest():
+            self.assertIs(c1, c2)
+        with self.subTest():
+            self.assertEqual(canonical_cache.hits, 1)
+        with self.subTest():
+            self.assertEqual(canonical_cache.misses, 1)
+
+    def test_repeated_checks(self):
+        s1 = {"type": "string", "pattern": "^a+$"}
+        s2 = {"type": "string"}
+        for _ in range(3):
+            with self.subTest():
+                self.assertTrue(isSubschema(s1, s2))
+            with self.subTest():
+                self.assertFalse(isSubschema(s2, s1))
+        self.assertEqual(canonical_cache.misses, 2)
+
+    def test_invalid_not_cached(self):
+        s = {"type": "integer", "minimum": "5"}
+        for _ in range(2):
+            with self.subTest():
+                with self.assertRaises(SchemaError):
+                    canonical_form(s)
+        self.assertEqual(len(canonical_cache), 0)
+
+
+class TestSubtypeCache(unittest.TestCase):
+
+    def setUp(self):
+        canonical_cache.clear()
+        subtype_cache.clear()
+
+    def test_fingerprint(self):
+        s1 = canonical_form({"type": "string", "pattern": "a", "minLength": 1})
+        canonical_cache.clear()
+        s2 = canonical_form({"minLength": 1, "pattern": "a", "type": "string"})
+        s3 = canonical_form({"type": "string", "pattern": "b", "minLength": 1})
+        with self.subTest():
+            self.assertEqual(fingerprint(s1), fingerprint(s2))
+        with self.subTest():
+            self.assertNotEqual(fingerprint(s1), fingerprint(s3))
+
+    def test_repeated_properties(self):
+        p1 = {"type": "object", "properties": {"a": {"type": "integer"}}}
+        p2 = {"type": "object", "properties": {"a": {"type": "number"}}}
+        s1 = {"type": "object", "properties": {k: p1 for k in "abcd"}}
+        s2 = {"type": "object", "properties": {k: p2 for k in "abcd"}}
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+        misses = subtype_cache.misses
+        with self.subTest():
+            self.assertTrue(subtype_cache.hits > 0)
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+        with self.subTest():
+            self.assertEqual(subtype_cache.misses, misses)
+
+
+class TestInterning(unittest.TestCase):
+
+    def setUp(self):
+        canonical_cache.clear()
+
+    def test_shared_subschemas(self):
+        address = {"type": "object",
+                   "properties": {"street": {"type": "string"}},
+                   "required": ["street"]}
+        s1 = canonical_form({"type": "object",
+                             "properties": {"home": address, "work": address}})
+        s2 = canonical_form({"type": "array", "items": dict(address)})
+        with self.subTest():
+            self.assertIs(s1.properties["home"], s1.properties["work"])
+        with self.subTest():
+            self.assertIs(s1.properties["home"], s2.items_)
+
+    def test_identity_equality(self):
+        s1 = canonical_form({"type": "string", "maxLength": 3})
+        canonical_cache.clear()
+        s2 = canonical_form({"maxLength": 3, "type": "string"})
+        s3 = canonical_form({"type": "string", "maxLength": 4})
+        with self.subTest():
+            self.assertIs(s1, s2)
+        with self.subTest():
+            self.assertNotEqual(s1, s3)
+        with self.subTest():
+            self.assertEqual(len({s1, s2, s3}), 2)
+
+    def test_immutable(self):
+        s = canonical_form({"type": "string", "maxLength": 3})
+        with self.subTest():
+            with self.assertRaises(TypeError):
+                s.maxLength = 5
+        with self.subTest():
+            with self.assertRaises(TypeError):
+                s["pattern"] = "a"
+
+
+class TestNodeFields(unittest.TestCase):
+
+    def test_fields(self):
+        s = canonical_form({"type": "array", "minItems": 1,
+                            "items": {"type": "string", "maxLength": 3}})
+        with self.subTest():
+            self.assertFalse(hasattr(s, "__dict__"))
+        with self.subTest():
+            self.assertEqual((s.minItems, s.uniqueItems), (1, False))
+        with self.subTest():
+            self.assertEqual(s.items_.maxLength, 3)
+
+    def test_to_json(self):
+        s = canonical_form({"type": "array", "minItems": 1,
+                            "items": {"type": "string", "maxLength": 3}})
+        j = s.to_json()
+        with self.subTest():
+            self.assertIs(type(j), dict)
+        with self.subTest():
+            self.assertIs(type(j["items"]), dict)
+        with self.subTest():
+            self.assertEqual(j, {"type": "array", "minItems": 1,
+                                 "items": {"type": "string", "maxLength": 3}})
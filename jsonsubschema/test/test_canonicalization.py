@@ -0,0 +1,212 @@
+'''
+Created on October 18, 2026
+'''
+
+import copy
+import sys
+import unittest
+
+import jsonschema
+
+import jsonsubschema.config as config
+from jsonsubschema._canoncalization import canoncalize_json
+from jsonsubschema.checker import (
+    SchemaDepthError,
+    isSubschema
+)
+
+
+class TestCanonicalizationInput(unittest.TestCase):
+
+    schemas = [
+        {"type": ["string", "integer", "object"], "minLength": 1,
+         "minimum": 0, "properties": {"a": {"type": ["null", "boolean"]}}},
+        {"type": ["array"], "items": [{"enum": [1, "a"]}],
+         "additionalItems": {"type": "string"}},
+        {"type": "object",
+         "patternProperties": {"^x": {"type": "integer", "maximum": 3}},
+         "dependencies": {"x": {"required": ["y"]}, "z": ["x"]}},
+        {"anyOf": [{"type": "string"}, {"anyOf": [{"type": "null"}]}],
+         "allOf": [{"type": ["string", "null"]}]},
+        {"not": {"anyOf": [{"type": "string"}, {"type": "boolean"}]}},
+        {"enum": [1, "a", None, True]},
+        {"minimum": 5}
+    ]
+
+    def test_input_is_not_modified(self):
+        for s in self.schemas:
+            with self.subTest(schema=s):
+                before = copy.deepcopy(s)
+                canoncalize_json(s)
+                self.assertEqual(s, before)
+
+    def test_shared_subtrees(self):
+        shared = {"type": "string", "pattern": "^a+$"}
+        s1 = {"type": "object",
+              "properties": {"a": shared, "b": shared},
+              "additionalProperties": shared}
+        s2 = {"type": "object", "additionalProperties": {"type": "string"}}
+        before = copy.deepcopy(s1)
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+            self.assertEqual(s1, before)
+
+    def test_wide_type_list(self):
+        s = {"type": ["string", "integer", "number", "boolean", "null"],
+             "properties": {str(i): {"type": "string"} for i in range(200)}}
+        before = copy.deepcopy(s)
+        ret = canoncalize_json(s)
+        with self.subTest():
+            # integers are numbers under the same constraints.
+            self.assertEqual(len(ret.anyOf), 4)
+            self.assertEqual(s, before)
+
+    def test_unconstrained_subschemas(self):
+        # canonical subschemas of some type are not {}.
+        pairs = [
+            ({"not": {"allOf": [{"type": "string", "minLength": 0}, {"type": "string"}]}},
+             {"type": "null"}, False),
+            ({"not": {"allOf": [{"anyOf": [{"type": "string", "minLength": 0}]},
+                                {"type": ["null", "string"]}]}},
+             {"not": {"type": "array", "items": {"type": "null"}}}, False)
+        ]
+        for s1, s2, verdict in pairs:
+            with self.subTest(s1=s1, s2=s2):
+                self.assertIs(isSubschema(s1, s2), verdict)
+
+
+class TestTypedUnion(unittest.TestCase):
+
+    def test_one_branch_per_type(self):
+        for s, n in (({"minimum": 3}, 6), ({"multipleOf": 2}, 6),
+                     ({"type": ["integer", "number", "string"], "maximum": 1.5}, 2)):
+            ret = canoncalize_json(s)
+            with self.subTest(schema=s):
+                self.assertEqual(len(ret.anyOf), n)
+        with self.subTest():
+            self.assertEqual(canoncalize_json({"type": ["integer", "number"], "maximum": 1.5}).type,
+                             "number")
+
+    def test_branchesFor(self):
+        u = canoncalize_json({"anyOf": [{"type": "string"}, {"type": "integer"},
+                                        {"type": "number", "maximum": 0},
+                                        {"type": "string", "pattern": "^a"}]})
+        for s, types in (({"type": "string"}, ["string", "string"]),
+                         ({"type": "integer"}, ["integer", "number"]),
+                         ({"type": "null"}, []),
+                         ({}, ["string", "integer", "number", "string"])):
+            with self.subTest(schema=s):
+                self.assertEqual([b.type for b in u.branchesFor(canoncalize_json(s))], types)
+        with self.subTest():
+            self.assertIs(u.branchesFor(canoncalize_json({"type": "string"})),
+                          u.branchesFor(canoncalize_json({"type": "string", "minLength": 1})))
+
+    def test_verdicts(self):
+        pairs = [
+            ({"minimum": 3}, {"minimum": 2}, True),
+            ({"type": "integer", "minimum": 3}, {"minimum": 3}, True),
+            ({"minimum": 3}, {"type": "integer"}, False),
+            ({"type": "string"}, {"not": {"type": "number"}}, True),
+            ({"allOf": [{"minimum": 3}, {"type": ["integer", "null"]}]},
+             {"type": ["integer", "null"], "minimum": 3}, True)
+        ]
+        for s1, s2, verdict in pairs:
+            with self.subTest(s1=s1, s2=s2):
+                self.assertIs(isSubschema(s1, s2), verdict)
+
+
+class TestLazyNegation(unittest.TestCase):
+
+    def test_expanded_on_use(self):
+        s = {"not": {"type": "string", "pattern": "^a+b$"}}
+        ret = canoncalize_json(s)
+        with self.subTest():
+            self.assertEqual(ret.type, "not")
+            self.assertFalse(hasattr(ret, "_byType"))
+        with self.subTest():
+            self.assertTrue(isSubschema({"type": "integer"}, s))
+            self.assertEqual(sorted(ret._byType), ["integer", "number"])
+        with self.subTest():
+            self.assertIs(isSubschema(s, {"type": "string"}), False)
+            self.assertNotIn("string", ret._byType)
+
+    def test_verdicts(self):
+        pairs = [
+            ({"type": "number", "minimum": 2}, {"not": {"type": ["string", "null"]}}, True),
+            ({"type": "null"}, {"anyOf": [{"not": {"type": "null"}}, {"type": "null"}]}, True),
+            ({"not": {"type": "string"}}, {"not": {"not": {"not": {"type": "string"}}}}, True),
+            ({"type": "string", "maxLength": 1},
+             {"allOf": [{"type": "string"}, {"not": {"type": "string", "minLength": 2}}]}, True),
+            ({"type": "string"}, {"not": {"type": "string", "minLength": 2}}, False),
+            ({"not": {}}, {"not": {"not": {}}}, True),
+            ({"type": "integer"},
+             {"anyOf": [{"type": "string"}, {"not": {"type": "integer", "minimum": 5, "maximum": 1}}]},
+             True)
+        ]
+        for s1, s2, verdict in pairs:
+            with self.subTest(s1=s1, s2=s2):
+                self.assertIs(isSubschema(s1, s2), verdict)
+
+
+def nest_objects(depth, leaf):
+    for _ in range(depth):
+        leaf = {"type": "object", "properties": {"a": leaf}, "required": ["a"]}
+    return leaf
+
+
+def nest_arrays(depth, leaf):
+    for _ in range(depth):
+        leaf = {"type": "array", "items": [leaf], "additionalItems": False}
+    return leaf
+
+
+class TestDeepSchemas(unittest.TestCase):
+
+    # deeper than any recursive traversal could go.
+    depth = sys.getrecursionlimit() + 100
+
+    def setUp(self):
+        self.max_depth = config.MAX_SCHEMA_DEPTH
+
+    def tearDown(self):
+        config.MAX_SCHEMA_DEPTH = self.max_depth
+
+    def test_nested_objects(self):
+        s1 = nest_objects(self.depth, {"type": "integer"})
+        s2 = nest_objects(self.depth, {"type": "number"})
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+        with self.subTest():
+            self.assertFalse(isSubschema(s2, s1))
+
+    def test_nested_arrays(self):
+        s1 = nest_arrays(self.depth, {"type": "string", "minLength": 1})
+        s2 = nest_arrays(self.depth, {"type": "string"})
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+        with self.subTest():
+            self.assertFalse(isSubschema(s2, s1))
+
+    def test_invalid_deep_schema(self):
+        s = nest_objects(self.depth, {"type": "integer", "minimum": "0"})
+        with self.assertRaises(jsonschema.SchemaError) as cm:
+            isSubschema(s, s)
+        with self.subTest():
+            self.assertEqual(len(cm.exception.path), 2 * self.depth + 1)
+
+    def test_depth_limit(self):
+        config.MAX_SCHEMA_DEPTH = 50
+        s1 = nest_objects(60, {"type": "integer"})
+        s2 = nest_objects(40, {"type": "integer"})
+        with self.subTest():
+            with self.assertRaises(SchemaDepthError):
+                isSubschema(s1, s1)
+        with self.subTest():
+            self.assertTrue(isSubschema(s2, s2))
+        with self.subTest():
+            with self.assertRaises(SchemaDepthError):
+                canoncalize_json(s1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+'''
+Created on October 18, 2026
+'''
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+import jsonsubschema.config as config
+import jsonsubschema._store as store
+import jsonsubschema._utils as utils
+from jsonsubschema.checker import canonical_cache
+from jsonsubschema.cli import main
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.schemas = {
+            "int.json": {"type": "integer"},
+            "num.json": {"type": "number"},
+            "str.json": {"type": "string"}
+        }
+        for name, s in self.schemas.items():
+            with open(self.path(name), "w") as f:
+                json.dump(s, f)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def run_cli(self, *argv):
+        out = self.path("out.jsonl")
+        ret = main(list(argv) + ["-o", out, "-j", "1"])
+        with open(out) as f:
+            return ret, [json.loads(line) for line in f]
+
+    def test_directory(self):
+        ret, records = self.run_cli(self.dir.name)
+        with self.subTest():
+            self.assertEqual(ret, 0)
+        with self.subTest():
+            self.assertEqual(len(records), 6)
+        verdicts = {(os.path.basename(r["lhs"]), os.path.basename(r["rhs"])): r["verdict"]
+                    for r in records}
+        with self.subTest():
+            self.assertTrue(verdicts[("int.json", "num.json")])
+        with self.subTest():
+            self.assertFalse(verdicts[("num.json", "int.json")])
+        with self.subTest():
+            self.assertTrue(all(r["seconds"] >= 0 for r in records))
+
+    def test_samples(self):
+        try:
+            ret, records = self.run_cli(self.path("num.json"), self.path("int.json"),
+                                        "--samples", "4")
+        finally:
+            config.REFUTATION_SAMPLES = 0
+        with self.subTest():
+            self.assertEqual([(r["verdict"], r.get("witness")) for r in records],
+                             [(False, 0.5), (True, None)])
+
+    def test_state_cap(self):
+        for name, pattern in (("large.json", "^x.*a.{6}$"), ("x.json", "^x")):
+            with open(self.path(name), "w") as f:
+                json.dump({"type": "string", "pattern": pattern}, f)
+        canonical_cache.clear()
+        utils.regex_cache.clear()
+        try:
+            ret, records = self.run_cli(self.path("large.json"), self.path("x.json"),
+                                        "--state-cap", "100")
+        finally:
+            config.REGEX_STATE_CAP = None
+        with self.subTest():
+            self.assertEqual([(r["verdict"], r.get("approximate")) for r in records],
+                             [(None, False), (False, None)])
+        with self.subTest():
+            self.assertEqual(ret, 0)
+
+    def test_steps(self):
+        canonical_cache.clear()
+        ret, records = self.run_cli(self.path("int.json"), self.path("num.json"), "--steps", "1")
+        with self.subTest():
+            self.assertEqual(ret, 0)
+        with self.subTest():
+            self.assertEqual([(r["verdict"], r["unknown"]) for r in records],
+                             [(None, "canonicalization")] * 2)
+
+    def test_store(self):
+        db = self.path("canonical.db")
+        canonical_cache.clear()
+        try:
+            ret, records = self.run_cli(self.path("*.json"), "--store", db)
+            with self.subTest():
+                self.assertEqual(ret, 0)
+            with self.subTest():
+                self.assertEqual(len(store.get_store()), 3)
+        finally:
+            store.get_store().close()
+            store._store = None
+            config.CANONICAL_STORE = None
+
+    def test_glob(self):
+        ret, records = self.run_cli(self.path("n*.json"), self.path("i*.json"))
+        with self.subTest():
+            self.assertEqual([(os.path.basename(r["lhs"]), r["verdict"]) for r in records],
+                             [("num.json", False), ("int.json", True)])
+
+    def test_pairs(self):
+        pairs = self.path("pairs.jsonl")
+        with open(pairs, "w") as f:
+            f.write(json.dumps({"lhs": self.path("int.json"),
+                                "rhs": {"type": ["number", "null"]}, "id": "a"}) + "\n")
+            f.write("\n")
+            f.write(json.dumps({"lhs": {"type": "string", "minLength": "1"},
+                                "rhs": self.path("str.json")}) + "\n")
+        ret, records = self.run_cli("--pairs", pairs)
+        records = {r["line"]: r for r in records}
+        with self.subTest():
+            self.assertEqual(ret, 1)
+        with self.subTest():
+            self.assertEqual(records[1]["id"], "a")
+            self.assertTrue(records[1]["verdict"])
+        with self.subTest():
+            self.assertIsNone(records[3]["verdict"])
+            self.assertIn("SchemaError", records[3]["error"])
+
+    def test_stdin_windows(self):
+        out = self.path("out.jsonl")
+        written = []
+
+        def lines():
+            for _ in range(5):
+                # records written before the line is read.
+                if os.path.exists(out):
+                    with open(out) as f:
+                        written.append(len(f.readlines()))
+                else:
+                    written.append(0)
+                yield json.dumps({"lhs": {"type": "integer"}, "rhs": {"type": "number"}}) + "\n"
+            yield "[]\n"
+
+        with unittest.mock.patch.object(sys, "stdin", lines()):
+            ret, records = self.run_cli("--pairs", "-", "--window", "2")
+        with self.subTest():
+            self.assertEqual(written, [0, 0, 2, 2, 4])
+        with self.subTest():
+            self.assertEqual([r["line"] for r in records], [1, 2, 3, 4])
+        with self.subTest():
+            # the invalid last line.
+            self.assertEqual(ret, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+'''
+Created on October 18, 2026
+'''
+
+import itertools
+import unittest
+
+import jsonsubschema.config as config
+from jsonsubschema.checker import (
+    _worker_settings,
+    batch_executor,
+    canonical_cache,
+    isSubschema,
+    isSubschema_batch,
+    iter_isSubschema_batch,
+    iter_subschema_matrix,
+    subschema_matrix
+)
+
+
+class TestSubschemaMatrix(unittest.TestCase):
+
+    schemas = [
+        {"type": "integer", "minimum": 0},
+        {"type": "number"},
+        {"type": "string"},
+        {"minimum": 0, "type": "integer"},
+        {"type": ["integer", "string"]}
+    ]
+
+    def setUp(self):
+        canonical_cache.clear()
+
+    def test_matches_isSubschema(self):
+        m = subschema_matrix(self.schemas)
+        for i, s1 in enumerate(self.schemas):
+            for j, s2 in enumerate(self.schemas):
+                with self.subTest(i=i, j=j):
+                    self.assertEqual(m[i][j], isSubschema(s1, s2))
+
+    def test_canonicalize_once(self):
+        subschema_matrix(self.schemas)
+        # schemas 0 and 3 are structurally identical.
+        self.assertEqual(canonical_cache.misses, 4)
+
+    def test_stream(self):
+        pairs = list(iter_subschema_matrix(self.schemas[:3]))
+        with self.subTest():
+            self.assertEqual([(i, j) for i, j, _ in pairs],
+                             [(i, j) for i in range(3) for j in range(3)])
+        with self.subTest():
+            self.assertEqual([v for _, _, v in pairs],
+                             [True, True, False,
+                              False, True, False,
+                              False, False, True])
+
+    def test_empty(self):
+        self.assertEqual(subschema_matrix([]), [])
+
+
+class TestSubschemaBatch(unittest.TestCase):
+
+    pairs = list(itertools.product(TestSubschemaMatrix.schemas, repeat=2))
+
+    def test_serial(self):
+        self.assertEqual(isSubschema_batch(self.pairs, workers=1),
+                         [isSubschema(s1, s2) for s1, s2 in self.pairs])
+
+    def test_parallel(self):
+        self.assertEqual(isSubschema_batch(self.pairs, workers=2, chunksize=3),
+                         [isSubschema(s1, s2) for s1, s2 in self.pairs])
+
+    def test_empty(self):
+        self.assertEqual(isSubschema_batch([], workers=2), [])
+
+    def test_unordered(self):
+        for workers in [1, 2]:
+            results = list(iter_isSubschema_batch(self.pairs, workers=workers))
+            with self.subTest(workers=workers):
+                self.assertEqual(sorted(n for n, _, _, _ in results),
+                                 list(range(len(self.pairs))))
+            with self.subTest(workers=workers):
+                self.assertEqual([v for _, v, _, _ in sorted(results)],
+                                 [isSubschema(s1, s2) for s1, s2 in self.pairs])
+            with self.subTest(workers=workers):
+                self.assertTrue(all(t >= 0 and e is None for _, _, t, e in results))
+
+    def test_unordered_errors(self):
+        pairs = [({"type": "string", "minLength": "1"}, {}),
+                 ({"type": "integer"}, {"type": "number"})]
+        results = sorted(iter_isSubschema_batch(pairs, workers=1))
+        with self.subTest():
+            self.assertIsNone(results[0][1])
+            self.assertTrue(results[0][3].startswith("SchemaError"))
+        with self.subTest():
+            self.assertTrue(results[1][1])
+
+    def test_shared_executor(self):
+        half = len(self.pairs) // 2
+        with batch_executor(2) as executor:
+            for pairs in (self.pairs[:half], self.pairs[half:]):
+                results = sorted(iter_isSubschema_batch(pairs, chunksize=2, executor=executor))
+                with self.subTest(pairs=len(pairs)):
+                    self.assertEqual([v for _, v, _, _ in results],
+                                     [isSubschema(s1, s2) for s1, s2 in pairs])
+
+    def test_worker_config(self):
+        settings = _worker_settings()
+        for k in ("VALIDATOR", "MAX_SCHEMA_DEPTH", "SUBTYPE_CACHE_SIZE", "REGEX_STATE_CAP"):
+            with self.subTest(k=k):
+                self.assertIn(k, settings)
+        with self.subTest():
+            self.assertNotIn("TRACE_SINK", settings)
+        s = {"type": "array", "items": {"type": "array", "items": {"type": "array", "items": {}}}}
+        config.MAX_SCHEMA_DEPTH = 2
+        try:
+            results = sorted(iter_isSubschema_batch([(s, s), ({}, {})], workers=2))
+        finally:
+            config.MAX_SCHEMA_DEPTH = 10000
+        with self.subTest():
+            self.assertTrue(results[0][3].startswith("SchemaDepthError"))
+        with self.subTest():
+            self.assertTrue(results[1][1])
@@ -148,3 +148,17 @@ class TestMixedTypes(unittest.TestCase):
             self.assertFalse(isSubschema(s1, s2))
         with self.subTest():
             self.assertTrue(isSubschema(s2, s1))
+
+    def test_unconstrained_meet_is_no_top(self):
+        s1 = {"type": "integer"}
+        s2 = {"allOf": [{"type": "string", "minLength": 0}, {"type": "string"}]}
+        with self.subTest():
+            self.assertFalse(isSubschema(s1, s2))
+        with self.subTest():
+            self.assertTrue(isSubschema(s2, {"type": "string"}))
+
+    def test_unconstrained_meet_is_no_top2(self):
+        s1 = {"allOf": [{"minimum": 2}, {"type": "string", "minLength": 0}]}
+        s2 = {"minimum": 0}
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
@@ -465,3 +465,17 @@ class TestObjectSubtype(unittest.TestCase):
             self.assertTrue(isSubschema(s1, s2))
         with self.subTest():
             self.assertFalse(isSubschema(s2, s1))
+
+    def test_unconstrained_additional(self):
+        # the canonical additionalProperties is an empty dict, which
+        # is not the same as false.
+        ap = {"allOf": [{"type": "string", "minLength": 0}, {"type": "string"}]}
+        s1 = {"type": "object", "additionalProperties": ap}
+        with self.subTest():
+            self.assertFalse(isSubschema(dict(s1, required=["x"]), {"type": "integer"}))
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, {"type": "object",
+                                             "properties": {"p": {"type": "string"}}}))
+        with self.subTest():
+            self.assertFalse(isSubschema({"type": "object", "additionalProperties": {"type": "string"}},
+                                         {"type": "object", "additionalProperties": False}))
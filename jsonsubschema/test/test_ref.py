@@ -0,0 +1,115 @@
+'''
+Created on October 18, 2026
+'''
+
+import pickle
+import unittest
+
+from jsonsubschema._utils import SchemaRefError
+from jsonsubschema.checker import (
+    canonical_form,
+    isSubschema
+)
+
+
+def tree(value):
+    return {"definitions": {"node": {
+        "type": "object",
+        "properties": {"value": value,
+                       "children": {"type": "array",
+                                    "items": {"$ref": "#/definitions/node"}}},
+        "required": ["value"]}},
+        "$ref": "#/definitions/node"}
+
+
+def linked_list(head):
+    return {"definitions": {"l": {"anyOf": [
+        {"type": "null"},
+        {"type": "array", "items": [head, {"$ref": "#/definitions/l"}],
+         "additionalItems": False}]}},
+        "$ref": "#/definitions/l"}
+
+
+class TestRef(unittest.TestCase):
+
+    def test_shared_definition(self):
+        s1 = {"definitions": {"s": {"type": "string", "pattern": "^a+$"}},
+              "type": "object",
+              "properties": {str(i): {"$ref": "#/definitions/s"} for i in range(50)}}
+        s2 = {"type": "object",
+              "properties": {"7": {"type": "string"}}}
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+        with self.subTest():
+            self.assertFalse(isSubschema(s2, s1))
+        with self.subTest():
+            props = canonical_form(s1).properties
+            self.assertEqual(len({id(v) for v in props.values()}), 1)
+
+    def test_pointer(self):
+        s1 = {"definitions": {"a/b": {"items": [{"type": "integer"}]},
+                              "c~d": {"type": "integer"}},
+              "type": "array",
+              "items": [{"$ref": "#/definitions/a~1b/items/0"},
+                        {"$ref": "#/definitions/c~0d"}],
+              "additionalItems": False}
+        s2 = {"type": "array", "items": {"type": "number"}}
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+
+    def test_siblings_are_ignored(self):
+        s1 = {"definitions": {"i": {"type": "integer"}},
+              "$ref": "#/definitions/i", "type": "string"}
+        s2 = {"type": "number"}
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+
+    def test_recursive(self):
+        with self.subTest():
+            self.assertTrue(isSubschema(tree({"type": "integer"}),
+                                        tree({"type": "number"})))
+        with self.subTest():
+            self.assertFalse(isSubschema(tree({"type": "number"}),
+                                         tree({"type": "integer"})))
+        with self.subTest():
+            self.assertTrue(isSubschema(linked_list({"type": "integer"}),
+                                        linked_list({"type": "number"})))
+        with self.subTest():
+            self.assertFalse(isSubschema(linked_list({"type": "number"}),
+                                         linked_list({"type": "integer"})))
+        with self.subTest():
+            self.assertTrue(isSubschema({"type": "null"},
+                                        linked_list({"type": "string"})))
+
+    def test_recursive_is_memoized(self):
+        s1 = tree({"type": "integer", "minimum": 0})
+        s2 = tree({"type": "integer"})
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+        with self.subTest():
+            self.assertTrue(isSubschema(s1, s2))
+
+    def test_recursive_accepts(self):
+        s = canonical_form(tree({"type": "integer"}))
+        valid = {"value": 1, "children": [{"value": 2, "children": []}]}
+        invalid = {"value": 1, "children": [{"value": 2.5}]}
+        for c in [s, pickle.loads(pickle.dumps(s))]:
+            with self.subTest():
+                self.assertTrue(c.accepts(valid))
+            with self.subTest():
+                self.assertFalse(c.accepts(invalid))
+
+    def test_unsupported(self):
+        circular = {"definitions": {"a": {"$ref": "#/definitions/b"},
+                                    "b": {"$ref": "#/definitions/a"}},
+                    "$ref": "#/definitions/a"}
+        for s in [circular,
+                  {"$ref": "http://example.com/schema"},
+                  {"$ref": "#/definitions/missing"}]:
+            with self.subTest(schema=s):
+                with self.assertRaises(SchemaRefError):
+                    isSubschema(s, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
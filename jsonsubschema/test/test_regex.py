@@ -0,0 +1,150 @@
+'''
+Created on October 18, 2026
+'''
+
+import unittest
+
+import jsonsubschema._utils as utils
+from jsonsubschema._canoncalization import canoncalize_json
+
+
+class TestRegexCache(unittest.TestCase):
+
+    def setUp(self):
+        utils.regex_cache.clear()
+        utils.re_cache.clear()
+
+    def test_shared_entry(self):
+        utils.regex_isSubset(".*a.*", ".*")
+        utils.regex_meet(".*a.*", ".*b.*")
+        with self.subTest():
+            self.assertEqual(utils.regex_cache.misses, 3)
+        with self.subTest():
+            self.assertEqual(utils.regex_cache.hits, 1)
+
+    def test_matching_needs_no_automaton(self):
+        utils.regex_matches_string(".*a.*", "xa")
+        utils.regex_matches_string(".*a.*", "xb")
+        with self.subTest():
+            self.assertEqual(len(utils.regex_cache), 0)
+        with self.subTest():
+            self.assertEqual(utils.re_cache.cache_info()[:2], (1, 1))
+
+    def test_complement(self):
+        r = utils.regex_compile("a+")
+        with self.subTest():
+            self.assertTrue(r.complement.accepts("b"))
+        with self.subTest():
+            self.assertFalse(r.complement.accepts("aa"))
+        with self.subTest():
+            self.assertIs(r.complement, utils.regex_compile("a+").complement)
+
+
+class TestRegexOps(unittest.TestCase):
+
+    def test_matches(self):
+        with self.subTest():
+            self.assertTrue(utils.regex_matches_string("a[0-9]+", "a12"))
+        with self.subTest():
+            self.assertFalse(utils.regex_matches_string("a[0-9]+", "a"))
+
+    def test_meet(self):
+        with self.subTest():
+            self.assertEqual(utils.regex_meet("[0-9]+", "1.*"), "1\\d*")
+        with self.subTest():
+            self.assertIsNone(utils.regex_meet("x", "y"))
+
+    def test_subset(self):
+        with self.subTest():
+            self.assertTrue(utils.regex_isSubset("ab+", "a.*"))
+        with self.subTest():
+            self.assertFalse(utils.regex_isSubset("a.*", "ab+"))
+        with self.subTest():
+            self.assertTrue(utils.regex_isSubset("a.*", "a.*"))
+
+    def test_proper_subset(self):
+        with self.subTest():
+            self.assertTrue(utils.regex_isProperSubset("ab+", "a.*"))
+        with self.subTest():
+            self.assertFalse(utils.regex_isProperSubset("a.*", "a.*"))
+
+
+class TestRegexTranslation(unittest.TestCase):
+
+    strings = ["", "a", "ab", "a1", "a123", "b", "^b", "x$y", "12", "\n", "٣", "a b", "]a"]
+
+    def test_same_matches(self):
+        for p in [".*a.*", "a[0-9]+", "[^x]*", "\\d{2,3}", "\\w+\\s?", "a|^b", "x$y",
+                  "(ab|c)*d?", ".", "", "[\\]a]+", "[^\\d]+"]:
+            r = utils.regex_re(p)
+            with self.subTest(pattern=p):
+                self.assertIsNotNone(r)
+                self.assertEqual([r.fullmatch(s) is not None for s in self.strings],
+                                 [utils.regex_compile(p).fsm.accepts(s) for s in self.strings])
+
+    def test_untranslated(self):
+        for p in ["[]", "[]a]", "a{b", "a{,2}", "(?=a)b", "\\bx", "\\x41", "[[a]]"]:
+            with self.subTest(pattern=p):
+                self.assertIsNone(utils.regex_re(p))
+        with self.subTest():
+            self.assertFalse(utils.regex_matches_string("[]", "a"))
+
+
+class TestRegexInclusionWitness(unittest.TestCase):
+
+    def test_subset(self):
+        with self.subTest():
+            self.assertIsNone(utils.regex_inclusion_witness("ab+", "a.*"))
+        with self.subTest():
+            self.assertIsNone(utils.regex_inclusion_witness("[]", "a"))
+
+    def test_shortest(self):
+        with self.subTest():
+            self.assertEqual(utils.regex_inclusion_witness("a.*", "ab+"), "a")
+        with self.subTest():
+            self.assertEqual(utils.regex_inclusion_witness("a{3}b*", "a{3}"), "aaab")
+        with self.subTest():
+            self.assertEqual(
+                len(utils.regex_inclusion_witness("[0-9]{2,3}", "[0-9]{3}")), 2)
+
+    def test_anything_else(self):
+        w = utils.regex_inclusion_witness(".", "a")
+        with self.subTest():
+            self.assertEqual(len(w), 1)
+        with self.subTest():
+            self.assertTrue(utils.regex_matches_string(".", w))
+        with self.subTest():
+            self.assertFalse(utils.regex_matches_string("a", w))
+
+
+class TestKeyMatcher(unittest.TestCase):
+
+    patterns = (".*a.*", "b[0-9]+", "b.*", "[^x]*")
+
+    def test_matches(self):
+        m = utils.KeyMatcher(self.patterns)
+        for k in ("", "a", "b12", "bx", "xa", "x", "ééa"):
+            with self.subTest(k=k):
+                self.assertEqual(m.matches(k),
+                                 tuple(p for p in self.patterns if utils.regex_matches_string(p, k)))
+
+    def test_cached(self):
+        m = utils.KeyMatcher(self.patterns)
+        m.matches("b1")
+        m.matches("b1")
+        with self.subTest():
+            self.assertEqual(m._matches.cache_info()[:2], (1, 1))
+        with self.subTest():
+            self.assertIs(utils.key_matcher(self.patterns), utils.key_matcher(self.patterns))
+
+    def test_object_keys(self):
+        s = canoncalize_json({"type": "object", "required": ["b1"],
+                              "patternProperties": {"^b[0-9]+$": {"type": "integer"},
+                                                    "^b": {"minimum": 0}}})
+        with self.subTest():
+            self.assertEqual(s.patternsFor("b1"), tuple(s.patternProperties))
+        with self.subTest():
+            self.assertEqual(s.patternsFor("c"), ())
+        with self.subTest():
+            self.assertTrue(s.accepts({"b1": 2, "bb": 1.5}))
+            self.assertFalse(s.accepts({"b1": 1.5}))
@@ -0,0 +1,134 @@
+'''
+Created on October 18, 2026
+'''
+
+import pickle
+import unittest
+
+import jsonschema
+
+import jsonsubschema.config as config
+from jsonsubschema._sampling import (
+    refute,
+    sample
+)
+from jsonsubschema.checker import (
+    Refuted,
+    canonical_form,
+    isSubschema,
+    isSubschema_batch
+)
+
+
+schemas = [
+    {"type": "integer", "minimum": 3, "exclusiveMaximum": True, "maximum": 10},
+    {"type": "number", "minimum": -1.5, "maximum": 0},
+    {"type": "number", "multipleOf": 0.25, "minimum": 1},
+    {"type": "string", "pattern": "^(ab|cd){2,3}$"},
+    {"type": "string", "minLength": 2, "maxLength": 4},
+    {"type": ["boolean", "null"]},
+    {"enum": [1, "a", None]},
+    {"type": "array", "items": {"type": "string", "pattern": "^x+$"}, "minItems": 2, "uniqueItems": True},
+    {"type": "array", "items": [{"type": "integer"}, {"type": "string"}], "additionalItems": False},
+    {"type": "object", "required": ["a", "b"],
+     "properties": {"a": {"type": "integer", "minimum": 7}, "c": {"type": "null"}},
+     "patternProperties": {"^b": {"type": "string", "minLength": 1}}},
+    {"anyOf": [{"type": "integer", "maximum": -100}, {"type": "string", "pattern": "z"}]},
+    {"definitions": {"list": {"type": "array", "items": {"$ref": "#/definitions/list"}}},
+     "$ref": "#/definitions/list"}
+]
+
+
+class TestSample(unittest.TestCase):
+
+    def test_valid(self):
+        for s in schemas:
+            instances = sample(canonical_form(s))
+            with self.subTest(schema=s):
+                self.assertTrue(instances)
+            for i in instances:
+                with self.subTest(schema=s, instance=i):
+                    self.assertTrue(jsonschema.Draft4Validator(s).is_valid(i))
+
+    def test_limit(self):
+        with self.subTest():
+            self.assertEqual(len(sample(canonical_form({"type": "string"}), 3)), 3)
+        with self.subTest():
+            self.assertEqual(sample(canonical_form({"type": "string", "pattern": "^a$", "minLength": 2})), [])
+
+
+class TestRefute(unittest.TestCase):
+
+    def tearDown(self):
+        config.REFUTATION_SAMPLES = 0
+
+    def test_refuted(self):
+        pairs = [
+            ({"type": "integer", "minimum": 0}, {"type": "integer", "minimum": 5}),
+            ({"type": "string", "pattern": "^a+$"}, {"type": "string", "pattern": "^b"}),
+            ({"type": "object", "required": ["a"], "properties": {"a": {"type": "string"}}},
+             {"type": "object", "properties": {"a": {"type": "integer"}}}),
+            ({"type": "array", "items": {"type": "number"}, "minItems": 1},
+             {"type": "array", "items": {"type": "integer"}}),
+            ({"enum": [1, "x"]}, {"type": "integer"})
+        ]
+        for s1, s2 in pairs:
+            r = refute(canonical_form(s1), canonical_form(s2))
+            with self.subTest(s1=s1, s2=s2):
+                self.assertIsInstance(r, Refuted)
+            with self.subTest(s1=s1, s2=s2):
+                self.assertTrue(jsonschema.Draft4Validator(s1).is_valid(r.witness))
+            with self.subTest(s1=s1, s2=s2):
+                self.assertFalse(jsonschema.Draft4Validator(s2).is_valid(r.witness))
+
+    def test_not_refuted(self):
+        pairs = [
+            ({"type": "integer", "minimum": 5}, {"type": "number"}),
+            ({"type": "string", "pattern": "^a+$"}, {"type": "string", "pattern": "a"}),
+            (schemas[9], {"type": "object", "required": ["a"]})
+        ]
+        for s1, s2 in pairs:
+            with self.subTest(s1=s1, s2=s2):
+                self.assertIsNone(refute(canonical_form(s1), canonical_form(s2)))
+
+    def test_verdict(self):
+        r = Refuted({"a": [1]})
+        with self.subTest():
+            self.assertFalse(r)
+        with self.subTest():
+            self.assertEqual(r, False)
+        with self.subTest():
+            self.assertEqual(pickle.loads(pickle.dumps(r)).witness, {"a": [1]})
+        with self.subTest():
+            self.assertIsNone(pickle.loads(pickle.dumps(Refuted(None))).witness)
+
+    def test_isSubschema(self):
+        s1, s2 = {"type": ["string", "null"]}, {"type": "string"}
+        with self.subTest():
+            self.assertIs(isSubschema(s1, s2), False)
+        config.REFUTATION_SAMPLES = 8
+        with self.subTest():
+            self.assertEqual(repr(isSubschema(s1, s2)), "Refuted(None)")
+        with self.subTest():
+            self.assertTrue(isSubschema(s2, s1))
+
+    def test_witness_validated(self):
+        # the canonical rhs ignores the negated enum, which the witness
+        # "" is not in.
+        s1, s2 = {"minimum": 3}, {"not": {"enum": [1.5, "a"]}}
+        config.REFUTATION_SAMPLES = 8
+        with self.subTest():
+            self.assertNotIsInstance(isSubschema(s1, s2), Refuted)
+        with self.subTest():
+            self.assertIsInstance(refute(canonical_form(s1), canonical_form(s2)), Refuted)
+        with self.subTest():
+            self.assertIsNone(refute(canonical_form(s1), canonical_form(s2), raw=(s1, s2)))
+
+    def test_batch(self):
+        config.REFUTATION_SAMPLES = 8
+        verdicts = isSubschema_batch([({"type": "number"}, {"type": "integer"}),
+                                      ({"type": "integer"}, {"type": "number"})], workers=2)
+        with self.subTest():
+            self.assertEqual(verdicts, [False, True])
+        with self.subTest():
+            self.assertEqual(verdicts[0].witness, 0.5)
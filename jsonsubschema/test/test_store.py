@@ -0,0 +1,130 @@
+'''
+Created on October 18, 2026
+'''
+
+import importlib.metadata
+import os
+import shutil
+import tempfile
+import unittest
+
+import jsonschema
+
+import jsonsubschema.config as config
+import jsonsubschema._store as store
+from jsonsubschema._cache import structural_hash
+from jsonsubschema._checkers import intern_schema
+from jsonsubschema.checker import (
+    canonical_cache,
+    canonical_form,
+    isSubschema,
+    isSubschema_batch
+)
+
+
+def _open_store(path):
+    # Each test runs against a fresh connection, as a new process would.
+    config.CANONICAL_STORE = path
+    store._store = None
+    canonical_cache.clear()
+    return store.get_store()
+
+
+class TestCanonicalStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "canonical.db")
+
+    def tearDown(self):
+        if store._store is not None:
+            store._store.close()
+            store._store = None
+        config.CANONICAL_STORE = None
+        config.VALIDATOR = jsonschema.Draft4Validator
+        canonical_cache.clear()
+        shutil.rmtree(self.dir)
+
+    def test_roundtrip(self):
+        s = {"type": ["integer", "string"], "minimum": 5, "pattern": "^a+$"}
+        c = _open_store(self.path)
+        expected = canonical_form(s)
+        with self.subTest():
+            self.assertEqual(len(c), 1)
+
+        c = _open_store(self.path)
+        stored = canonical_form(s)
+        with self.subTest():
+            self.assertEqual(c.hits, 1)
+        with self.subTest():
+            self.assertEqual(stored, expected)
+        with self.subTest():
+            self.assertIs(stored, intern_schema(expected))
+
+    def test_verdicts(self):
+        s1 = {"type": "integer", "minimum": 5}
+        s2 = {"type": "number", "minimum": 0}
+        _open_store(self.path)
+        cold = (isSubschema(s1, s2), isSubschema(s2, s1))
+        c = _open_store(self.path)
+        warm = (isSubschema(s1, s2), isSubschema(s2, s1))
+        with self.subTest():
+            self.assertEqual(cold, (True, False))
+        with self.subTest():
+            self.assertEqual(warm, cold)
+        with self.subTest():
+            self.assertEqual(c.hits, 2)
+
+    def test_recursive_ref(self):
+        s = {"definitions": {"list": {"type": "array", "items": {"$ref": "#/definitions/list"}}},
+             "$ref": "#/definitions/list"}
+        _open_store(self.path)
+        cold = canonical_form(s)
+        c = _open_store(self.path)
+        warm = canonical_form(s)
+        with self.subTest():
+            self.assertEqual(c.hits, 1)
+        with self.subTest():
+            self.assertTrue(warm.isSubtype(cold))
+        with self.subTest():
+            self.assertTrue(cold.isSubtype(warm))
+
+    def test_keyed_by_config(self):
+        s = {"type": "string", "maxLength": 3}
+        _open_store(self.path)
+        canonical_form(s)
+        config.VALIDATOR = jsonschema.Draft6Validator
+        c = _open_store(self.path)
+        canonical_form(s)
+        with self.subTest():
+            self.assertEqual(c.hits, 0)
+        with self.subTest():
+            self.assertEqual(len(c), 2)
+
+    def test_keyed_by_regex_library(self):
+        with self.subTest():
+            self.assertIn("|greenery-" + importlib.metadata.version("greenery"), store.config_key())
+
+    def test_invalid_entry(self):
+        s = {"type": "boolean"}
+        c = _open_store(self.path)
+        c._conn.execute(
+            "INSERT INTO canonical VALUES (?, ?, ?, ?)",
+            (structural_hash(s), store.library_version(), store.config_key(), b"garbage"))
+        with self.subTest():
+            self.assertEqual(canonical_form(s), {"type": "boolean"})
+        with self.subTest():
+            self.assertEqual(c.hits, 0)
+        with self.subTest():
+            self.assertIsNotNone(_open_store(self.path).get(structural_hash(s)))
+
+    def test_concurrent_workers(self):
+        schemas = [{"type": "integer", "minimum": i} for i in range(6)]
+        pairs = [(s1, s2) for s1 in schemas for s2 in schemas]
+        c = _open_store(self.path)
+        verdicts = isSubschema_batch(pairs, workers=3)
+        with self.subTest():
+            self.assertEqual(verdicts,
+                             [s1["minimum"] >= s2["minimum"] for s1, s2 in pairs])
+        with self.subTest():
+            self.assertEqual(len(c), len(schemas))
@@ -0,0 +1,140 @@
+'''
+Created on October 18, 2026
+'''
+
+import io
+import json
+import unittest
+
+import jsonschema
+
+from jsonsubschema._stream import (
+    END_ARRAY,
+    END_MAP,
+    KEY,
+    START_ARRAY,
+    START_MAP,
+    iter_json_events
+)
+from jsonsubschema.checker import (
+    canonical_form,
+    isSubschema,
+    load_canonical_form
+)
+
+
+def build(events):
+    ''' Plain json value out of parsing events. '''
+    stack = []
+    root = None
+    for event, value in events:
+        if event == KEY:
+            stack[-1][1] = value
+            continue
+        if event in (START_MAP, START_ARRAY):
+            stack.append([{} if event == START_MAP else [], None])
+            continue
+        if event in (END_MAP, END_ARRAY):
+            value = stack.pop()[0]
+        if not stack:
+            root = value
+        elif isinstance(stack[-1][0], list):
+            stack[-1][0].append(value)
+        else:
+            stack[-1][0][stack[-1][1]] = value
+    return root
+
+
+class TestJsonEvents(unittest.TestCase):
+
+    doc = {"a": [1, -2.5e-3, 10E2, True, False, None, "x\"y\\u00e9é\n", {}, []],
+           "b": {"c": 12345678901234567890, "é": "日本", "": ""}}
+
+    def test_same_as_json(self):
+        for chunk_size in [1, 2, 3, 7, 65536]:
+            for text in [json.dumps(self.doc),
+                         json.dumps(self.doc, indent=2, ensure_ascii=False)]:
+                with self.subTest(chunk_size=chunk_size):
+                    self.assertEqual(
+                        build(iter_json_events(io.StringIO(text), chunk_size)),
+                        self.doc)
+                with self.subTest(chunk_size=chunk_size, binary=True):
+                    self.assertEqual(
+                        build(iter_json_events(io.BytesIO(text.encode("utf-8")), chunk_size)),
+                        self.doc)
+
+    def test_errors(self):
+        for text in ['{"a": 1,}', '[1 2]', '{"a" 1}', '{"a": tru}', '"abc', '{} x', '']:
+            with self.subTest(text=text):
+                with self.assertRaises(json.JSONDecodeError) as cm:
+                    build(iter_json_events(io.StringIO(text), 2))
+                try:
+                    json.loads(text)
+                except json.JSONDecodeError as e:
+                    self.assertEqual(cm.exception.pos, e.pos)
+
+
+class TestLoadCanonicalForm(unittest.TestCase):
+
+    schemas = [
+        {"type": "object", "properties": {"a": {"type": "string", "minLength": 2}},
+         "required": ["a"], "additionalProperties": {"type": "integer"}},
+        # type comes after the subschemas it decides about.
+        {"properties": {"a": {"type": "string"}}, "items": {"type": "null"},
+         "type": "array"},
+        {"anyOf": [{"type": "string"}, {"type": "array", "items": [{"enum": [1, 2]}]}],
+         "minimum": 3},
+        {"definitions": {"n": {"type": "integer", "minimum": 0}},
+         "type": "object",
+         "patternProperties": {"^x": {"$ref": "#/definitions/n"}},
+         "dependencies": {"x1": {"required": ["y"]}, "y": ["x1"]}},
+        {"definitions": {"l": {"anyOf": [
+            {"type": "null"},
+            {"type": "array", "items": [{"type": "integer"}, {"$ref": "#/definitions/l"}],
+             "additionalItems": False}]}},
+         "$ref": "#/definitions/l"},
+        {"not": {"type": ["string", "boolean"]}},
+        {"enum": ["a", 1, None]}
+    ]
+
+    def test_same_as_canonical_form(self):
+        for s in self.schemas:
+            for chunk_size in [3, 65536]:
+                with self.subTest(schema=s, chunk_size=chunk_size):
+                    c = load_canonical_form(io.StringIO(json.dumps(s)), chunk_size)
+                    self.assertEqual(c.to_json(), canonical_form(s).to_json())
+                    self.assertTrue(isSubschema(c, s))
+                    self.assertTrue(isSubschema(s, c))
+
+    def test_refs_into_subschemas(self):
+        # $refs point into subschemas which have their own canonical forms.
+        schemas = [
+            {"definitions": {"a": {"allOf": [{"type": "string"}, {"maxLength": 3}]}},
+             "$ref": "#/definitions/a/allOf/0"},
+            {"definitions": {"a": {"not": {"type": "string", "minLength": 1}}},
+             "$ref": "#/definitions/a/not"},
+            {"type": "object",
+             "patternProperties": {"^x": {"type": "integer", "maximum": 3}},
+             "properties": {"a": {"$ref": "#/patternProperties/%5Ex"}}},
+            {"anyOf": [{"type": "string", "maxLength": 2},
+                       {"type": "array", "items": {"$ref": "#/anyOf/0"}}]},
+            {"type": "array", "items": [{"type": "null"}, {"$ref": "#/items/0"}]}
+        ]
+        for s in schemas:
+            for chunk_size in [3, 65536]:
+                with self.subTest(schema=s, chunk_size=chunk_size):
+                    c = load_canonical_form(io.StringIO(json.dumps(s)), chunk_size)
+                    self.assertEqual(c.to_json(), canonical_form(s).to_json())
+
+    def test_invalid(self):
+        s = {"type": "object",
+             "properties": {"a": {"type": "array", "items": [{"minimum": "0"}]}}}
+        with self.assertRaises(jsonschema.SchemaError) as cm:
+            load_canonical_form(io.StringIO(json.dumps(s)), 4)
+        with self.subTest():
+            self.assertEqual(list(cm.exception.path),
+                             ["properties", "a", "items", 0, "minimum"])
+
+
+if __name__ == "__main__":
+    unittest.main()
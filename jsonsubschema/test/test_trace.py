@@ -0,0 +1,166 @@
+'''
+Created on October 18, 2026
+'''
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import jsonsubschema.config as config
+import jsonsubschema._trace as trace
+from jsonsubschema._checkers import (
+    check_subtype,
+    subtype_cache
+)
+from jsonsubschema._utils import (
+    SchemaDepthError,
+    regex_cache
+)
+from jsonsubschema.checker import (
+    ChromeTraceSink,
+    JSONLSink,
+    MemorySink,
+    canonical_cache,
+    canonical_form,
+    isSubschema
+)
+
+
+s1 = {"type": "object", "properties": {"a": {"type": "string", "pattern": "^a+$"}}}
+s2 = {"type": "object", "properties": {"a": {"type": "string", "pattern": "^a*$"}}}
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        canonical_cache.clear()
+        subtype_cache.clear()
+        regex_cache.clear()
+
+    def tearDown(self):
+        config.TRACE_SINK = None
+        config.PRINT_DB = False
+        config.MAX_SCHEMA_DEPTH = 10000
+
+    def trace(self, f, *args):
+        config.TRACE_SINK = sink = MemorySink()
+        try:
+            f(*args)
+        finally:
+            config.TRACE_SINK = None
+        return sink.spans
+
+    def test_spans(self):
+        spans = self.trace(isSubschema, s1, s2)
+        names = {r["name"] for r in spans}
+        for name in ("canonical_form", "validate", "canonicalize", "isSubschema",
+                     "subtype", "regex.compile", "regex.inclusion"):
+            with self.subTest(name=name):
+                self.assertIn(name, names)
+        ids = {r["id"]: r for r in spans}
+        for r in spans:
+            with self.subTest(span=r["name"]):
+                self.assertTrue(r["parent"] is None or r["parent"] in ids)
+            with self.subTest(span=r["name"]):
+                self.assertGreaterEqual(r["duration"], 0)
+        subtype = [r for r in spans if r["name"] == "subtype"]
+        with self.subTest():
+            self.assertEqual({r["attrs"]["lhs"] for r in subtype},
+                             {"JSONTypeObject", "JSONTypeString"})
+        with self.subTest():
+            self.assertTrue(all(r["attrs"]["verdict"] for r in subtype))
+
+    def test_nesting(self):
+        spans = self.trace(isSubschema, s1, s2)
+        ids = {r["id"]: r for r in spans}
+        inclusion = next(r for r in spans if r["name"] == "regex.inclusion")
+        parent = ids[inclusion["parent"]]
+        with self.subTest():
+            self.assertEqual((parent["name"], parent["attrs"]["lhs"]), ("subtype", "JSONTypeString"))
+        with self.subTest():
+            self.assertEqual(ids[parent["parent"]]["attrs"]["lhs"], "JSONTypeObject")
+        with self.subTest():
+            self.assertEqual(ids[ids[parent["parent"]]["parent"]]["name"], "isSubschema")
+
+    def test_cache_hits(self):
+        canonical_form(s1)
+        spans = self.trace(canonical_form, s1)
+        with self.subTest():
+            self.assertEqual([(r["name"], r["attrs"]["cache"]) for r in spans],
+                             [("canonical_form", "hit")])
+        c1, c2 = canonical_form(s1), canonical_form(s2)
+        check_subtype(c1, c2)
+        spans = self.trace(check_subtype, c1, c2)
+        with self.subTest():
+            self.assertEqual([(r["name"], r["attrs"]["cache"]) for r in spans],
+                             [("subtype", "hit")])
+
+    def test_disabled(self):
+        with self.subTest():
+            self.assertIs(trace.span("validate"), trace._null_span)
+        isSubschema(s1, s2)
+        with self.subTest():
+            self.assertEqual(trace._active(), [])
+
+    def test_errors(self):
+        s, t = {"type": "integer"}, {"type": "number"}
+        for _ in range(20):
+            s = {"type": "array", "items": s}
+            t = {"type": "array", "items": t}
+        c1, c2 = canonical_form(s), canonical_form(t)
+        config.MAX_SCHEMA_DEPTH = 5
+        config.TRACE_SINK = sink = MemorySink()
+        with self.assertRaises(SchemaDepthError):
+            check_subtype(c1, c2)
+        config.TRACE_SINK = None
+        with self.subTest():
+            self.assertEqual(trace._active(), [])
+        subtype = [r for r in sink.spans if r["name"] == "subtype"]
+        # the pending rules, and the query which went too deep.
+        with self.subTest():
+            self.assertEqual(len(subtype), 6)
+        with self.subTest():
+            self.assertTrue(all(r["attrs"]["error"] == "SchemaDepthError" for r in subtype))
+
+    def test_print_db(self):
+        config.PRINT_DB = True
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            spans = self.trace(isSubschema, s1, s2)
+        debug = [r["attrs"]["message"] for r in spans if r["name"] == "debug"]
+        with self.subTest():
+            self.assertTrue(debug)
+        with self.subTest():
+            self.assertTrue(all(m in out.getvalue() for m in debug))
+
+    def test_jsonl_sink(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "trace.jsonl")
+            config.TRACE_SINK = sink = JSONLSink(path)
+            isSubschema(s1, s2)
+            config.TRACE_SINK = None
+            sink.close()
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+        with self.subTest():
+            self.assertIn("isSubschema", [r["name"] for r in records])
+        with self.subTest():
+            self.assertTrue(all({"id", "parent", "start", "duration", "attrs"} <= set(r)
+                                for r in records))
+
+    def test_chrome_sink(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "trace.json")
+            config.TRACE_SINK = sink = ChromeTraceSink(path)
+            isSubschema(s1, s2)
+            config.TRACE_SINK = None
+            sink.close()
+            with open(path) as f:
+                events = json.load(f)["traceEvents"]
+        with self.subTest():
+            self.assertIn("isSubschema", [e["name"] for e in events])
+        with self.subTest():
+            self.assertTrue(all(e["ph"] == "X" and e["dur"] >= 0
+                                for e in events if e["name"] == "isSubschema"))